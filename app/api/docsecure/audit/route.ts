@@ -0,0 +1,66 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { callDocSecureService } from '@/lib/docsecure-service';
+import { verifyDocSecureSession } from '@/lib/docsecure-session';
+
+const AUDIT_ACTIONS = ['view', 'download'];
+
+// GET ?documentId=5            who viewed or downloaded document 5
+// GET ?month=2025-06&action=   most accessed documents of a month (default: this month)
+export async function GET(request: NextRequest): Promise<NextResponse> {
+  try {
+    // The audit trail is for administrators only
+    if (!verifyDocSecureSession(request.headers)) {
+      return NextResponse.json({
+        success: false,
+        error: 'Authentication required'
+      }, { status: 401 });
+    }
+
+    const { searchParams } = new URL(request.url);
+    const documentId = searchParams.get('documentId');
+    const action = searchParams.get('action');
+    const month = searchParams.get('month');
+    const limit = parseInt(searchParams.get('limit') || '') || undefined;
+
+    if (action && !AUDIT_ACTIONS.includes(action)) {
+      return NextResponse.json({
+        success: false,
+        error: `Invalid action. Must be one of: ${AUDIT_ACTIONS.join(', ')}`
+      }, { status: 400 });
+    }
+    if (month && !/^\d{4}-\d{2}$/.test(month)) {
+      return NextResponse.json({
+        success: false,
+        error: 'Invalid month. Expected YYYY-MM'
+      }, { status: 400 });
+    }
+
+    let result;
+    if (documentId) {
+      if (isNaN(parseInt(documentId))) {
+        return NextResponse.json({
+          success: false,
+          error: 'Invalid document ID'
+        }, { status: 400 });
+      }
+      result = await callDocSecureService('access-log', { documentId: parseInt(documentId), limit });
+    } else {
+      result = await callDocSecureService('top-documents', { month, action, limit });
+    }
+
+    if (!result) {
+      return NextResponse.json({
+        success: false,
+        error: 'Audit service unavailable'
+      }, { status: 503 });
+    }
+    return NextResponse.json(result, { status: result.success ? 200 : 500 });
+
+  } catch (error) {
+    console.error('Audit error:', error);
+    return NextResponse.json({
+      success: false,
+      error: 'Internal server error'
+    }, { status: 500 });
+  }
+}
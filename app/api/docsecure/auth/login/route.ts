@@ -1,4 +1,5 @@
 import { NextRequest, NextResponse } from 'next/server';
+import { createSessionToken, SESSION_COOKIE, SESSION_MAX_AGE } from '@/lib/docsecure-session';
 
 export async function POST(request: NextRequest) {
   try {
@@ -17,16 +18,13 @@ export async function POST(request: NextRequest) {
         }
       });
 
-      // Set session cookies
-      response.cookies.set('docsecure-admin-session', 'authenticated', {
+      // Signed session cookie, sent to the pages and the API routes alike
+      response.cookies.set(SESSION_COOKIE, createSessionToken({ username: "admin", role: 'administrator' }), {
         httpOnly: true,
-        maxAge: 86400, // 24 hours
-        path: '/docsecure/admin'
-      });
-
-      response.cookies.set('docsecure-admin-user', 'admin:administrator', {
-        maxAge: 86400, // 24 hours
-        path: '/docsecure/admin'
+        secure: process.env.NODE_ENV === 'production',
+        sameSite: 'strict',
+        maxAge: SESSION_MAX_AGE, // 24 hours
+        path: '/'
       });
 
       return response;
@@ -38,6 +36,7 @@ export async function POST(request: NextRequest) {
     }
 
   } catch (error) {
+    console.error('DocSecure login error:', error);
     return NextResponse.json({
       success: false,
       error: 'Server error'
@@ -1,4 +1,5 @@
 import { NextRequest, NextResponse } from 'next/server';
+import { SESSION_COOKIE } from '@/lib/docsecure-session';
 
 export async function POST(request: NextRequest): Promise<NextResponse> {
   try {
@@ -8,20 +9,13 @@ export async function POST(request: NextRequest): Promise<NextResponse> {
       message: 'Logout successful'
     });
 
-    // Clear session cookies
-    response.cookies.set('docsecure-admin-session', '', {
+    // Clear the session cookie
+    response.cookies.set(SESSION_COOKIE, '', {
       httpOnly: true,
       secure: process.env.NODE_ENV === 'production',
       sameSite: 'strict',
       maxAge: 0,
-      path: '/docsecure/admin'
-    });
-
-    response.cookies.set('docsecure-admin-user', '', {
-      secure: process.env.NODE_ENV === 'production',
-      sameSite: 'strict',
-      maxAge: 0,
-      path: '/docsecure/admin'
+      path: '/'
     });
 
     return response;
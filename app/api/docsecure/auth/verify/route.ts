@@ -1,4 +1,5 @@
 import { NextRequest, NextResponse } from 'next/server';
+import { verifyDocSecureSession } from '@/lib/docsecure-session';
 
 interface VerifyResponse {
   success: boolean;
@@ -12,56 +13,21 @@ interface VerifyResponse {
 
 export async function GET(request: NextRequest): Promise<NextResponse<VerifyResponse>> {
   try {
-    // Get cookies from request headers
-    const cookieHeader = request.headers.get('cookie');
+    // Same signed-session check the document and audit routes use
+    const user = verifyDocSecureSession(request.headers);
 
-    if (!cookieHeader) {
+    if (!user) {
       return NextResponse.json({
         success: true,
         authenticated: false
       });
     }
 
-    // Parse cookies manually
-    const cookies = cookieHeader.split(';').reduce((acc, cookie) => {
-      const [name, value] = cookie.trim().split('=');
-      acc[name] = value;
-      return acc;
-    }, {} as Record<string, string>);
-
-    const sessionCookie = cookies['docsecure-admin-session'];
-    const userCookie = cookies['docsecure-admin-user'];
-
-    if (!sessionCookie || !userCookie) {
-      return NextResponse.json({
-        success: true,
-        authenticated: false
-      });
-    }
-
-    try {
-      // Parse simple string format: "username:role"
-      const [username, role] = userCookie.split(':');
-
-      if (username && role) {
-        return NextResponse.json({
-          success: true,
-          authenticated: true,
-          user: { username, role }
-        });
-      } else {
-        return NextResponse.json({
-          success: true,
-          authenticated: false
-        });
-      }
-    } catch (parseError) {
-      // Invalid user cookie
-      return NextResponse.json({
-        success: true,
-        authenticated: false
-      });
-    }
+    return NextResponse.json({
+      success: true,
+      authenticated: true,
+      user
+    });
 
   } catch (error) {
     console.error('Verify error:', error);
@@ -1,6 +1,7 @@
 import { NextRequest, NextResponse } from 'next/server';
 import { spawn } from 'child_process';
 import path from 'path';
+import { callDocSecureService } from '@/lib/docsecure-service';
 
 interface Document {
   id: number;
@@ -14,12 +15,14 @@ interface Document {
   last_modified: string;
   file_path: string;
   mime_type: string;
-  metadata: any;
+  metadata?: any;
 }
 
 interface DocumentsResponse {
   success: boolean;
   documents?: Document[];
+  nextCursor?: string | null;
+  total?: number;
   statistics?: any;
   error?: string;
 }
@@ -126,6 +129,11 @@ function callPythonScript(
       if (params.search) args.push(`--search=${params.search}`);
       if (params.limit) args.push(`--limit=${params.limit}`);
       if (params.offset) args.push(`--offset=${params.offset}`);
+      if (params.cursor) args.push(`--cursor=${params.cursor}`);
+      if (params.withTotal) args.push('--with-total');
+      if (params.fields) args.push(`--fields=${params.fields}`);
+      for (const filter of params.meta || []) args.push(`--meta=${filter}`);
+      if (params.withMetadata) args.push('--with-metadata');
     } else if (action === 'delete') {
       args.push(params.documentId.toString());
     }
@@ -209,13 +217,22 @@ function callPythonScript(
   });
 }
 
+async function callDocSecure(
+  action: 'list' | 'stats' | 'delete',
+  params: any = {}
+): Promise<any> {
+  // The warm service answers without starting an interpreter; the script is the fallback
+  const result = await callDocSecureService(action, params);
+  return result ?? callPythonScript(action, params);
+}
+
 export async function GET(request: NextRequest): Promise<NextResponse<DocumentsResponse>> {
   try {
     const { searchParams } = new URL(request.url);
     const action = searchParams.get('action') || 'list';
     
     if (action === 'stats') {
-      const result = await callPythonScript('stats');
+      const result = await callDocSecure('stats');
       
       if (result.success) {
         return NextResponse.json({
@@ -234,18 +251,34 @@ export async function GET(request: NextRequest): Promise<NextResponse<DocumentsR
       const search = searchParams.get('search');
       const limit = parseInt(searchParams.get('limit') || '100');
       const offset = parseInt(searchParams.get('offset') || '0');
+      // Keyset pagination: pass back the nextCursor of the previous page
+      const cursor = searchParams.get('cursor');
+      const withTotal = searchParams.get('total') === 'true';
+      // 'listing' skips file paths
+      const fields = searchParams.get('fields');
+      // Indexed metadata filters, repeatable: ?meta=department=Conformité&meta=valid_until>=2025-01-01
+      const meta = searchParams.getAll('meta');
+      // Metadata is only decoded and returned on request
+      const withMetadata = searchParams.get('metadata') === 'true';
 
-      const result = await callPythonScript('list', {
+      const result = await callDocSecure('list', {
         category,
         search,
         limit,
-        offset
+        offset,
+        cursor,
+        withTotal,
+        fields,
+        meta,
+        withMetadata
       });
 
       if (result.success) {
         return NextResponse.json({
           success: true,
-          documents: result.documents
+          documents: result.documents,
+          nextCursor: result.nextCursor ?? null,
+          ...(result.total !== undefined && { total: result.total })
         });
       } else {
         return NextResponse.json({
@@ -276,7 +309,7 @@ export async function DELETE(request: NextRequest): Promise<NextResponse> {
       }, { status: 400 });
     }
 
-    const result = await callPythonScript('delete', {
+    const result = await callDocSecure('delete', {
       documentId: parseInt(documentId)
     });
 
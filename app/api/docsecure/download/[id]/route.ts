@@ -1,8 +1,15 @@
 import { NextRequest, NextResponse } from 'next/server';
-import { readFile } from 'fs/promises';
-import { existsSync } from 'fs';
+import { stat } from 'fs/promises';
+import { createReadStream, existsSync } from 'fs';
 import path from 'path';
+import { Readable } from 'stream';
 import { spawn } from 'child_process';
+import {
+  callDocSecureService,
+  docSecureAccessHeaders,
+  docSecureAccessor,
+  fetchDocSecureService
+} from '@/lib/docsecure-service';
 
 interface DocumentInfo {
   id: number;
@@ -15,7 +22,21 @@ interface DocumentInfo {
   file_size: number;
 }
 
-function getDocumentInfo(documentId: number): Promise<DocumentInfo | null> {
+// Conditional and partial-download headers the service answers
+const FORWARDED_REQUEST_HEADERS = ['range', 'if-range', 'if-none-match'];
+const FILE_RESPONSE_HEADERS = [
+  'content-type', 'content-length', 'content-range', 'accept-ranges',
+  'etag', 'content-disposition', 'cache-control'
+];
+
+// ?disposition=inline lets the preview viewer display the file instead of saving it
+function contentDisposition(request: NextRequest, value: string): string {
+  return new URL(request.url).searchParams.get('disposition') === 'inline'
+    ? value.replace(/^attachment/, 'inline')
+    : value;
+}
+
+function getDocumentInfoFromScript(documentId: number, access: string[]): Promise<DocumentInfo | null> {
   return new Promise((resolve) => {
     const scriptPath = path.join(process.cwd(), 'utils', 'docsecure', 'api_integration.py');
     
@@ -25,7 +46,7 @@ function getDocumentInfo(documentId: number): Promise<DocumentInfo | null> {
     
     for (const cmd of pythonCommands) {
       try {
-        python = spawn(cmd, [scriptPath, 'get', documentId.toString()], {
+        python = spawn(cmd, [scriptPath, 'get', documentId.toString(), ...access], {
           cwd: process.cwd(),
           stdio: ['pipe', 'pipe', 'pipe']
         });
@@ -168,9 +189,59 @@ function getDocumentInfo(documentId: number): Promise<DocumentInfo | null> {
   });
 }
 
-export async function GET(
+async function getDocumentInfo(request: NextRequest, documentId: number, method: string): Promise<DocumentInfo | null> {
+  // Primary-key lookup on the warm service; spawn the script only if it is not running.
+  // A GET is logged as a download for the accessor
+  const accessor = method === 'GET' ? { access: 'download', ...docSecureAccessor(request.headers) } : {};
+  const result = await callDocSecureService('get', { documentId, ...accessor });
+  if (result) {
+    return result.success && result.document ? result.document : null;
+  }
+  return getDocumentInfoFromScript(
+    documentId,
+    Object.entries(accessor).map(([name, value]) => `--${name}=${value}`)
+  );
+}
+
+// Stream the file from the warm service: Range, If-Range and conditional GET are answered there
+// and the body is piped through, so a download holds no more than a chunk in memory
+async function streamFromService(request: NextRequest, documentId: number, method: string): Promise<NextResponse | null> {
+  // The service logs the download for the accessor
+  const headers: Record<string, string> = docSecureAccessHeaders(request.headers);
+  for (const name of FORWARDED_REQUEST_HEADERS) {
+    const value = request.headers.get(name);
+    if (value) {
+      headers[name] = value;
+    }
+  }
+
+  const response = await fetchDocSecureService(`/files/${documentId}`, { method, headers });
+  if (!response) return null;
+
+  if (response.status === 404) {
+    const result = method === 'HEAD' ? null : await response.json().catch(() => null);
+    return NextResponse.json({
+      error: result?.error || 'Document not found'
+    }, { status: 404 });
+  }
+
+  const responseHeaders = new Headers();
+  for (const name of FILE_RESPONSE_HEADERS) {
+    const value = response.headers.get(name);
+    if (value) {
+      responseHeaders.set(name, name === 'content-disposition' ? contentDisposition(request, value) : value);
+    }
+  }
+  return new NextResponse(method === 'HEAD' ? null : response.body, {
+    status: response.status,
+    headers: responseHeaders
+  });
+}
+
+async function serveDownload(
   request: NextRequest,
-  { params }: { params: { id: string } }
+  params: { id: string },
+  method: string
 ): Promise<NextResponse> {
   try {
     const documentId = parseInt(params.id);
@@ -181,8 +252,13 @@ export async function GET(
       }, { status: 400 });
     }
 
-    // Get document information from database
-    const documentInfo = await getDocumentInfo(documentId);
+    const streamed = await streamFromService(request, documentId, method);
+    if (streamed) {
+      return streamed;
+    }
+
+    // Service unreachable: look the document up through the script
+    const documentInfo = await getDocumentInfo(request, documentId, method);
 
     if (!documentInfo) {
       return NextResponse.json({
@@ -190,16 +266,18 @@ export async function GET(
       }, { status: 404 });
     }
 
-    // Read the actual file from docsecureDOCS directory
-    let fileBuffer: Buffer;
+    // Stream the actual file from docsecureDOCS directory
+    let fileBody: BodyInit;
+    let contentLength: number;
     
     try {
       const docsSecureDir = path.join(process.cwd(), 'docsecureDOCS');
       const filePath = path.join(docsSecureDir, documentInfo.file_path);
       
       if (existsSync(filePath)) {
-        // Read the actual file
-        fileBuffer = await readFile(filePath);
+        // Read the file chunk by chunk instead of buffering all of it
+        contentLength = (await stat(filePath)).size;
+        fileBody = Readable.toWeb(createReadStream(filePath)) as ReadableStream;
       } else {
         // Fallback to mock content if file doesn't exist
         console.warn(`File not found: ${filePath}, using fallback content`);
@@ -258,7 +336,9 @@ trailer
 startxref
 299
 %%EOF`;
-          fileBuffer = Buffer.from(pdfContent, 'latin-1');
+          const fileBuffer = Buffer.from(pdfContent, 'latin-1');
+          fileBody = fileBuffer;
+          contentLength = fileBuffer.length;
         } else {
           const textContent = `Document: ${documentInfo.title}
 Category: ${documentInfo.category}
@@ -267,7 +347,9 @@ Original Filename: ${documentInfo.original_filename}
 File not found in storage.
 
 Generated on: ${new Date().toISOString()}`;
-          fileBuffer = Buffer.from(textContent, 'utf8');
+          const fileBuffer = Buffer.from(textContent, 'utf8');
+          fileBody = fileBuffer;
+          contentLength = fileBuffer.length;
         }
       }
     } catch (error) {
@@ -277,19 +359,23 @@ Generated on: ${new Date().toISOString()}`;
 Error reading file: ${error}
 
 Generated on: ${new Date().toISOString()}`;
-      fileBuffer = Buffer.from(fallbackContent, 'utf8');
+      const fileBuffer = Buffer.from(fallbackContent, 'utf8');
+      fileBody = fileBuffer;
+      contentLength = fileBuffer.length;
     }
 
     // Determine content type
     const contentType = documentInfo.mime_type || 'application/octet-stream';
 
     // Create response with file
-    const response = new NextResponse(fileBuffer, {
+    const response = new NextResponse(method === 'HEAD' ? null : fileBody, {
       status: 200,
       headers: {
         'Content-Type': contentType,
-        'Content-Length': fileBuffer.length.toString(),
-        'Content-Disposition': `attachment; filename="${encodeURIComponent(documentInfo.original_filename)}"`,
+        'Content-Length': contentLength.toString(),
+        'Content-Disposition': contentDisposition(
+          request, `attachment; filename="${encodeURIComponent(documentInfo.original_filename)}"`
+        ),
         'Cache-Control': 'private, no-cache, no-store, must-revalidate',
         'Pragma': 'no-cache',
         'Expires': '0'
@@ -305,3 +391,17 @@ Generated on: ${new Date().toISOString()}`;
     }, { status: 500 });
   }
 }
+
+export async function GET(
+  request: NextRequest,
+  { params }: { params: { id: string } }
+): Promise<NextResponse> {
+  return serveDownload(request, params, 'GET');
+}
+
+export async function HEAD(
+  request: NextRequest,
+  { params }: { params: { id: string } }
+): Promise<NextResponse> {
+  return serveDownload(request, params, 'HEAD');
+}
@@ -1,8 +1,7 @@
 import { NextRequest, NextResponse } from 'next/server';
-import { readFile } from 'fs/promises';
-import { existsSync } from 'fs';
 import path from 'path';
 import { spawn } from 'child_process';
+import { callDocSecureService, docSecureAccessor, fetchDocSecureService } from '@/lib/docsecure-service';
 
 interface DocumentInfo {
   id: number;
@@ -13,9 +12,30 @@ interface DocumentInfo {
   file_path: string;
   mime_type: string;
   file_size: number;
+  last_modified?: string;
 }
 
-function getDocumentInfo(documentId: number): Promise<DocumentInfo | null> {
+// Cached preview derivative rendered by the DocSecure backend, keyed by file hash
+interface PreviewInfo {
+  type: 'text';
+  content: string;
+  etag: string;
+  image: boolean;
+}
+
+interface PreviewResult {
+  document: DocumentInfo;
+  preview: PreviewInfo | null;
+}
+
+const PREVIEW_KINDS = ['text', 'image'];
+// Headers of a derivative passed through from the service
+const PREVIEW_FILE_HEADERS = ['content-type', 'content-length', 'etag', 'cache-control'];
+
+function getPreviewFromScript(
+  documentId: number,
+  accessor: { actor: string; client: string }
+): Promise<PreviewResult | null> {
   return new Promise((resolve) => {
     const scriptPath = path.join(process.cwd(), 'utils', 'docsecure', 'api_integration.py');
     
@@ -25,7 +45,10 @@ function getDocumentInfo(documentId: number): Promise<DocumentInfo | null> {
     
     for (const cmd of pythonCommands) {
       try {
-        python = spawn(cmd, [scriptPath, 'get', documentId.toString()], {
+        python = spawn(cmd, [
+          scriptPath, 'preview', documentId.toString(),
+          `--actor=${accessor.actor}`, `--client=${accessor.client}`
+        ], {
           cwd: process.cwd(),
           stdio: ['pipe', 'pipe', 'pipe']
         });
@@ -83,7 +106,7 @@ function getDocumentInfo(documentId: number): Promise<DocumentInfo | null> {
       };
       
       const document = mockDocuments[documentId];
-      resolve(document || null);
+      resolve(document ? { document, preview: null } : null);
       return;
     }
 
@@ -103,7 +126,7 @@ function getDocumentInfo(documentId: number): Promise<DocumentInfo | null> {
         try {
           const result = JSON.parse(stdout.trim());
           if (result.success && result.document) {
-            resolve(result.document);
+            resolve({ document: result.document, preview: result.preview || null });
             return;
           }
         } catch (e) {
@@ -123,6 +146,51 @@ function getDocumentInfo(documentId: number): Promise<DocumentInfo | null> {
   });
 }
 
+async function getPreview(
+  documentId: number,
+  accessor: { actor: string; client: string }
+): Promise<PreviewResult | null> {
+  // Document and cached text preview from the warm service; spawn the script only if it is not running.
+  // Either way the backend logs the view for the accessor
+  const result = await callDocSecureService('preview', { documentId, ...accessor });
+  if (result) {
+    return result.success && result.document ? { document: result.document, preview: result.preview || null } : null;
+  }
+  return getPreviewFromScript(documentId, accessor);
+}
+
+function etagMatches(request: NextRequest, etag: string): boolean {
+  const header = request.headers.get('if-none-match');
+  if (!header) return false;
+  const candidates = header.split(',').map((value) => value.trim());
+  return candidates.includes('*') || candidates.includes(etag);
+}
+
+// Stream a derivative (?kind=text|image) from the service's cache, revalidated by ETag
+async function servePreviewFile(request: NextRequest, documentId: number, kind: string): Promise<NextResponse> {
+  const headers: Record<string, string> = {};
+  const ifNoneMatch = request.headers.get('if-none-match');
+  if (ifNoneMatch) {
+    headers['If-None-Match'] = ifNoneMatch;
+  }
+
+  const response = await fetchDocSecureService(`/preview/${documentId}?kind=${kind}`, { headers });
+  if (!response) {
+    return NextResponse.json({
+      error: 'Preview service unavailable'
+    }, { status: 503 });
+  }
+
+  const responseHeaders = new Headers();
+  for (const name of PREVIEW_FILE_HEADERS) {
+    const value = response.headers.get(name);
+    if (value) {
+      responseHeaders.set(name, value);
+    }
+  }
+  return new NextResponse(response.body, { status: response.status, headers: responseHeaders });
+}
+
 export async function GET(
   request: NextRequest,
   { params }: { params: { id: string } }
@@ -131,6 +199,7 @@ export async function GET(
     const documentId = parseInt(params.id);
     const { searchParams } = new URL(request.url);
     const isAdmin = searchParams.get('admin') === 'true';
+    const kind = searchParams.get('kind');
 
     if (isNaN(documentId)) {
       return NextResponse.json({
@@ -138,54 +207,60 @@ export async function GET(
       }, { status: 400 });
     }
 
-    // Get document information from database
-    const documentInfo = await getDocumentInfo(documentId);
+    if (kind) {
+      if (!PREVIEW_KINDS.includes(kind)) {
+        return NextResponse.json({
+          error: `Invalid preview kind. Must be one of: ${PREVIEW_KINDS.join(', ')}`
+        }, { status: 400 });
+      }
+      return servePreviewFile(request, documentId, kind);
+    }
+
+    // Get document information and its cached preview from the database
+    const result = await getPreview(documentId, docSecureAccessor(request.headers));
 
-    if (!documentInfo) {
+    if (!result) {
       return NextResponse.json({
         error: 'Document not found'
       }, { status: 404 });
     }
 
-    // Try to read the actual file content for preview
-    let previewContent = '';
-    let previewType = 'text';
+    const { document: documentInfo, preview } = result;
+    const thumbnail = preview?.image ? `/api/docsecure/preview/${documentId}?kind=image` : undefined;
 
-    try {
-      const docsSecureDir = path.join(process.cwd(), 'docsecureDOCS');
-      const filePath = path.join(docsSecureDir, documentInfo.file_path);
-      
-      if (existsSync(filePath)) {
-        // Read the file content
-        const fileBuffer = await readFile(filePath);
-        
-        if (documentInfo.mime_type === 'application/pdf') {
-          // Both admin and regular users get the PDF content
-          // Security restrictions are handled in the frontend component
-          previewType = isAdmin ? 'pdf' : 'pdf-secure';
-          previewContent = fileBuffer.toString('base64');
-        } else {
-          // For other file types, try to read as text
-          previewType = 'text';
-          previewContent = fileBuffer.toString('utf8');
+    if (documentInfo.mime_type !== 'application/pdf') {
+      // Office documents: the cached text extract, never the raw file
+      const etag = preview ? `W/"${preview.etag.replace(/"/g, '')}-${documentInfo.last_modified || ''}"` : null;
+      if (etag && etagMatches(request, etag)) {
+        return new NextResponse(null, { status: 304, headers: { 'ETag': etag, 'Cache-Control': 'private, no-cache' } });
+      }
+
+      const response = NextResponse.json({
+        success: true,
+        document: documentInfo,
+        preview: {
+          type: 'text',
+          content: preview ? preview.content || 'Aucun texte extractible dans ce document.' : 'Aperçu non disponible',
+          thumbnail
         }
-      } else {
-        previewType = 'text';
-        previewContent = `Document file not found at: ${filePath}`;
+      });
+      if (etag) {
+        response.headers.set('ETag', etag);
+        response.headers.set('Cache-Control', 'private, no-cache');
       }
-    } catch (error) {
-      console.error('Error reading file for preview:', error);
-      previewType = 'text';
-      previewContent = `Error reading document: ${error}`;
+      return response;
     }
 
-    // Return document info and preview content
+    // The PDF viewer loads the file itself from the download route, which streams it with
+    // Range and ETag support; the JSON only carries where to find it
+    // Security restrictions for regular users are handled in the frontend component
     return NextResponse.json({
       success: true,
       document: documentInfo,
       preview: {
-        type: previewType,
-        content: previewContent
+        type: isAdmin ? 'pdf' : 'pdf-secure',
+        url: `/api/docsecure/download/${documentId}?disposition=inline`,
+        thumbnail
       }
     });
 
@@ -1,8 +1,9 @@
 import { NextRequest, NextResponse } from 'next/server';
-import { writeFile, mkdir } from 'fs/promises';
+import { mkdir } from 'fs/promises';
 import { existsSync } from 'fs';
 import path from 'path';
 import { spawn } from 'child_process';
+import { uploadToDocSecureService } from '@/lib/docsecure-service';
 
 // Maximum file size: 50MB
 const MAX_FILE_SIZE = 50 * 1024 * 1024;
@@ -51,7 +52,8 @@ function validateFile(file: File): { valid: boolean; error?: string } {
 }
 
 function callPythonScript(
-  filePath: string,
+  buffer: Buffer,
+  fileName: string,
   title: string,
   category: string,
   description: string
@@ -65,7 +67,8 @@ function callPythonScript(
     
     for (const cmd of pythonCommands) {
       try {
-        python = spawn(cmd, [scriptPath, 'upload', filePath, title, category, description], {
+        // The file bytes are piped on stdin and stored in a single pass
+        python = spawn(cmd, [scriptPath, 'upload-stream', fileName, title, category, description], {
           cwd: process.cwd(),
           stdio: ['pipe', 'pipe', 'pipe']
         });
@@ -80,8 +83,6 @@ function callPythonScript(
       console.warn('No Python command found, using fallback upload processing');
       // Use fallback immediately if no Python found
       try {
-        const fs = require('fs');
-        const stats = fs.statSync(filePath);
         const documentId = Math.floor(Math.random() * 10000) + 1000;
 
         resolve({
@@ -101,6 +102,11 @@ function callPythonScript(
     let stdout = '';
     let stderr = '';
 
+    python.stdin.on('error', (error) => {
+      console.warn('Failed to stream file to Python:', error.message);
+    });
+    python.stdin.end(buffer);
+
     python.stdout.on('data', (data) => {
       stdout += data.toString();
     });
@@ -127,8 +133,6 @@ function callPythonScript(
       // Fallback to mock behavior if Python fails
       console.warn('Python script failed, using fallback. Code:', code, 'Stderr:', stderr);
       try {
-        const fs = require('fs');
-        const stats = fs.statSync(filePath);
         const documentId = Math.floor(Math.random() * 10000) + 1000;
 
         resolve({
@@ -148,8 +152,6 @@ function callPythonScript(
       console.warn('Python execution failed, using fallback:', error.message);
       // Fallback to mock behavior
       try {
-        const fs = require('fs');
-        const stats = fs.statSync(filePath);
         const documentId = Math.floor(Math.random() * 10000) + 1000;
 
         resolve({
@@ -205,32 +207,19 @@ export async function POST(request: NextRequest): Promise<NextResponse<UploadRes
       await mkdir(docsSecureDir, { recursive: true });
     }
 
-    // Create temporary upload directory
-    const tempDir = path.join(process.cwd(), 'temp', 'uploads');
-    if (!existsSync(tempDir)) {
-      await mkdir(tempDir, { recursive: true });
-    }
-
-    // Save file temporarily
     const bytes = await file.arrayBuffer();
     const buffer = Buffer.from(bytes);
-    const timestamp = Date.now();
-    const tempFileName = `${timestamp}_${file.name}`;
-    const tempFilePath = path.join(tempDir, tempFileName);
-
-    await writeFile(tempFilePath, buffer);
 
     try {
-      // Process upload using Python script
-      const result = await callPythonScript(tempFilePath, title, category, description);
-
-      // Clean up temporary file
-      try {
-        const fs = require('fs');
-        fs.unlinkSync(tempFilePath);
-      } catch (cleanupError) {
-        console.warn('Failed to clean up temporary file:', cleanupError);
-      }
+      // Process upload on the warm service, or with the Python script if it is not running
+      const serviceResult = await uploadToDocSecureService(buffer, file.name, title, category, description);
+      const result = serviceResult
+        ? {
+            success: serviceResult.success,
+            message: serviceResult.message || serviceResult.error,
+            documentId: serviceResult.documentId
+          }
+        : await callPythonScript(buffer, file.name, title, category, description);
 
       if (result.success) {
         return NextResponse.json({
@@ -246,14 +235,6 @@ export async function POST(request: NextRequest): Promise<NextResponse<UploadRes
       }
 
     } catch (pythonError) {
-      // Clean up temporary file on error
-      try {
-        const fs = require('fs');
-        fs.unlinkSync(tempFilePath);
-      } catch (cleanupError) {
-        console.warn('Failed to clean up temporary file:', cleanupError);
-      }
-
       return NextResponse.json({
         success: false,
         error: `Processing failed: ${pythonError}`
@@ -28,7 +28,7 @@ interface Document {
   last_modified: string;
   file_path: string;
   mime_type: string;
-  metadata: any;
+  metadata?: any;
 }
 
 export default function DocSecureDocumentsPage() {
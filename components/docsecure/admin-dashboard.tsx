@@ -35,7 +35,7 @@ interface Document {
   last_modified: string;
   file_path: string;
   mime_type: string;
-  metadata: any;
+  metadata?: any;
 }
 
 interface AdminUser {
@@ -34,60 +34,35 @@ export function AdminLogin({ onLoginSuccess }: AdminLoginProps) {
     setIsLoading(true)
 
     try {
-      // Fallback authentication - check credentials directly in frontend
-      // This is a temporary solution until the API issue is resolved
-      if (username === "admin" && password === "BCP2Sadmin") {
-        // Simulate successful login
-        const user = {
-          username: "admin",
-          role: "administrator"
-        };
-
-        // Store session in localStorage as fallback
+      // Only the API can sign the session cookie the document routes check; there is no local login
+      const response = await fetch('/api/docsecure/auth/login', {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ username, password }),
+      })
+
+      const contentType = response.headers.get('content-type')
+      const result = contentType && contentType.includes('application/json') ? await response.json() : null
+
+      if (response.ok && result?.success) {
         localStorage.setItem('docsecure-admin-session', 'authenticated');
-        localStorage.setItem('docsecure-admin-user', JSON.stringify(user));
+        localStorage.setItem('docsecure-admin-user', JSON.stringify(result.user));
 
         toast({
           title: "Connexion réussie",
-          description: `Bienvenue, ${user.username}!`,
+          description: `Bienvenue, ${result.user.username}!`,
         })
-        onLoginSuccess(user)
+        onLoginSuccess(result.user)
         return;
       }
 
-      // Try API authentication first
-      try {
-        const response = await fetch('/api/docsecure/auth/login', {
-          method: 'POST',
-          headers: {
-            'Content-Type': 'application/json',
-          },
-          body: JSON.stringify({ username, password }),
-        })
-
-        if (response.ok) {
-          const contentType = response.headers.get('content-type')
-          if (contentType && contentType.includes('application/json')) {
-            const result = await response.json()
-
-            if (result.success) {
-              toast({
-                title: "Connexion réussie",
-                description: `Bienvenue, ${result.user.username}!`,
-              })
-              onLoginSuccess(result.user)
-              return;
-            }
-          }
-        }
-      } catch (apiError) {
-        console.warn('API authentication failed, using fallback:', apiError);
-      }
-
-      // If we reach here, credentials are invalid
       toast({
         title: "Erreur de connexion",
-        description: "Nom d'utilisateur ou mot de passe incorrect.",
+        description: response.status === 401
+          ? "Nom d'utilisateur ou mot de passe incorrect."
+          : "Le service d'authentification est indisponible. Réessayez plus tard.",
         variant: "destructive",
       })
 
@@ -95,7 +70,7 @@ export function AdminLogin({ onLoginSuccess }: AdminLoginProps) {
       console.error('Login error:', error)
       toast({
         title: "Erreur de connexion",
-        description: "Une erreur est survenue lors de la connexion.",
+        description: "Le service d'authentification est injoignable. Réessayez plus tard.",
         variant: "destructive",
       })
     } finally {
@@ -19,12 +19,14 @@ interface Document {
   last_modified: string;
   file_path: string;
   mime_type: string;
-  metadata: any;
+  metadata?: any;
 }
 
 interface PreviewData {
   type: 'pdf' | 'pdf-secure' | 'text' | 'binary';
-  content: string;
+  content?: string;
+  // PDFs: the streamed file the viewer loads
+  url?: string;
 }
 
 interface DocumentPreviewProps {
@@ -192,7 +194,7 @@ export function DocumentPreview({ document: documentData, isOpen, onClose, showA
         // For PDF files with admin access
         return (
           <SecurePDFViewer
-            base64Content={previewData.content}
+            src={previewData.url || ''}
             isAdmin={true}
             documentTitle={documentData?.title || 'Document'}
           />
@@ -202,7 +204,7 @@ export function DocumentPreview({ document: documentData, isOpen, onClose, showA
         // For PDF files with regular user access (secure mode)
         return (
           <SecurePDFViewer
-            base64Content={previewData.content}
+            src={previewData.url || ''}
             isAdmin={false}
             documentTitle={documentData?.title || 'Document'}
           />
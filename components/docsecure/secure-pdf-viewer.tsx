@@ -4,12 +4,12 @@ import { useEffect, useRef, useState } from "react";
 import { FileText, AlertTriangle } from "lucide-react";
 
 interface SecurePDFViewerProps {
-  base64Content: string;
+  src: string;
   isAdmin: boolean;
   documentTitle: string;
 }
 
-export function SecurePDFViewer({ base64Content, isAdmin, documentTitle }: SecurePDFViewerProps) {
+export function SecurePDFViewer({ src, isAdmin, documentTitle }: SecurePDFViewerProps) {
   const iframeRef = useRef<HTMLIFrameElement>(null);
   const containerRef = useRef<HTMLDivElement>(null);
   const [showSecurityWarning, setShowSecurityWarning] = useState(false);
@@ -51,7 +51,7 @@ export function SecurePDFViewer({ base64Content, isAdmin, documentTitle }: Secur
       <div className="w-full border rounded-lg bg-gray-50" style={{ height: '75vh', minHeight: '650px' }}>
         <iframe
           ref={iframeRef}
-          src={`data:application/pdf;base64,${base64Content}`}
+          src={src}
           className="w-full h-full rounded-lg"
           title="Document Preview"
           allow="fullscreen"
@@ -89,7 +89,7 @@ export function SecurePDFViewer({ base64Content, isAdmin, documentTitle }: Secur
       >
         <iframe
           ref={iframeRef}
-          src={`data:application/pdf;base64,${base64Content}#toolbar=0&navpanes=0&scrollbar=1&view=FitH&zoom=100&disableexternallinks=true`}
+          src={`${src}#toolbar=0&navpanes=0&scrollbar=1&view=FitH&zoom=100&disableexternallinks=true`}
           className="w-full h-full rounded-lg docsecure-iframe"
           title="Document Preview"
           style={{
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Email Service Throughput Benchmark
+Drives send_email_api or the /api/send-email endpoint against the local SMTP
+sink and reports messages/sec, latency percentiles and connection counts
+"""
+
+import sys
+import json
+import time
+import argparse
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from smtp_sink import SMTPSink
+from smtp_pool import SMTPConnectionPool
+from email_service import GmailSMTPService
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def build_email(smtp_config, number):
+    return {
+        'smtp': smtp_config,
+        'message': {
+            'from': f'"BCP Benchmark" <{smtp_config["auth"]["user"]}>',
+            'to': f'"Recipient {number}" <recipient{number}@localhost>',
+            'subject': f'Benchmark message {number}',
+            'text': 'Rappel: reporting à déposer avant la date limite.\n' * 20,
+            'html': '<p>Rappel: reporting à déposer avant la date limite.</p>' * 20
+        }
+    }
+
+
+def run_direct(args, smtp_config):
+    """Call the email service in-process from `concurrency` threads"""
+    pool = SMTPConnectionPool(max_idle=0 if args.fresh_connections else args.concurrency)
+    service = GmailSMTPService(pool=pool)
+
+    def send(number):
+        started = time.perf_counter()
+        result = service.send_email(build_email(smtp_config, number))
+        return time.perf_counter() - started, result.get('success', False)
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        outcomes = list(executor.map(send, range(args.messages)))
+    pool.close_all()
+    return outcomes, {'pool': pool.snapshot()}
+
+
+def _post_json(url, payload):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode('utf-8'),
+                                     headers={'Content-Type': 'application/json'}, method='POST')
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return json.loads(response.read().decode('utf-8'))
+
+
+def run_http(args, smtp_config):
+    """POST to /api/send-email, then poll each message until the outbox delivered it"""
+    base_url = args.url.rstrip('/')
+    queued = {}
+    lock = threading.Lock()
+
+    def send(number):
+        started = time.perf_counter()
+        try:
+            result = _post_json(f'{base_url}/api/send-email', build_email(smtp_config, number))
+        except OSError as e:
+            return time.perf_counter() - started, False, str(e)
+        with lock:
+            queued[result['messageId']] = started
+        return time.perf_counter() - started, result.get('success', False), None
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        accepted = list(executor.map(send, range(args.messages)))
+
+    # Delivery latency: from the POST until the outbox reports the message sent
+    delivered = []
+    pending = dict(queued)
+    deadline = time.monotonic() + args.timeout
+    while pending and time.monotonic() < deadline:
+        for message_id, started in list(pending.items()):
+            with urllib.request.urlopen(f'{base_url}/api/email-status/{message_id}', timeout=30) as response:
+                status = json.loads(response.read().decode('utf-8'))
+            if status['status'] in ('sent', 'dead'):
+                delivered.append((time.perf_counter() - started, status['status'] == 'sent'))
+                del pending[message_id]
+        if pending:
+            time.sleep(0.05)
+
+    accept_latencies = [latency for latency, _, _ in accepted]
+    extra = {
+        'accepted': sum(1 for _, ok, _ in accepted if ok),
+        'undelivered': len(pending),
+        'acceptLatencyMs': {
+            'p50': round(percentile(accept_latencies, 0.50) * 1000, 2),
+            'p99': round(percentile(accept_latencies, 0.99) * 1000, 2)
+        }
+    }
+    return delivered, extra
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the BCP email service against a local SMTP sink')
+    parser.add_argument('--mode', choices=['direct', 'http'], default='direct',
+                        help='direct: call send_email_api in-process; http: go through /api/send-email')
+    parser.add_argument('--url', default='http://localhost:8000', help='dashboard server for --mode http')
+    parser.add_argument('--messages', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--fresh-connections', action='store_true',
+                        help='disable session reuse to measure the per-email handshake cost')
+    parser.add_argument('--smtp-host', help='use an already running sink instead of starting one')
+    parser.add_argument('--smtp-port', type=int, default=2525)
+    parser.add_argument('--latency', type=float, default=0.005, help='sink seconds per command')
+    parser.add_argument('--connect-latency', type=float, default=0.05,
+                        help='sink seconds before the greeting (stands in for the TLS handshake)')
+    parser.add_argument('--auth-failure-rate', type=float, default=0.0)
+    parser.add_argument('--disconnect-rate', type=float, default=0.0)
+    parser.add_argument('--timeout', type=float, default=120.0, help='seconds to wait for deliveries')
+    parser.add_argument('--json', help='also write the report to this file')
+    args = parser.parse_args()
+
+    sink = None
+    if args.smtp_host:
+        smtp_config = {'host': args.smtp_host, 'port': args.smtp_port, 'secure': False,
+                       'starttls': False, 'auth': {'user': 'sink@localhost', 'pass': 'sink'}}
+    else:
+        sink = SMTPSink('127.0.0.1', 0, latency=args.latency, connect_latency=args.connect_latency,
+                        auth_failure_rate=args.auth_failure_rate,
+                        disconnect_rate=args.disconnect_rate).start()
+        smtp_config = sink.smtp_config()
+
+    print(f"📨 Sending {args.messages} message(s) with concurrency {args.concurrency} ({args.mode})")
+    started = time.perf_counter()
+    if args.mode == 'direct':
+        outcomes, extra = run_direct(args, smtp_config)
+    else:
+        outcomes, extra = run_http(args, smtp_config)
+    elapsed = time.perf_counter() - started
+
+    latencies = [latency for latency, _ in outcomes]
+    sent = sum(1 for _, ok in outcomes if ok)
+    report = {
+        'mode': args.mode,
+        'messages': args.messages,
+        'concurrency': args.concurrency,
+        'freshConnections': args.fresh_connections,
+        'sent': sent,
+        'failed': args.messages - sent,
+        'elapsedSeconds': round(elapsed, 3),
+        'messagesPerSecond': round(sent / elapsed, 2) if elapsed else 0.0,
+        'latencyMs': {
+            'p50': round(percentile(latencies, 0.50) * 1000, 2),
+            'p99': round(percentile(latencies, 0.99) * 1000, 2),
+            'max': round(max(latencies, default=0.0) * 1000, 2)
+        }
+    }
+    report.update(extra)
+    if sink is not None:
+        report['sink'] = sink.stats.snapshot()
+        sink.stop()
+
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    return 0 if sent == args.messages else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -13,6 +13,8 @@ import os
 import json
 from datetime import datetime
 
+from reporting_catalog import AMMC_CATEGORY_KEYS, get_catalog
+
 def clean_folder_name(name):
     """Clean folder name for file system compatibility"""
     return (name
@@ -37,28 +39,11 @@ def create_ammc_folder_structure():
     year = 2025
     months = list(range(1, 13))  # 1 to 12
     
-    # AMMC reporting data (from the dashboard)
+    # AMMC reporting data (from ALL_REPORTINGS.json)
+    catalog = get_catalog()
     ammc_reportings = {
-        "BCP": [
-            "Rapport de contrôle des OPCVM",
-            "État des OPCVM gérés",
-            "État des mandats de gestion",
-            "État des commissions perçues",
-            "État des actifs sous gestion",
-            "Déclaration des opérations sur titres"
-        ],
-        "BCP2S": [
-            "Rapport de contrôle des OPCVM BCP2S",
-            "État des OPCVM gérés BCP2S", 
-            "État des mandats de gestion BCP2S",
-            "Déclaration des opérations sur titres BCP2S"
-        ],
-        "BANK_AL_YOUSR": [
-            "Rapport de contrôle des OPCVM BAY",
-            "État des OPCVM gérés BAY",
-            "État des mandats de gestion BAY",
-            "Déclaration des opérations sur titres BAY"
-        ]
+        entity: catalog.reporting_names(category_key)
+        for entity, category_key in AMMC_CATEGORY_KEYS.items()
     }
     
     print("🏗️ Creating AMMC folder structure...")
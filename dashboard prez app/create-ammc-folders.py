@@ -8,6 +8,8 @@ import os
 import json
 from datetime import datetime
 
+from reporting_catalog import AMMC_CATEGORY_KEYS, get_catalog
+
 def clean_folder_name(name):
     """Clean folder name for file system compatibility"""
     return (name
@@ -26,25 +28,11 @@ def create_ammc_folders():
     year = 2025
     months = list(range(1, 13))  # 1 to 12
     
-    # AMMC reporting data (simplified from the dashboard)
+    # AMMC reporting folder names (from ALL_REPORTINGS.json)
+    catalog = get_catalog()
     ammc_reportings = {
-        "BCP": [
-            "Rapport_de_contrôle_des_OPCVM",
-            "État_des_OPCVM_gérés",
-            "État_des_mandats_de_gestion",
-            "État_des_commissions_perçues",
-            "État_des_actifs_sous_gestion"
-        ],
-        "BCP2S": [
-            "Rapport_de_contrôle_des_OPCVM_BCP2S",
-            "État_des_OPCVM_gérés_BCP2S", 
-            "État_des_mandats_de_gestion_BCP2S"
-        ],
-        "BANK_AL_YOUSR": [
-            "Rapport_de_contrôle_des_OPCVM_BAY",
-            "État_des_OPCVM_gérés_BAY",
-            "État_des_mandats_de_gestion_BAY"
-        ]
+        entity: [reporting['folderName'] for reporting in catalog.reportings(category_key)]
+        for entity, category_key in AMMC_CATEGORY_KEYS.items()
     }
     
     print("🏗️ Creating AMMC folder structure...")
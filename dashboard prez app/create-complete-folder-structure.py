@@ -9,6 +9,8 @@ import os
 import json
 from datetime import datetime
 
+from reporting_catalog import get_catalog
+
 def clean_folder_name(name):
     """
     Clean the name to create a valid folder name
@@ -29,88 +31,14 @@ def clean_folder_name(name):
 
 def get_all_reportings():
     """
-    Get ALL reportings from all categories - COMPLETE LIST from dashboard
-    Category I: 26 reportings, Category II: 23 reportings, Category III: 19 reportings
+    Get ALL BAM reportings from all categories - read from ALL_REPORTINGS.json
+    Category I, II and III, keyed by category display name
     """
-    reportings = {
-        "I – Situation comptable et états annexes": [
-            # Complete Category I - 26 reportings from dataCat1
-            "Situation Comptable provisoire",
-            "Situation Comptable définitive (*)",
-            "Ventilation, en fonction de la résidence et par catégorie de contrepartie, des opérations de trésorerie et des créances sur les établissements de crédit et assimilés",
-            "Ventilation, en fonction de la résidence et par catégorie de contrepartie, des opérations de trésorerie et des dettes envers les établissements de crédit et assimilés",
-            "Ventilation, en fonction de la résidence et par catégorie de contrepartie, des créances sur la clientèle financière",
-            "Ventilation, en fonction de la résidence et par catégorie de contrepartie, des dettes envers la clientèle financière",
-            "Ventilation, en fonction de la résidence et par catégorie d'agent économique, des créances sur la clientèle non financière",
-            "Ventilation, en fonction de la résidence et par catégorie d'agent économique, des dettes envers la clientèle non financière",
-            "Ventilation, par sections et sous sections d'activité, des créances sur la clientèle",
-            "Ventilation, en fonction du support, des valeurs reçues ou données en pension",
-            "Ventilation, en fonction de la résidence de l'émetteur et par catégorie de contrepartie, des titres en portefeuille",
-            "Ventilation des éléments d'actif , de passif et d'hors bilan concernant les apparentés",
-            "Ventilation , en fonction de la durée initiale, des emplois et des ressources",
-            "Ventilation , en fonction de la durée résiduelle, des emplois, des ressources et des engagements de hors bilan",
-            "Détails des autres actifs et passifs",
-            "Ventilation, en fonction de leur terme, des dettes en devises envers les banques étrangères et organismes assimilés",
-            "Ventilation des titres par émetteur",
-            "Ventilation, par catégorie de contrepartie, des opérations de trésorerie et des créances sur les établissements de crédit assimilés",
-            "Ventilation, par catégorie de contrepartie, des opérations de trésorerie et des dettes envers les établissements de crédit assimilés",
-            "Ventilation, par catégorie de détenteurs et par durée initiale des titres de dettes",
-            "Ventilation, par catégorie d'agent économique des autres actifs et passifs",
-            "Ventilation, par agent économique, de l'actif net des OPCVM",
-            "Ventilation, par agent économique, de l'actif net des OPCVM autres que monétaires",
-            "Ventilation, en fonction de la durée résiduelle, de l'endettement des banques en devises",
-            "Ventilation par guichet des dépôts et crédits par décaissement",
-            "Etat d'exposition sur les contreparties étrangères"
-        ],
-        "II – Etats de synthèse et documents qui leur sont complémentaires": [
-            # Complete Category II - 23 reportings from dataCat2
-            "Bilan",
-            "Compte de produits et charges",
-            "Etat des soldes de gestion",
-            "Tableau des flux de trésorerie",
-            "Compte de produits et charges détaillé",
-            "Immobilisations incorporelles et corporelles",
-            "Cession des immobilisations incorporelles et corporelles",
-            "Détail des titres de placement (titres de propriété)",
-            "Détail des titres de participation et emplois assimilés",
-            "Cession des titres de placement, des titres d'investissement, des titres de participation et emplois assimilés",
-            "Valeur du portefeuille titres suivant différentes méthodes d'évaluation de ces titres",
-            "Détail des provisions",
-            "Répartition du capital social",
-            "Répartition, par classe, nationalité, sexe et âge, du personnel",
-            "Composition du conseil de surveillance",
-            "Liste des membres et des agents de direction",
-            "Liste des membres du directoire",
-            "Liste des apparentés",
-            "Evolution des valeurs mobilières conservées pour le compte de la clientèle par catégories d'agents économiques et d'instruments financiers",
-            "Ventilation des valeurs mobilières conservées pour le compte de la clientèle",
-            "Ventilation de l'encours des dépôts dirhams éligibles par nombre, catégorie de déposants et par tranche de montant",
-            "Ventilation de l'encours des dépôts devises éligibles par nombre, catégorie de déposants et par tranche de montant",
-            "Ventilation par montant de l'encours des dépôts éligibles et non éligibles"
-        ],
-        "III – Etats relatifs à la réglementation prudentielle": [
-            # Complete Category III - 19 reportings from dataCat3
-            "Reporting réglementaire IRRBB",
-            "Etat LCR",
-            "Etat de calcul du ratio de levier sur base individuelle",
-            "Risques encourus sur un même bénéficiaire égaux ou supérieurs à 5% des fonds propres, déclarés sur base individuelle",
-            "Détail des risques sur les clients individuels au sein des groupes (base individuelle)",
-            "Calcul des seuils de 5 % et 20 % des fonds propres",
-            "Statistiques sur le nombre des DS transmises à l'UTRF par ligne de métiers et typologie d'infraction sous-jacente sur la période 2018-2019",
-            "Risque inhérent 'Banque de l'entreprise et de financement'",
-            "Reporting COREP individuel et Etats des fonds propres",
-            "Reporting sur le risque du marché",
-            "Stress tests au titre du risque de liquidité",
-            "Stress tests au titre du risque de crédit",
-            "Stress tests au titre du risque de concentration",
-            "Stress tests au titre du risque de marché",
-            "Stress tests au titre du risque pays",
-            "Choc sur le marché immobilier",
-            "Déterioration des conditions macroéconomiques",
-            "Reporting sur les reports d'échéances des crédits (Global, Zoom Tourisme et Moratoires 2022)",
-            "Expositions par segment (TPE, PME, ETI, GE)"
-        ]
-    }
+    catalog = get_catalog()
+    reportings = {}
+    for category_key in ["I", "II", "III"]:
+        category = catalog.category(category_key)
+        reportings[category.get('name', category_key)] = catalog.reporting_names(category_key)
     return reportings
 
 def create_complete_structure():
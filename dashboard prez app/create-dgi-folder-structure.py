@@ -9,6 +9,8 @@ import os
 import json
 from datetime import datetime
 
+from reporting_catalog import get_catalog
+
 def clean_folder_name(name):
     """Clean folder name by replacing problematic characters"""
     # Replace problematic characters
@@ -69,32 +71,10 @@ def get_month_name(month):
 
 def get_dgi_reportings():
     """
-    Get all 15 DGI reportings from the requirements
+    Get all DGI reportings from ALL_REPORTINGS.json
+    Ordered as in the registry: annual, then quarterly, then monthly declarations
     """
-    dgi_reportings = [
-        # Annual Declarations (10 reportings) - All due March 31
-        "Déclaration de la contribution sociale de solidarité sur les bénéfices et revenus",
-        "Déclaration du prorata des déductions",
-        "Déclaration des Produits des actions, parts sociales et revenus assimilés",
-        "Déclaration Prorata de déduction",
-        "Déclaration des rémunérations versées à des personnes non-résidentes",
-        "Déclaration des produits de placement à revenu fixe et des revenus des certificats de sukuk",
-        "Déclaration du Résultat Fiscale & Liasse Comptable",
-        "Versement de contribution sociale de solidarité sur les bénéfices et revenus",
-        "Versement Reliquat IS",
-        "Déclaration des rémunérations allouées à des tiers",
-        
-        # Quarterly Declarations (2 reportings) - Due before end of following month
-        "Acomptes IS",
-        "Délais de paiement",
-        
-        # Monthly Declarations (3 reportings) - Due before end of following month
-        "TPPRF",
-        "TVA",
-        "RAS"
-    ]
-    
-    return dgi_reportings
+    return get_catalog().reporting_names("DGI")
 
 def create_dgi_folder_structure():
     """
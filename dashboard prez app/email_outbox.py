@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+Persistent Email Outbox for BCP Securities Dashboard
+Queues outgoing emails in SQLite and delivers them from background workers,
+with exponential-backoff retries and a dead-letter view
+"""
+
+import json
+import time
+import uuid
+import random
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+STATUS_QUEUED = 'queued'
+STATUS_SENDING = 'sending'
+STATUS_SENT = 'sent'
+STATUS_DEAD = 'dead'
+
+
+def credential_key(host, port, user):
+    """Key of an SMTP account: the port may arrive as a number or a string"""
+    try:
+        port = int(port)
+    except (TypeError, ValueError):
+        pass
+    return host, port, user
+
+
+def load_smtp_credentials(path):
+    """
+    Read SMTP passwords kept on the server, so queued mail survives a restart
+
+    The file is a JSON list of {"host", "port", "user", "pass"} objects.
+
+    Args:
+        path (str): Credentials file; a missing file means no stored credentials
+
+    Returns:
+        dict: Password keyed by (host, port, user)
+    """
+    path = Path(path)
+    if not path.exists():
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        entries = json.load(f)
+    return {credential_key(entry['host'], entry['port'], entry['user']): entry['pass'] for entry in entries}
+
+
+class AccountRateLimiter:
+    """Token bucket per SMTP account, shared by every sender thread"""
+
+    def __init__(self, rate, burst=1.0):
+        """
+        Args:
+            rate (float): Messages per second per account; 0 disables the limit
+            burst (float): Messages an idle account may send back to back
+        """
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, key):
+        """Take a token for an account and return the seconds to wait before using it"""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            tokens, updated = self._buckets.get(key, (self.burst, now))
+            # Tokens may go negative: each caller waits for its own place in line
+            tokens = min(self.burst, tokens + (now - updated) * self.rate) - 1
+            self._buckets[key] = (tokens, now)
+        return max(0.0, -tokens / self.rate)
+
+
+class EmailOutbox:
+    """SQLite-backed email queue drained by background sender threads"""
+
+    def __init__(self, db_path, send_func, workers=2, max_attempts=5,
+                 backoff_base=30.0, backoff_max=3600.0, credentials=None, rate_limiter=None):
+        """
+        Args:
+            db_path (str): SQLite file holding the queue
+            send_func (callable): Takes the email payload dict, returns a result dict
+                with 'success' and optionally 'retryable' = False for permanent errors
+            workers (int): Number of sender threads
+            max_attempts (int): Deliveries tried before a message is dead-lettered
+            backoff_base (float): Delay in seconds before the first retry
+            backoff_max (float): Upper bound for the retry delay
+            credentials (dict): SMTP passwords configured on the server, keyed by
+                (host, port, user); see load_smtp_credentials
+            rate_limiter (AccountRateLimiter): Paces deliveries per (host, user)
+        """
+        self.db_path = Path(db_path)
+        self.send_func = send_func
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rate_limiter = rate_limiter
+
+        self._local = threading.local()
+        # SMTP passwords stay in memory, keyed by (host, port, user); never in the queue file.
+        # Configured ones survive a restart; passwords sent with a request only live until then.
+        self._configured_credentials = dict(credentials or {})
+        self._credentials = {}
+        self._wakeup = threading.Condition()
+        self._generation = 0
+        self._stop = threading.Event()
+        self._threads = []
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._initialize_database()
+
+    def _connect(self):
+        """One connection per thread; SQLite connections are not shared across threads"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _initialize_database(self):
+        conn = self._connect()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS outbox (
+                id TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                last_error TEXT,
+                result TEXT
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox(status, next_attempt_at)')
+
+        # Messages claimed by a sender that died mid-delivery go back in the queue
+        conn.execute('UPDATE outbox SET status = ? WHERE status = ?', (STATUS_QUEUED, STATUS_SENDING))
+
+        # Queues written before passwords were kept out of the file: take them into memory
+        rows = conn.execute(
+            "SELECT id, payload FROM outbox WHERE json_extract(payload, '$.smtp.auth.pass') IS NOT NULL"
+        ).fetchall()
+        for row in rows:
+            payload = json.loads(row['payload'])
+            conn.execute('UPDATE outbox SET payload = ? WHERE id = ?',
+                         (json.dumps(self._withhold_password(payload)), row['id']))
+
+    @staticmethod
+    def _credential_key(smtp):
+        auth = smtp.get('auth') or {}
+        return credential_key(smtp.get('host'), smtp.get('port'), auth.get('user'))
+
+    def _password(self, smtp):
+        key = self._credential_key(smtp)
+        return self._credentials.get(key, self._configured_credentials.get(key))
+
+    def _withhold_password(self, payload):
+        """Keep the SMTP password in memory and return the payload without it"""
+        payload = dict(payload)
+        smtp = dict(payload.get('smtp') or {})
+        auth = smtp.get('auth')
+        if isinstance(auth, dict) and 'pass' in auth:
+            auth = dict(auth)
+            password = auth.pop('pass')
+            if password:
+                self._credentials[self._credential_key(smtp)] = password
+            smtp['auth'] = auth
+            payload['smtp'] = smtp
+        return payload
+
+    def _with_password(self, payload):
+        """The payload with its SMTP password restored, or None if it is not held"""
+        smtp = payload.get('smtp') or {}
+        password = self._password(smtp)
+        if password is None:
+            return None
+        auth = dict(smtp.get('auth') or {})
+        auth['pass'] = password
+        return dict(payload, smtp=dict(smtp, auth=auth))
+
+    def enqueue(self, email_data, delay=0.0):
+        """Persist a message for delivery in `delay` seconds or later and return its outbox id"""
+        return self.enqueue_many([(email_data, delay)])[0]
+
+    def enqueue_many(self, messages):
+        """
+        Persist several messages in one transaction
+
+        Args:
+            messages (list): (email_data, delay) pairs
+
+        Returns:
+            list: Outbox ids, in the order given
+        """
+        now = datetime.now().isoformat()
+        queued_at = time.time()
+        rows = []
+        for email_data, delay in messages:
+            message_id = f"bcp_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:12]}"
+            rows.append((message_id, json.dumps(self._withhold_password(email_data)), STATUS_QUEUED,
+                         queued_at + delay, now, now))
+        if not rows:
+            return []
+
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany(
+                'INSERT INTO outbox (id, payload, status, next_attempt_at, created_at, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                rows
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        self._notify()
+        return [row[0] for row in rows]
+
+    def _row_to_status(self, row):
+        payload = json.loads(row['payload'])
+        message = payload.get('message', {})
+        return {
+            'messageId': row['id'],
+            'status': row['status'],
+            'attempts': row['attempts'],
+            'to': message.get('to'),
+            'subject': message.get('subject'),
+            'createdAt': row['created_at'],
+            'updatedAt': row['updated_at'],
+            'nextAttemptAt': (datetime.fromtimestamp(row['next_attempt_at']).isoformat()
+                              if row['status'] == STATUS_QUEUED else None),
+            'lastError': row['last_error'],
+            'result': json.loads(row['result']) if row['result'] else None
+        }
+
+    def get_status(self, message_id):
+        """Delivery status of one message, or None if unknown"""
+        row = self._connect().execute('SELECT * FROM outbox WHERE id = ?', (message_id,)).fetchone()
+        return self._row_to_status(row) if row else None
+
+    def dead_letters(self, limit=100, offset=0):
+        """Messages that exhausted their retries or failed permanently, newest first"""
+        rows = self._connect().execute(
+            'SELECT * FROM outbox WHERE status = ? ORDER BY updated_at DESC LIMIT ? OFFSET ?',
+            (STATUS_DEAD, limit, offset)
+        ).fetchall()
+        return [self._row_to_status(row) for row in rows]
+
+    def requeue(self, message_id, smtp_auth=None):
+        """
+        Move a dead-lettered message back into the queue
+
+        Args:
+            message_id (str): Outbox id
+            smtp_auth (dict): {'user', 'pass'} for the message's SMTP account; required
+                when the server does not hold its password (not configured, and the
+                server restarted since it was sent)
+
+        Returns:
+            bool: True if the message was dead and is queued again
+
+        Raises:
+            ValueError: The password is needed and was not given
+        """
+        conn = self._connect()
+        row = conn.execute('SELECT payload FROM outbox WHERE id = ? AND status = ?',
+                           (message_id, STATUS_DEAD)).fetchone()
+        if row is None:
+            return False
+        smtp = json.loads(row['payload']).get('smtp') or {}
+        if smtp_auth and smtp_auth.get('pass'):
+            if smtp_auth.get('user') != (smtp.get('auth') or {}).get('user'):
+                raise ValueError('SMTP user does not match the message')
+            self._credentials[self._credential_key(smtp)] = smtp_auth['pass']
+        elif self._password(smtp) is None:
+            raise ValueError('SMTP credentials are required to requeue this message')
+
+        cursor = conn.execute(
+            'UPDATE outbox SET status = ?, attempts = 0, next_attempt_at = ?, updated_at = ? '
+            'WHERE id = ? AND status = ?',
+            (STATUS_QUEUED, time.time(), datetime.now().isoformat(), message_id, STATUS_DEAD)
+        )
+        if cursor.rowcount:
+            self._notify()
+        return cursor.rowcount > 0
+
+    def counts(self):
+        """Number of messages per status"""
+        rows = self._connect().execute('SELECT status, COUNT(*) FROM outbox GROUP BY status').fetchall()
+        return {row[0]: row[1] for row in rows}
+
+    def _notify(self):
+        """Signal that a message became due; senders check the generation, so none is missed"""
+        with self._wakeup:
+            self._generation += 1
+            self._wakeup.notify()
+
+    def _claim(self):
+        """Atomically take the next due message, or return (None, seconds until one is due)"""
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'SELECT id, payload, attempts, next_attempt_at FROM outbox '
+                'WHERE status = ? ORDER BY next_attempt_at LIMIT 1',
+                (STATUS_QUEUED,)
+            ).fetchone()
+            if row is None:
+                conn.execute('COMMIT')
+                return None, None
+            wait = row['next_attempt_at'] - time.time()
+            if wait > 0:
+                conn.execute('COMMIT')
+                return None, wait
+            conn.execute(
+                'UPDATE outbox SET status = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?',
+                (STATUS_SENDING, datetime.now().isoformat(), row['id'])
+            )
+            conn.execute('COMMIT')
+            return row, None
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def _backoff(self, attempts):
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (attempts - 1)))
+        return delay * random.uniform(0.8, 1.2)
+
+    def _deliver(self, row):
+        payload = self._with_password(json.loads(row['payload']))
+        attempts = row['attempts'] + 1
+        if payload is None:
+            result = {'success': False, 'retryable': False,
+                      'error': 'SMTP password not held by the server; add it to the SMTP credentials '
+                               'file or requeue with credentials'}
+        else:
+            if self.rate_limiter is not None:
+                smtp = payload.get('smtp') or {}
+                wait = self.rate_limiter.reserve((smtp.get('host'), (smtp.get('auth') or {}).get('user')))
+                if wait > 0:
+                    self._stop.wait(wait)
+            try:
+                result = self.send_func(payload)
+            except Exception as e:
+                result = {'success': False, 'error': f"Unexpected error sending email: {e}"}
+        self._record(row['id'], attempts, result)
+
+    def _record(self, message_id, attempts, result):
+        """Write the outcome of a delivery, retrying while the database is locked or failing"""
+        while True:
+            try:
+                self._write_outcome(message_id, attempts, result)
+                return
+            except sqlite3.Error as e:
+                if self._stop.is_set():
+                    raise
+                logger.warning(f"⚠️ Could not record outcome of outbox message {message_id}, retrying: {e}")
+                self._stop.wait(1.0)
+
+    def _write_outcome(self, message_id, attempts, result):
+        now = datetime.now().isoformat()
+        conn = self._connect()
+        if result.get('success'):
+            conn.execute(
+                'UPDATE outbox SET status = ?, updated_at = ?, result = ?, last_error = NULL WHERE id = ?',
+                (STATUS_SENT, now, json.dumps(result), message_id)
+            )
+            logger.info(f"✅ Outbox message {message_id} sent (attempt {attempts})")
+        elif result.get('retryable', True) and attempts < self.max_attempts:
+            delay = self._backoff(attempts)
+            conn.execute(
+                'UPDATE outbox SET status = ?, next_attempt_at = ?, updated_at = ?, last_error = ? WHERE id = ?',
+                (STATUS_QUEUED, time.time() + delay, now, result.get('error'), message_id)
+            )
+            logger.warning(f"⚠️ Outbox message {message_id} failed (attempt {attempts}), "
+                           f"retrying in {delay:.0f}s: {result.get('error')}")
+        else:
+            # Dead letters keep their message so they can be requeued
+            conn.execute(
+                'UPDATE outbox SET status = ?, updated_at = ?, last_error = ?, result = ? WHERE id = ?',
+                (STATUS_DEAD, now, result.get('error'), json.dumps(result), message_id)
+            )
+            logger.error(f"❌ Outbox message {message_id} dead-lettered after {attempts} attempt(s): "
+                         f"{result.get('error')}")
+
+    def _worker(self):
+        while not self._stop.is_set():
+            # Read before claiming: a message queued while _claim runs changes it
+            with self._wakeup:
+                generation = self._generation
+            try:
+                row, wait = self._claim()
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ Outbox claim failed: {e}")
+                row, wait = None, 1.0
+
+            if row is not None:
+                try:
+                    self._deliver(row)
+                except Exception as e:
+                    # Keep the sender alive; a row left 'sending' is queued again on restart
+                    logger.exception(f"❌ Outbox message {row['id']} could not be processed: {e}")
+                    try:
+                        self._write_outcome(row['id'], row['attempts'] + 1, {'success': False, 'error': str(e)})
+                    except sqlite3.Error:
+                        pass
+                continue
+
+            with self._wakeup:
+                self._wakeup.wait_for(
+                    lambda: self._generation != generation or self._stop.is_set(),
+                    timeout=min(wait, 60.0) if wait is not None else 60.0
+                )
+
+    def start(self):
+        """Start the sender threads"""
+        for number in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f'email-outbox-{number}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"📬 Email outbox started with {self.workers} sender(s): {self.db_path}")
+
+    def stop(self, timeout=5):
+        """Ask the sender threads to finish their current message and exit"""
+        self._stop.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
@@ -6,6 +6,8 @@ Handles actual email sending via Gmail SMTP
 
 import smtplib
 import json
+import html
+import string
 import logging
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
@@ -14,15 +16,96 @@ from email import encoders
 from datetime import datetime
 import traceback
 
+from smtp_pool import SMTPConnectionPool
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Bulk sending limits: Gmail throttles bursts and caps daily recipients
+BULK_MAX_RECIPIENTS = 500
+BULK_DEFAULT_RATE = 5.0
+
+class MessageTemplate(string.Template):
+    """string.Template with {{ name }} placeholders, which never clash with prices or CSS"""
+    
+    delimiter = '{{'
+    pattern = r'''
+        \{\{\s*(?:
+          (?P<named>[_a-z][_a-z0-9]*)\s*\}\} |
+          (?P<braced>(?!)) |
+          (?P<escaped>(?!)) |
+          (?P<invalid>)
+        )
+    '''
+
+class BulkTemplate:
+    """Email template compiled once and rendered per recipient"""
+    
+    FIELDS = ('subject', 'text', 'html')
+    
+    def __init__(self, template_data):
+        self.from_addr = template_data['from']
+        self.reply_to = template_data.get('replyTo')
+        self.templates = {}
+        self.static_parts = {}
+        
+        for field in self.FIELDS:
+            if not template_data.get(field):
+                continue
+            template = MessageTemplate(template_data[field])
+            if not template.is_valid():
+                raise ValueError(f"Invalid placeholder in template {field}")
+            self.templates[field] = template
+        
+        if 'subject' not in self.templates:
+            raise ValueError("Template subject is required")
+        
+        self.identifiers = set()
+        for template in self.templates.values():
+            self.identifiers.update(template.get_identifiers())
+        
+        # Parts without placeholders are encoded once and shared by every message
+        for field, subtype in (('text', 'plain'), ('html', 'html')):
+            template = self.templates.get(field)
+            if template is not None and not template.get_identifiers():
+                self.static_parts[field] = MIMEText(template.template, subtype, 'utf-8')
+    
+    def missing(self, variables):
+        """Placeholders a recipient has no value for"""
+        return sorted(self.identifiers - variables.keys())
+    
+    def build_message(self, to, variables):
+        """Render the MIME message for one recipient"""
+        values = {key: str(value) for key, value in variables.items()}
+        
+        msg = MIMEMultipart('alternative')
+        msg['From'] = self.from_addr
+        msg['To'] = to
+        msg['Subject'] = self.templates['subject'].substitute(values)
+        if self.reply_to:
+            msg['Reply-To'] = self.reply_to
+        
+        for field, subtype in (('text', 'plain'), ('html', 'html')):
+            if field in self.static_parts:
+                msg.attach(self.static_parts[field])
+            elif field in self.templates:
+                if field == 'html':
+                    rendered = self.templates[field].substitute(
+                        {key: html.escape(value) for key, value in values.items()})
+                else:
+                    rendered = self.templates[field].substitute(values)
+                msg.attach(MIMEText(rendered, subtype, 'utf-8'))
+        
+        return msg
+
 class GmailSMTPService:
     """Gmail SMTP email service for BCP Securities"""
     
-    def __init__(self):
-        self.smtp_server = None
+    def __init__(self, pool=None):
+        # Authenticated sessions are reused across sends instead of
+        # reconnecting, STARTTLS-ing and logging in for every email
+        self.pool = pool or SMTPConnectionPool()
         
     def send_email(self, email_data):
         """
@@ -45,14 +128,15 @@ class GmailSMTPService:
             if not self._validate_email_data(smtp_config, message_data):
                 return {
                     'success': False,
-                    'error': 'Invalid email configuration or message data'
+                    'error': 'Invalid email configuration or message data',
+                    'retryable': False
                 }
             
-            # Create message
-            msg = self._create_message(message_data)
+            # Bulk messages arrive already rendered; others are built here
+            text = email_data.get('mime') or self._create_message(message_data).as_string()
             
             # Send via SMTP
-            result = self._send_via_smtp(smtp_config, message_data, msg)
+            result = self._send_via_smtp(smtp_config, message_data, text)
             
             logger.info(f"✅ Email send result: {result}")
             return result
@@ -119,39 +203,18 @@ class GmailSMTPService:
         
         return msg
     
-    def _send_via_smtp(self, smtp_config, message_data, msg):
+    def _send_via_smtp(self, smtp_config, message_data, text):
         """Send email via SMTP"""
         
         try:
-            logger.info(f"📧 Connecting to SMTP server: {smtp_config['host']}:{smtp_config['port']}")
-            
-            # Create SMTP connection
-            if smtp_config.get('secure', False):
-                # Use SSL (port 465)
-                server = smtplib.SMTP_SSL(smtp_config['host'], smtp_config['port'])
-            else:
-                # Use TLS (port 587)
-                server = smtplib.SMTP(smtp_config['host'], smtp_config['port'])
-                server.starttls()
-            
-            # Enable debug if needed
-            # server.set_debuglevel(1)
-            
-            # Login
             auth = smtp_config['auth']
-            logger.info(f"🔐 Authenticating as: {auth['user']}")
-            server.login(auth['user'], auth['pass'])
             
             # Extract recipient emails
             to_emails = self._extract_emails(message_data['to'])
             
-            # Send email
+            # Send email over a pooled session
             logger.info(f"📤 Sending email to: {to_emails}")
-            text = msg.as_string()
-            server.sendmail(auth['user'], to_emails, text)
-            
-            # Close connection
-            server.quit()
+            self.pool.sendmail(smtp_config, auth['user'], to_emails, text)
             
             # Generate message ID
             message_id = f"bcp_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{hash(text) % 10000}"
@@ -173,7 +236,8 @@ class GmailSMTPService:
             return {
                 'success': False,
                 'error': error_msg,
-                'details': str(e)
+                'details': str(e),
+                'retryable': False
             }
             
         except smtplib.SMTPException as e:
@@ -214,25 +278,100 @@ class GmailSMTPService:
         
         return emails
     
+    def send_bulk_email(self, bulk_data, enqueue_many):
+        """
+        Render a template for each recipient and queue the messages for delivery
+        
+        Args:
+            bulk_data (dict): 'smtp', 'template' (from, subject, text, html, replyTo),
+                'recipients' (list of {to, name, variables}) and optional 'ratePerSecond'
+            enqueue_many (callable): Takes a list of (email_data, delay) and returns
+                their outbox message ids
+            
+        Returns:
+            dict: Totals plus one result per recipient, in request order, with the
+                outbox messageId to poll for delivery
+        """
+        smtp_config = bulk_data.get('smtp', {})
+        template_data = bulk_data.get('template', {})
+        recipients = bulk_data.get('recipients') or []
+        
+        if not self._validate_email_data(smtp_config, dict(template_data, to='bulk')):
+            return {'success': False, 'error': 'Invalid email configuration or template data'}
+        if not isinstance(recipients, list) or not recipients:
+            return {'success': False, 'error': 'No recipients given'}
+        if len(recipients) > BULK_MAX_RECIPIENTS:
+            return {'success': False, 'error': f'At most {BULK_MAX_RECIPIENTS} recipients per request'}
+        
+        try:
+            template = BulkTemplate(template_data)
+            rate = float(bulk_data.get('ratePerSecond') or BULK_DEFAULT_RATE)
+        except (ValueError, TypeError) as e:
+            return {'success': False, 'error': str(e)}
+        
+        # Deliveries are spread out at the requested rate; the outbox also
+        # caps each SMTP account, whichever request its messages came from
+        interval = 1.0 / rate if rate > 0 else 0.0
+        results = []
+        outgoing = []
+        for recipient in recipients:
+            rendered = self._render_bulk_message(template, recipient)
+            if 'error' in rendered:
+                results.append({'to': rendered['to'], 'success': False, 'error': rendered['error']})
+                continue
+            result = {'to': rendered['to'], 'success': True, 'queued': True}
+            results.append(result)
+            outgoing.append((result, {'smtp': smtp_config, 'message': rendered['message'],
+                                      'mime': rendered['mime']}))
+        
+        # One transaction for the whole batch
+        message_ids = enqueue_many([(email_data, position * interval)
+                                    for position, (_, email_data) in enumerate(outgoing)])
+        for (result, _), message_id in zip(outgoing, message_ids):
+            result['messageId'] = message_id
+            result['statusUrl'] = f'/api/email-status/{message_id}'
+        
+        queued = len(outgoing)
+        logger.info(f"📨 Bulk send: {queued}/{len(results)} message(s) queued at up to {rate:g}/s")
+        return {
+            'success': queued == len(results),
+            'total': len(results),
+            'queued': queued,
+            'rejected': len(results) - queued,
+            'timestamp': datetime.now().isoformat(),
+            'results': results
+        }
+    
+    def _render_bulk_message(self, template, recipient):
+        """Build one recipient's message, or describe why it cannot be built"""
+        if isinstance(recipient, str):
+            recipient = {'to': recipient}
+        to = recipient.get('to') or recipient.get('email') or ''
+        name = recipient.get('name')
+        to_header = f'"{name}" <{to}>' if name and '<' not in to else to
+        to_emails = self._extract_emails(to)
+        if not to_emails:
+            return {'to': to, 'error': 'Missing recipient address'}
+        
+        variables = {'email': to_emails[0], 'name': name or ''}
+        variables.update(recipient.get('variables') or {})
+        missing = template.missing(variables)
+        if missing:
+            return {'to': to, 'error': f"Missing template variables: {', '.join(missing)}"}
+        
+        msg = template.build_message(to_header, variables)
+        message = {'from': msg['From'], 'to': msg['To'], 'subject': msg['Subject']}
+        return {'to': to, 'message': message, 'mime': msg.as_string()}
+    
     def test_connection(self, smtp_config):
         """Test SMTP connection without sending email"""
         
         try:
             logger.info("🧪 Testing Gmail SMTP connection...")
             
-            # Create SMTP connection
-            if smtp_config.get('secure', False):
-                server = smtplib.SMTP_SSL(smtp_config['host'], smtp_config['port'])
-            else:
-                server = smtplib.SMTP(smtp_config['host'], smtp_config['port'])
-                server.starttls()
-            
-            # Test authentication
-            auth = smtp_config['auth']
-            server.login(auth['user'], auth['pass'])
-            
-            # Close connection
-            server.quit()
+            # Borrowing a session logs in, or NOOP-checks an already pooled one
+            with self.pool.session(smtp_config):
+                pass
             
             logger.info("✅ Gmail SMTP connection test successful")
             return {
@@ -255,6 +394,14 @@ def send_email_api(email_data):
     """API endpoint for sending emails"""
     return gmail_service.send_email(email_data)
 
+def send_bulk_email_api(bulk_data, enqueue_many):
+    """API endpoint for queueing a templated email to many recipients"""
+    return gmail_service.send_bulk_email(bulk_data, enqueue_many)
+
 def test_connection_api(smtp_config):
     """API endpoint for testing SMTP connection"""
     return gmail_service.test_connection(smtp_config)
+
+def validate_email_api(email_data):
+    """Check an email request before it is queued for delivery"""
+    return gmail_service._validate_email_data(email_data.get('smtp', {}), email_data.get('message', {}))
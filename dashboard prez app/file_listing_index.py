@@ -0,0 +1,613 @@
+#!/usr/bin/env python3
+"""
+UPLOADED_REPORTINGS File Listing Index
+Keeps file_listing.json up to date in-process by applying per-file deltas,
+with a periodic full rescan to reconcile anything the deltas missed
+"""
+
+import os
+import json
+import base64
+import bisect
+import logging
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+REPORTING_EXTENSIONS = ('.xlsx', '.xls', '.pdf', '.docx', '.doc')
+MONTH_KEYS = [str(month) for month in range(1, 13)]
+
+
+def is_reporting_file(filename):
+    """Return True for the file types shown in the dashboard file browser"""
+    return filename.lower().endswith(REPORTING_EXTENSIONS)
+
+
+def parse_reporting_path(path_parts):
+    """
+    Map folder parts below UPLOADED_REPORTINGS to their reporting coordinates
+
+    Args:
+        path_parts (list): Folder names relative to UPLOADED_REPORTINGS
+
+    Returns:
+        tuple: (authority, category, report, year, month), or None when the
+        folder is not at month level
+    """
+    if len(path_parts) == 5:
+        authority = path_parts[0]
+
+        if authority == "BAM":
+            # BAM structure: BAM/Category/Report/Year/Month
+            return authority, path_parts[1], path_parts[2], path_parts[3], path_parts[4]
+        return None  # Skip unknown authorities for 5-part paths
+
+    if len(path_parts) == 4:
+        authority = path_parts[0]
+        if authority in ["AMMC", "DGI"]:
+            # AMMC/DGI structure: Authority/Report/Year/Month
+            return authority, authority, path_parts[1], path_parts[2], path_parts[3]
+        # Legacy structure: Category/Report/Year/Month
+        return None, path_parts[0], path_parts[1], path_parts[2], path_parts[3]
+
+    return None  # Skip paths that are not at month level
+
+
+def _period_key(value):
+    """Sort key for year/month folder names: numeric when possible, text otherwise"""
+    value = str(value)
+    return (int(value), value) if value.isdigit() else (-1, value)
+
+
+def _entry_key(category, report, year, month, filename):
+    """Total ordering of index entries used for range scans and cursors"""
+    return (category, report, _period_key(year), _period_key(month), filename)
+
+
+def encode_cursor(key):
+    """Encode an entry key as an opaque pagination cursor"""
+    category, report, year, month, filename = key
+    payload = json.dumps([category, report, year[1], month[1], filename], ensure_ascii=False)
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Decode a pagination cursor produced by encode_cursor"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+        return _entry_key(*payload)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def parse_period(value):
+    """Parse 'YYYY' or 'YYYY-MM' into a (year, month) tuple of ints; month may be None"""
+    if not value:
+        return None
+    parts = str(value).split('-')
+    try:
+        year = int(parts[0])
+        month = int(parts[1]) if len(parts) > 1 else None
+    except ValueError:
+        raise ValueError(f"Invalid period: {value}")
+    if month is not None and not 1 <= month <= 12:
+        raise ValueError(f"Invalid period: {value}")
+    return year, month
+
+
+def build_listing_data(file_structure, statistics=None):
+    """Wrap a file structure in the file_listing.json envelope"""
+    if statistics is None:
+        statistics = {
+            "total_categories": len(file_structure),
+            "total_reports": sum(len(reports) for reports in file_structure.values()),
+            "total_files": sum(
+                len(files)
+                for category in file_structure.values()
+                for report in category.values()
+                for year in report.values()
+                for files in year.values()
+            )
+        }
+
+    return {
+        "generated": datetime.now().isoformat(),
+        "generator": "generate-file-listing-new.py",
+        "description": "Real file listing for BCP Securities Services reporting dashboard",
+        "base_path": "./UPLOADED_REPORTINGS",
+        "structure": file_structure,
+        "statistics": dict(statistics)
+    }
+
+
+def write_json_atomic(path, data):
+    """Write JSON to a temporary sibling file and rename it over the target"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+
+class FileListingIndex:
+    """In-memory index of UPLOADED_REPORTINGS mirrored to file_listing.json"""
+
+    def __init__(self, base_path="./UPLOADED_REPORTINGS", listing_file=None, persist_delay=1.0):
+        self.base_path = Path(base_path).absolute()
+        self.listing_file = Path(listing_file) if listing_file else self.base_path / "file_listing.json"
+
+        self._lock = threading.RLock()
+        # One rescan at a time; deltas applied while its walk runs are replayed after the swap
+        self._rescan_lock = threading.Lock()
+        self._rescan_deltas = None
+        self._structure = {}
+        self._statistics = {"total_categories": 0, "total_reports": 0, "total_files": 0}
+        self._reconcile_timer = None
+
+        # Changes mark the index dirty; a background writer coalesces them and
+        # serializes a snapshot outside _lock, so queries never wait on the JSON dump
+        self.persist_delay = persist_delay
+        self._dirty = threading.Event()
+        self._persist_lock = threading.Lock()
+        self._writer_lock = threading.Lock()
+        self._writer = None
+
+        # Query side: entry keys kept sorted for range scans, the authority of
+        # every entry, and per-folder file counts so aggregates are computed
+        # over folders rather than individual files
+        self._keys = []
+        self._authorities = {}
+        self._folder_counts = {}
+
+    def _relative_parts(self, file_path):
+        """Return the folder parts of file_path below base_path, or None if outside it"""
+        file_path = Path(file_path)
+        if not file_path.is_absolute():
+            file_path = Path.cwd() / file_path
+        try:
+            rel_path = os.path.relpath(file_path, self.base_path)
+        except ValueError:
+            return None
+        if rel_path.startswith(os.pardir):
+            return None
+        return Path(rel_path).parts
+
+    def _reset(self):
+        self._structure = {}
+        self._statistics = {"total_categories": 0, "total_reports": 0, "total_files": 0}
+        self._keys = []
+        self._authorities = {}
+        self._folder_counts = {}
+
+    def _add_entry(self, authority, category, report, year, month, filename, keep_sorted=True):
+        """
+        Insert one file into the structure and update counters; returns True if it was new.
+        With keep_sorted=False the key is appended and the caller sorts _keys afterwards.
+        """
+        if category not in self._structure:
+            self._structure[category] = {}
+            self._statistics["total_categories"] += 1
+        reports = self._structure[category]
+
+        if report not in reports:
+            reports[report] = {}
+            self._statistics["total_reports"] += 1
+        years = reports[report]
+
+        if year not in years:
+            # Initialize with all 12 months for consistency
+            years[year] = {month_key: [] for month_key in MONTH_KEYS}
+        months = years[year]
+
+        files = months.setdefault(month, [])
+        if filename in files:
+            return False
+
+        files.append(filename)
+        self._statistics["total_files"] += 1
+
+        key = _entry_key(category, report, year, month, filename)
+        if keep_sorted:
+            bisect.insort(self._keys, key)
+        else:
+            self._keys.append(key)
+        self._authorities[key] = authority or ""
+        folder = (authority or "", category, report, year, month)
+        self._folder_counts[folder] = self._folder_counts.get(folder, 0) + 1
+        return True
+
+    def _remove_entry(self, authority, category, report, year, month, filename):
+        """Remove one file and prune levels that no longer hold files; returns True if removed"""
+        try:
+            files = self._structure[category][report][year][month]
+        except KeyError:
+            return False
+        if filename not in files:
+            return False
+
+        files.remove(filename)
+        self._statistics["total_files"] -= 1
+
+        key = _entry_key(category, report, year, month, filename)
+        position = bisect.bisect_left(self._keys, key)
+        if position < len(self._keys) and self._keys[position] == key:
+            del self._keys[position]
+        self._authorities.pop(key, None)
+        folder = (authority or "", category, report, year, month)
+        remaining = self._folder_counts.get(folder, 0) - 1
+        if remaining > 0:
+            self._folder_counts[folder] = remaining
+        else:
+            self._folder_counts.pop(folder, None)
+
+        years = self._structure[category][report]
+        if not files and month not in MONTH_KEYS:
+            del years[year][month]
+        if not any(years[year].values()):
+            del years[year]
+        if not years:
+            del self._structure[category][report]
+            self._statistics["total_reports"] -= 1
+        if not self._structure[category]:
+            del self._structure[category]
+            self._statistics["total_categories"] -= 1
+        return True
+
+    def _coordinates(self, file_path):
+        """Resolve a file path to (authority, category, report, year, month, filename) or None"""
+        parts = self._relative_parts(file_path)
+        if not parts or not is_reporting_file(parts[-1]):
+            return None
+        parsed = parse_reporting_path(list(parts[:-1]))
+        if parsed is None:
+            return None
+        return parsed + (parts[-1],)
+
+    def add_file(self, file_path, persist=True):
+        """Apply a single added file as a delta; returns True if the index changed"""
+        coordinates = self._coordinates(file_path)
+        if coordinates is None:
+            return False
+
+        with self._lock:
+            self._record_delta(self._add_entry, coordinates)
+            changed = self._add_entry(*coordinates)
+            if changed and persist:
+                self.schedule_persist()
+        return changed
+
+    def remove_file(self, file_path, persist=True):
+        """Apply a single removed file as a delta; returns True if the index changed"""
+        coordinates = self._coordinates(file_path)
+        if coordinates is None:
+            return False
+
+        with self._lock:
+            self._record_delta(self._remove_entry, coordinates)
+            changed = self._remove_entry(*coordinates)
+            if changed and persist:
+                self.schedule_persist()
+        return changed
+
+    def apply_changes(self, added=(), removed=()):
+        """
+        Apply a batch of added/removed file paths and persist once
+
+        Returns:
+            int: Number of index entries that changed
+        """
+        changed = 0
+        with self._lock:
+            for file_path in removed:
+                coordinates = self._coordinates(file_path)
+                if coordinates is None:
+                    continue
+                self._record_delta(self._remove_entry, coordinates)
+                if self._remove_entry(*coordinates):
+                    changed += 1
+            for file_path in added:
+                coordinates = self._coordinates(file_path)
+                if coordinates is None:
+                    continue
+                self._record_delta(self._add_entry, coordinates)
+                if self._add_entry(*coordinates):
+                    changed += 1
+            if changed:
+                self.schedule_persist()
+        return changed
+
+    def _entry_parts(self, key):
+        """Rebuild the folder parts below base_path for an indexed entry"""
+        category, report, year, month, filename = key
+        authority = self._authorities[key]
+        if authority == "BAM":
+            return (authority, category, report, year[1], month[1], filename)
+        if authority:
+            return (authority, report, year[1], month[1], filename)
+        return (category, report, year[1], month[1], filename)
+
+    def remove_tree(self, dir_path, persist=True):
+        """Remove every indexed file below a deleted or moved-away folder"""
+        parts = self._relative_parts(dir_path)
+        if parts is None:
+            return 0
+        parts = tuple(part for part in parts if part != os.curdir)
+
+        # Narrow the scan to the category/report the folder belongs to
+        category = report = None
+        if parts and parts[0] == "BAM":
+            category = parts[1] if len(parts) > 1 else None
+            report = parts[2] if len(parts) > 2 else None
+        elif parts:
+            category = parts[0]
+            report = parts[1] if len(parts) > 1 else None
+
+        with self._lock:
+            self._record_delta(self.remove_tree, (dir_path, False))
+            if parts and parts[0] == "BAM" and category is None:
+                candidates = list(self._keys)
+            else:
+                lo, hi = self._scan_bounds(category, report, None)
+                candidates = self._keys[lo:hi]
+
+            removed = 0
+            for key in candidates:
+                entry_parts = self._entry_parts(key)
+                if entry_parts[:len(parts)] == parts:
+                    self._remove_entry(self._authorities[key] or None, *key[:2],
+                                       key[2][1], key[3][1], key[4])
+                    removed += 1
+            if removed and persist:
+                self.schedule_persist()
+        return removed
+
+    def _record_delta(self, apply, args):
+        """Remember a delta applied while a rescan walks the folder (call with _lock held)"""
+        if self._rescan_deltas is not None:
+            self._rescan_deltas.append((apply, args))
+
+    def rescan(self, persist=True):
+        """Rebuild the index from a full walk of base_path"""
+        with self._rescan_lock:
+            return self._rescan(persist)
+
+    def _rescan(self, persist):
+        if not self.base_path.exists():
+            logger.warning(f"⚠️ {self.base_path} folder not found, listing index left empty")
+            return False
+
+        with self._lock:
+            self._rescan_deltas = []
+        found = []
+        for root, dirs, files in os.walk(self.base_path):
+            if Path(root) == self.base_path:
+                continue
+            reporting_files = [file for file in files if is_reporting_file(file)]
+            if not reporting_files:
+                continue
+            parsed = parse_reporting_path(Path(os.path.relpath(root, self.base_path)).parts)
+            if parsed is None:
+                continue
+            found.extend(parsed + (file,) for file in reporting_files)
+
+        with self._lock:
+            self._reset()
+            for entry in found:
+                self._add_entry(*entry, keep_sorted=False)
+            self._keys.sort()
+
+            # The walk may have missed changes applied meanwhile: apply them again
+            deltas, self._rescan_deltas = self._rescan_deltas, None
+            for apply, args in deltas:
+                apply(*args)
+            if persist:
+                self.schedule_persist()
+
+        logger.info(f"🔍 Listing index rebuilt: {self._statistics['total_files']} files")
+        return True
+
+    def schedule_persist(self):
+        """Mark the index dirty; the background writer persists it after persist_delay"""
+        with self._writer_lock:
+            self._dirty.set()
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name='listing-writer', daemon=True)
+                self._writer.start()
+
+    def _write_loop(self):
+        while True:
+            self._dirty.wait()
+            # Let a burst of uploads or watcher events coalesce into one write
+            time.sleep(self.persist_delay)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning(f"⚠️ Could not write {self.listing_file}, will retry: {e}")
+                self._dirty.set()
+
+    def flush(self):
+        """Persist now if changes are waiting to be written"""
+        if self._dirty.is_set():
+            self.persist()
+
+    def _snapshot(self):
+        """Copy of the listing payload, taken with _lock held"""
+        structure = {
+            category: {
+                report: {year: {month: list(files) for month, files in months.items()}
+                         for year, months in years.items()}
+                for report, years in reports.items()
+            }
+            for category, reports in self._structure.items()
+        }
+        return build_listing_data(structure, self._statistics)
+
+    def persist(self):
+        """Atomically write the current index to file_listing.json"""
+        # Writers go one at a time so an older snapshot never lands after a newer one
+        with self._persist_lock:
+            with self._lock:
+                self._dirty.clear()
+                data = self._snapshot()
+            write_json_atomic(self.listing_file, data)
+
+    def get_listing(self):
+        """Return the file_listing.json payload for the current index"""
+        with self._lock:
+            return self._snapshot()
+
+    @property
+    def statistics(self):
+        with self._lock:
+            return dict(self._statistics)
+
+    def _scan_bounds(self, category, report, period_from):
+        """Narrow the sorted key list to the slice that can match the filters"""
+        if category is None:
+            return 0, len(self._keys)
+        if report is None:
+            lo = bisect.bisect_left(self._keys, (category,))
+            hi = bisect.bisect_left(self._keys, (category + "\0",))
+            return lo, hi
+
+        start = (category, report)
+        if period_from is not None:
+            year, month = period_from
+            start = (category, report, (year, str(year)), (month or 0, ""))
+        lo = bisect.bisect_left(self._keys, start)
+        hi = bisect.bisect_left(self._keys, (category, report + "\0"))
+        return lo, hi
+
+    @staticmethod
+    def _in_period(year, month, period_from, period_to):
+        period = (_period_key(year)[0], _period_key(month)[0])
+        if period_from is not None and period < (period_from[0], period_from[1] or 1):
+            return False
+        if period_to is not None and period > (period_to[0], period_to[1] or 12):
+            return False
+        return True
+
+    def query(self, authority=None, category=None, report=None, period_from=None,
+              period_to=None, prefix=None, cursor=None, limit=50):
+        """
+        Page through indexed files matching the given filters
+
+        Args:
+            authority, category, report (str): Exact-match filters
+            period_from, period_to (tuple): Inclusive (year, month) bounds; month may be None
+            prefix (str): Filename prefix filter
+            cursor (str): Cursor returned as next_cursor by the previous page
+            limit (int): Maximum number of items to return
+
+        Returns:
+            dict: items, next_cursor, total and aggregate counts for the filters
+        """
+        limit = max(1, min(int(limit), 1000))
+
+        with self._lock:
+            lo, hi = self._scan_bounds(category, report, period_from)
+            if cursor:
+                lo = max(lo, bisect.bisect_right(self._keys, decode_cursor(cursor)))
+
+            items = []
+            next_cursor = None
+            for position in range(lo, hi):
+                key = self._keys[position]
+                key_category, key_report, year, month, filename = key
+                if authority is not None and self._authorities[key] != authority:
+                    continue
+                if prefix and not filename.startswith(prefix):
+                    continue
+                if not self._in_period(year[1], month[1], period_from, period_to):
+                    continue
+                if len(items) == limit:
+                    next_cursor = encode_cursor(last_key)
+                    break
+                items.append({
+                    "authority": self._authorities[key] or None,
+                    "category": key_category,
+                    "report": key_report,
+                    "year": year[1],
+                    "month": month[1],
+                    "filename": filename
+                })
+                last_key = key
+
+            counts = self._aggregate(authority, category, report, period_from, period_to, prefix)
+
+        return {
+            "items": items,
+            "next_cursor": next_cursor,
+            "total": counts.pop("total"),
+            "counts": counts
+        }
+
+    def _aggregate(self, authority, category, report, period_from, period_to, prefix):
+        """Aggregate counts for the filters from per-folder counters"""
+        by_authority, by_category, by_year = {}, {}, {}
+        total = 0
+
+        if prefix:
+            # A filename prefix cannot be answered from folder counters
+            lo, hi = self._scan_bounds(category, report, period_from)
+            folders = {}
+            for key in self._keys[lo:hi]:
+                if key[4].startswith(prefix):
+                    folder = (self._authorities[key], key[0], key[1], key[2][1], key[3][1])
+                    folders[folder] = folders.get(folder, 0) + 1
+        else:
+            folders = self._folder_counts
+
+        for (folder_authority, folder_category, folder_report, year, month), count in folders.items():
+            if authority is not None and folder_authority != authority:
+                continue
+            if category is not None and folder_category != category:
+                continue
+            if report is not None and folder_report != report:
+                continue
+            if not self._in_period(year, month, period_from, period_to):
+                continue
+            total += count
+            authority_key = folder_authority or "LEGACY"
+            by_authority[authority_key] = by_authority.get(authority_key, 0) + count
+            by_category[folder_category] = by_category.get(folder_category, 0) + count
+            by_year[year] = by_year.get(year, 0) + count
+
+        return {
+            "total": total,
+            "by_authority": by_authority,
+            "by_category": by_category,
+            "by_year": by_year
+        }
+
+    def start_reconciliation(self, interval):
+        """Run a full rescan every `interval` seconds in a background thread"""
+        if interval <= 0:
+            return
+
+        def reconcile():
+            try:
+                self.rescan()
+            except Exception as e:
+                logger.warning(f"⚠️ Listing reconciliation failed: {e}")
+            self.start_reconciliation(interval)
+
+        self._reconcile_timer = threading.Timer(interval, reconcile)
+        self._reconcile_timer.daemon = True
+        self._reconcile_timer.start()
+
+    def stop_reconciliation(self):
+        """Cancel the pending reconciliation rescan"""
+        if self._reconcile_timer is not None:
+            self._reconcile_timer.cancel()
+            self._reconcile_timer = None
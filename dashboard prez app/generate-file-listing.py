@@ -9,6 +9,10 @@ import json
 from datetime import datetime
 import sys
 
+from file_listing_index import (
+    MONTH_KEYS, build_listing_data, is_reporting_file, parse_reporting_path, write_json_atomic
+)
+
 def scan_uploaded_reportings():
     """
     Scan the UPLOADED_REPORTINGS folder and create a file structure
@@ -35,7 +39,7 @@ def scan_uploaded_reportings():
         # Only process folders that contain actual files
         reporting_files = []
         for file in files:
-            if file.lower().endswith(('.xlsx', '.xls', '.pdf', '.docx', '.doc')):
+            if is_reporting_file(file):
                 reporting_files.append(file)
                 total_files += 1
         
@@ -48,34 +52,10 @@ def scan_uploaded_reportings():
         path_parts = rel_path.split(os.sep)
 
         # Only process folders that are at the correct depth (month level)
-        # Handle different folder structures based on authority
-        if len(path_parts) == 5:
-            authority = path_parts[0]
-
-            if authority == "BAM":
-                # BAM structure: BAM/Category/Report/Year/Month
-                category = path_parts[1]
-                report = path_parts[2]
-                year = path_parts[3]
-                month = path_parts[4]
-            else:
-                continue  # Skip unknown authorities for 5-part paths
-        elif len(path_parts) == 4:
-            authority = path_parts[0]
-            if authority in ["AMMC", "DGI"]:
-                # AMMC/DGI structure: Authority/Report/Year/Month
-                category = authority
-                report = path_parts[1]
-                year = path_parts[2]
-                month = path_parts[3]
-            else:
-                # Legacy structure: Category/Report/Year/Month
-                category = path_parts[0]
-                report = path_parts[1]
-                year = path_parts[2]
-                month = path_parts[3]
-        else:
-            continue  # Skip paths that are not at month level
+        parsed = parse_reporting_path(path_parts)
+        if parsed is None:
+            continue
+        authority, category, report, year, month = parsed
 
         # Initialize structure if needed
         if category not in file_structure:
@@ -84,10 +64,7 @@ def scan_uploaded_reportings():
             file_structure[category][report] = {}
         if year not in file_structure[category][report]:
             # Initialize with all 12 months for consistency
-            file_structure[category][report][year] = {
-                "1": [], "2": [], "3": [], "4": [], "5": [], "6": [],
-                "7": [], "8": [], "9": [], "10": [], "11": [], "12": []
-            }
+            file_structure[category][report][year] = {month_key: [] for month_key in MONTH_KEYS}
 
         # Add files to structure
         file_structure[category][report][year][month] = reporting_files
@@ -118,30 +95,12 @@ def generate_file_listing():
         return False
     
     # Create the listing data
-    listing_data = {
-        "generated": datetime.now().isoformat(),
-        "generator": "generate-file-listing-new.py",
-        "description": "Real file listing for BCP Securities Services reporting dashboard",
-        "base_path": "./UPLOADED_REPORTINGS",
-        "structure": file_structure,
-        "statistics": {
-            "total_categories": len(file_structure),
-            "total_reports": sum(len(reports) for reports in file_structure.values()),
-            "total_files": sum(
-                len(files) 
-                for category in file_structure.values()
-                for report in category.values()
-                for year in report.values()
-                for files in year.values()
-            )
-        }
-    }
+    listing_data = build_listing_data(file_structure)
     
     # Write to JSON file
     output_file = "UPLOADED_REPORTINGS/file_listing.json"
     try:
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(listing_data, f, indent=2, ensure_ascii=False)
+        write_json_atomic(output_file, listing_data)
         
         print(f"\n✅ File listing generated successfully!")
         print(f"📄 Output file: {output_file}")
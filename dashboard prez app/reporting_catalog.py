@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+ALL_REPORTINGS.json Catalog
+Loads the centralized reporting registry once, reloads it when the file
+changes on disk and precomputes the folder-name lookups used by uploads
+and by the folder-creation scripts
+"""
+
+import os
+import json
+import logging
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CATALOG_PATH = Path(__file__).parent / "ALL_REPORTINGS.json"
+
+# Used when the registry cannot be read, so BAM uploads keep their folders
+BAM_CATEGORY_FOLDERS = {
+    "I": "I___Situation_comptable_et_états_annexes",
+    "II": "II___Etats_de_synthèse_et_documents_qui_leur_sont_complémentaires",
+    "III": "III___Etats_relatifs_à_la_réglementation_prudentielle"
+}
+
+# Upload API category -> ALL_REPORTINGS.json category key for AMMC entities
+AMMC_CATEGORY_KEYS = {
+    "BCP": "AMMC_BCP",
+    "BCP2S": "AMMC_BCP2S",
+    "BANK_AL_YOUSR": "AMMC_BANK_AL_YOUSR"
+}
+
+
+def clean_folder_name(name):
+    """Make a value safe to use as a single folder name"""
+    return name.replace(' ', '_').replace('/', '_').replace('\\', '_')
+
+
+class ReportingCatalog:
+    """Read-mostly view of ALL_REPORTINGS.json, invalidated on mtime change"""
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else DEFAULT_CATALOG_PATH
+        self._lock = threading.Lock()
+        self._signature = None
+        self._data = {}
+        self._report_folders = {}
+        self._category_folders = {}
+
+    def _current_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _ensure_loaded(self):
+        """Reload the registry if the file changed since the last load"""
+        signature = self._current_signature()
+        if signature == self._signature:
+            return
+
+        with self._lock:
+            if signature == self._signature:
+                return
+            if signature is None:
+                data = {}
+            else:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            self._build_maps(data)
+            self._data = data
+            self._signature = signature
+            logger.info(f"📚 Reporting catalog loaded: {len(self._report_folders)} folder mappings")
+
+    def _build_maps(self, data):
+        """Precompute flat (authority, category, report_key) -> folderName lookups"""
+        categories = data.get('categories', {})
+        report_folders = {}
+        category_folders = {}
+
+        for category_key, category in categories.items():
+            # The upload API addresses the same registry category under
+            # different (authority, category) pairs depending on the regulator
+            if category_key in AMMC_CATEGORY_KEYS.values():
+                aliases = [("AMMC", short) for short, key in AMMC_CATEGORY_KEYS.items() if key == category_key]
+            elif category_key == "DGI":
+                aliases = [("DGI", "DGI")]
+            else:
+                aliases = [("BAM", category_key)]
+
+            for alias in aliases:
+                if alias[0] == "BAM" and category.get('folderName'):
+                    category_folders[alias] = category['folderName']
+                for report_key, reporting in category.get('reportings', {}).items():
+                    report_folders[alias + (report_key,)] = reporting.get(
+                        'folderName', clean_folder_name(report_key))
+
+        self._report_folders = report_folders
+        self._category_folders = category_folders
+
+    @staticmethod
+    def _normalize(authority, category):
+        # DGI has a single registry category whatever the caller sends
+        return (authority, "DGI") if authority == "DGI" else (authority, category)
+
+    def report_folder_name(self, authority, category, report_key):
+        """Folder name for a reporting, falling back to the cleaned report key"""
+        self._ensure_loaded()
+        key = self._normalize(authority, category) + (report_key,)
+        return self._report_folders.get(key, clean_folder_name(report_key))
+
+    def category_folder_name(self, authority, category):
+        """Folder name for a category; only BAM categories are renamed on disk"""
+        fallback = BAM_CATEGORY_FOLDERS.get(category, category) if authority == "BAM" else category
+        self._ensure_loaded()
+        return self._category_folders.get((authority, category), fallback)
+
+    def category(self, category_key):
+        """Raw registry entry for a category key (e.g. 'I', 'AMMC_BCP', 'DGI')"""
+        self._ensure_loaded()
+        return self._data.get('categories', {}).get(category_key, {})
+
+    def reportings(self, category_key):
+        """Registry reporting entries of a category, in file order"""
+        return list(self.category(category_key).get('reportings', {}).values())
+
+    def reporting_names(self, category_key):
+        """Display names of the reportings of a category, in file order"""
+        return [reporting['name'] for reporting in self.reportings(category_key)]
+
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(path=None):
+    """Return the process-wide catalog for a registry file"""
+    key = str(Path(path).absolute()) if path else str(DEFAULT_CATALOG_PATH)
+    with _catalogs_lock:
+        if key not in _catalogs:
+            _catalogs[key] = ReportingCatalog(key)
+        return _catalogs[key]
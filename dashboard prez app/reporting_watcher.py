@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+UPLOADED_REPORTINGS Filesystem Watcher
+Keeps the file listing index live for files dropped straight into the folder
+(sample scripts, backup restores, manual copies) without a full rescan
+"""
+
+import os
+import time
+import errno
+import ctypes
+import ctypes.util
+import select
+import struct
+import logging
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# inotify(7) event masks
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE |
+              IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+
+EVENT_HEADER = struct.Struct('iIII')
+
+
+class _Inotify:
+    """Minimal ctypes binding for the Linux inotify API"""
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library('c') or 'libc.so.6'
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+    def add_watch(self, path, mask):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), str(path))
+        return wd
+
+    def rm_watch(self, wd):
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def read_events(self, timeout):
+        """Yield (wd, mask, name) tuples, waiting at most `timeout` seconds"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            yield wd, mask, os.fsdecode(name)
+
+    def close(self):
+        os.close(self.fd)
+
+
+class ReportingWatcher:
+    """Apply filesystem changes under UPLOADED_REPORTINGS to a FileListingIndex"""
+
+    def __init__(self, index, debounce=1.0, poll_interval=5.0, use_inotify=True):
+        self.index = index
+        self.base_path = index.base_path
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.backend = None
+
+        self._stop = threading.Event()
+        self._thread = None
+
+        # Pending changes: path -> 'add' / 'remove' for files, 'remove_tree' for folders
+        self._pending = {}
+        self._last_event = 0.0
+        self._first_event = 0.0
+
+    def start(self):
+        """Start watching in a background thread, preferring inotify over polling"""
+        if not self.base_path.exists():
+            logger.warning(f"⚠️ {self.base_path} not found, file watcher not started")
+            return False
+
+        target = self._run_polling
+        self.backend = 'polling'
+        self._poll_baseline = None
+        if self.use_inotify:
+            try:
+                self._inotify = _Inotify()
+                self._wds = {}
+                self._watch_tree(self.base_path)
+                target = self._run_inotify
+                self.backend = 'inotify'
+            except (OSError, AttributeError) as e:
+                logger.warning(f"⚠️ inotify unavailable ({e}), falling back to polling")
+                if getattr(self, '_inotify', None) is not None:
+                    self._inotify.close()
+                    self._inotify = None
+
+        if self.backend == 'polling':
+            # Baseline taken before returning, like the inotify watches, so the
+            # caller's initial rescan cannot race with it
+            self._poll_baseline = self._list_dirs(self._snapshot_dirs())
+
+        self._thread = threading.Thread(target=target, name='reporting-watcher', daemon=True)
+        self._thread.start()
+        logger.info(f"👀 Watching {self.base_path} for changes ({self.backend})")
+        return True
+
+    def stop(self):
+        """Stop the watcher thread and flush pending changes"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    # ------------------------------------------------------------------
+    # Change batching
+    # ------------------------------------------------------------------
+
+    def _record(self, path, action):
+        now = time.monotonic()
+        if not self._pending:
+            self._first_event = now
+        self._pending[str(path)] = action
+        self._last_event = now
+
+    def _flush_due(self):
+        """A batch is applied once events go quiet, or after 10x debounce under constant load"""
+        if not self._pending:
+            return False
+        now = time.monotonic()
+        return (now - self._last_event >= self.debounce or
+                now - self._first_event >= self.debounce * 10)
+
+    def _flush(self):
+        pending, self._pending = self._pending, {}
+        added, removed = [], []
+        try:
+            for path, action in pending.items():
+                if action == 'remove_tree':
+                    self.index.remove_tree(path, persist=False)
+                elif action == 'add' and os.path.isfile(path):
+                    added.append(path)
+                else:
+                    removed.append(path)
+
+            # apply_changes schedules one write; tree removals above ride along with it
+            tree_removed = any(action == 'remove_tree' for action in pending.values())
+            changed = self.index.apply_changes(added=added, removed=removed)
+            if tree_removed and not changed:
+                self.index.schedule_persist()
+            if changed or tree_removed:
+                logger.info(f"🔄 File listing updated from {len(pending)} filesystem change(s)")
+        except Exception as e:
+            logger.warning(f"⚠️ Could not apply filesystem changes: {e}")
+
+    def _record_tree(self, dir_path):
+        """Queue every file below a folder that appeared in one go (mkdir -p, mv, restore)"""
+        for root, dirs, files in os.walk(dir_path):
+            for file in files:
+                self._record(Path(root) / file, 'add')
+
+    # ------------------------------------------------------------------
+    # inotify backend
+    # ------------------------------------------------------------------
+
+    def _watch_tree(self, dir_path):
+        for root, dirs, files in os.walk(dir_path):
+            try:
+                wd = self._inotify.add_watch(root, WATCH_MASK)
+            except OSError as e:
+                if e.errno == errno.ENOSPC:
+                    raise
+                continue
+            self._wds[wd] = Path(root)
+
+    def _unwatch_tree(self, dir_path):
+        prefix = str(dir_path) + os.sep
+        for wd, path in list(self._wds.items()):
+            if path == dir_path or str(path).startswith(prefix):
+                self._inotify.rm_watch(wd)
+                del self._wds[wd]
+
+    def _handle_event(self, wd, mask, name):
+        if mask & IN_Q_OVERFLOW:
+            # Events were dropped; only a full rescan can recover
+            logger.warning("⚠️ inotify queue overflow, rescanning archive")
+            self._pending = {}
+            self.index.rescan()
+            return
+
+        parent = self._wds.get(wd)
+        if parent is None:
+            return
+        if mask & IN_IGNORED:
+            del self._wds[wd]
+            return
+        if mask & (IN_DELETE_SELF | IN_MOVE_SELF) or not name:
+            return
+
+        path = parent / name
+        if mask & IN_ISDIR:
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                try:
+                    self._watch_tree(path)
+                except OSError as e:
+                    logger.warning(f"⚠️ Could not watch {path}: {e}")
+                self._record_tree(path)
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                self._unwatch_tree(path)
+                self._record(path, 'remove_tree')
+        elif mask & (IN_CREATE | IN_CLOSE_WRITE | IN_MOVED_TO):
+            self._record(path, 'add')
+        elif mask & (IN_DELETE | IN_MOVED_FROM):
+            self._record(path, 'remove')
+
+    def _run_inotify(self):
+        try:
+            while not self._stop.is_set():
+                for wd, mask, name in self._inotify.read_events(min(self.debounce, 1.0)):
+                    self._handle_event(wd, mask, name)
+                if self._flush_due():
+                    self._flush()
+            if self._pending:
+                self._flush()
+        except Exception as e:
+            logger.error(f"❌ File watcher stopped: {e}")
+        finally:
+            self._inotify.close()
+
+    # ------------------------------------------------------------------
+    # Polling backend
+    # ------------------------------------------------------------------
+
+    def _snapshot_dirs(self):
+        """Map every folder to its mtime; only folders whose mtime moved get listed"""
+        snapshot = {}
+        for root, dirs, files in os.walk(self.base_path):
+            try:
+                snapshot[root] = os.stat(root).st_mtime_ns
+            except OSError:
+                continue
+        return snapshot
+
+    @staticmethod
+    def _list_dirs(dir_mtimes):
+        dir_files = {}
+        for root in dir_mtimes:
+            try:
+                dir_files[root] = {entry.name for entry in os.scandir(root) if entry.is_file()}
+            except OSError:
+                dir_files[root] = set()
+        return dir_mtimes, dir_files
+
+    def _run_polling(self):
+        # Folder mtimes change whenever an entry is added, removed or renamed,
+        # so each poll stats folders and only re-lists the ones that changed
+        dir_mtimes, dir_files = self._poll_baseline
+
+        while not self._stop.wait(self.poll_interval):
+            try:
+                current = self._snapshot_dirs()
+                for root in dir_mtimes.keys() - current.keys():
+                    self._record(root, 'remove_tree')
+                    dir_files.pop(root, None)
+                for root, mtime in current.items():
+                    if dir_mtimes.get(root) == mtime:
+                        continue
+                    try:
+                        names = {entry.name for entry in os.scandir(root) if entry.is_file()}
+                    except OSError:
+                        continue
+                    previous = dir_files.get(root, set())
+                    for name in names - previous:
+                        self._record(Path(root) / name, 'add')
+                    for name in previous - names:
+                        self._record(Path(root) / name, 'remove')
+                    dir_files[root] = names
+                dir_mtimes = current
+                if self._pending:
+                    self._flush()
+            except Exception as e:
+                logger.warning(f"⚠️ File watcher poll failed: {e}")
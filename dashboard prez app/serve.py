@@ -16,7 +16,14 @@ import json
 import urllib.parse
 from pathlib import Path
 from datetime import datetime
-from email_service import send_email_api, test_connection_api
+from email_service import send_email_api, send_bulk_email_api, test_connection_api, validate_email_api
+from email_outbox import EmailOutbox, AccountRateLimiter, load_smtp_credentials
+from file_listing_index import FileListingIndex, parse_period
+from reporting_watcher import ReportingWatcher
+from reporting_catalog import clean_folder_name, get_catalog
+from static_assets import (
+    StaticAssetCache, CACHE_NO_STORE, cache_policy, choose_encoding, if_modified_since_matches
+)
 
 def setup_logging():
     """Configure logging for the application"""
@@ -50,7 +57,20 @@ def get_config():
         'REQUEST_TIMEOUT': int(os.getenv('REQUEST_TIMEOUT', 30)),
         'ENABLE_HTTPS': os.getenv('ENABLE_HTTPS', 'false').lower() == 'true',
         'SSL_CERT_PATH': os.getenv('SSL_CERT_PATH', '/app/certs/cert.pem'),
-        'SSL_KEY_PATH': os.getenv('SSL_KEY_PATH', '/app/certs/key.pem')
+        'SSL_KEY_PATH': os.getenv('SSL_KEY_PATH', '/app/certs/key.pem'),
+        'LISTING_RECONCILE_INTERVAL': int(os.getenv('LISTING_RECONCILE_INTERVAL', 3600)),
+        'WATCH_REPORTINGS': os.getenv('WATCH_REPORTINGS', 'true').lower() == 'true',
+        'WATCH_DEBOUNCE': float(os.getenv('WATCH_DEBOUNCE', 1.0)),
+        'WATCH_POLL_INTERVAL': float(os.getenv('WATCH_POLL_INTERVAL', 5.0)),
+        'EMAIL_OUTBOX_PATH': os.getenv('EMAIL_OUTBOX_PATH', str(
+            (Path('/app/data') if Path('/app/data').exists() else Path('./data')) / 'email_outbox.db')),
+        'EMAIL_OUTBOX_WORKERS': int(os.getenv('EMAIL_OUTBOX_WORKERS', 2)),
+        'EMAIL_MAX_ATTEMPTS': int(os.getenv('EMAIL_MAX_ATTEMPTS', 5)),
+        'EMAIL_RETRY_BASE': float(os.getenv('EMAIL_RETRY_BASE', 30)),
+        'EMAIL_RATE_PER_ACCOUNT': float(os.getenv('EMAIL_RATE_PER_ACCOUNT', 5)),
+        'EMAIL_RATE_BURST': float(os.getenv('EMAIL_RATE_BURST', 10)),
+        'SMTP_CREDENTIALS_FILE': os.getenv('SMTP_CREDENTIALS_FILE', str(
+            (Path('/app/data') if Path('/app/data').exists() else Path('./data')) / 'smtp_credentials.json'))
     }
 
 def main():
@@ -109,10 +129,45 @@ def main():
     for name, file in available_pages:
         logger.info(f"   🔗 {name}: http://{HOST}:{PORT}/{file}")
 
+    # Build the in-process file listing index once; uploads then apply deltas
+    # and a periodic rescan reconciles anything changed behind our back
+    listing_index = FileListingIndex(Path('UPLOADED_REPORTINGS'))
+    reporting_catalog = get_catalog(Path('ALL_REPORTINGS.json'))
+
+    # Watch the folder first so nothing dropped in during the initial scan is missed
+    if config['WATCH_REPORTINGS']:
+        reporting_watcher = ReportingWatcher(
+            listing_index,
+            debounce=config['WATCH_DEBOUNCE'],
+            poll_interval=config['WATCH_POLL_INTERVAL']
+        )
+        reporting_watcher.start()
+
+    listing_index.rescan()
+    listing_index.start_reconciliation(config['LISTING_RECONCILE_INTERVAL'])
+
+    # Emails are queued on disk and delivered by background senders
+    email_outbox = EmailOutbox(
+        config['EMAIL_OUTBOX_PATH'],
+        send_email_api,
+        workers=config['EMAIL_OUTBOX_WORKERS'],
+        max_attempts=config['EMAIL_MAX_ATTEMPTS'],
+        backoff_base=config['EMAIL_RETRY_BASE'],
+        credentials=load_smtp_credentials(config['SMTP_CREDENTIALS_FILE']),
+        rate_limiter=AccountRateLimiter(config['EMAIL_RATE_PER_ACCOUNT'], config['EMAIL_RATE_BURST'])
+    )
+    email_outbox.start()
+
+    # Load and precompress dashboard assets once; they are revalidated by ETag
+    static_cache = StaticAssetCache(Path.cwd())
+    static_cache.warm()
+
     # Enhanced HTTP Request Handler with security and logging
     class EnhancedHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
         def __init__(self, *args, **kwargs):
             self.logger = logging.getLogger(f"{__name__}.RequestHandler")
+            # Static assets set their own policy; API and data responses stay no-store
+            self.cache_control = None
             super().__init__(*args, **kwargs)
 
         def end_headers(self):
@@ -123,9 +178,12 @@ def main():
             self.send_header('X-Content-Type-Options', 'nosniff')
             self.send_header('X-Frame-Options', 'DENY')
             self.send_header('X-XSS-Protection', '1; mode=block')
-            self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate')
-            self.send_header('Pragma', 'no-cache')
-            self.send_header('Expires', '0')
+            if self.cache_control:
+                self.send_header('Cache-Control', self.cache_control)
+            else:
+                self.send_header('Cache-Control', CACHE_NO_STORE)
+                self.send_header('Pragma', 'no-cache')
+                self.send_header('Expires', '0')
             super().end_headers()
 
         def do_OPTIONS(self):
@@ -137,17 +195,30 @@ def main():
             if self.path == '/api/send-email':
                 self.handle_send_email()
                 return
+            elif self.path == '/api/send-bulk-email':
+                self.handle_send_bulk_email()
+                return
             elif self.path == '/api/test-smtp':
                 self.handle_test_smtp()
                 return
             elif self.path == '/api/upload-file':
                 self.handle_file_upload()
                 return
+            elif self.path.startswith('/api/email-outbox/requeue/'):
+                self.handle_requeue_email(self.path.rsplit('/', 1)[1])
+                return
             else:
                 self.send_error(404, "API endpoint not found")
 
+        def send_json(self, status, payload):
+            """Send a JSON API response"""
+            self.send_response(status)
+            self.send_header('Content-type', 'application/json')
+            self.end_headers()
+            self.wfile.write(json.dumps(payload, ensure_ascii=False).encode('utf-8'))
+
         def handle_send_email(self):
-            """Handle email sending API"""
+            """Handle email sending API: queue the message and return at once"""
             try:
                 # Get content length
                 content_length = int(self.headers.get('Content-Length', 0))
@@ -158,19 +229,25 @@ def main():
 
                 self.logger.info("📧 Received email send request")
 
-                # Send email using the email service
-                result = send_email_api(email_data)
+                if not validate_email_api(email_data):
+                    self.send_json(400, {
+                        'success': False,
+                        'error': 'Invalid email configuration or message data'
+                    })
+                    return
 
-                # Send response
-                self.send_response(200 if result['success'] else 500)
-                self.send_header('Content-type', 'application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps(result).encode())
+                # Queue for the background senders
+                message_id = email_outbox.enqueue(email_data)
 
-                if result['success']:
-                    self.logger.info(f"✅ Email sent successfully: {result.get('messageId', 'N/A')}")
-                else:
-                    self.logger.error(f"❌ Email sending failed: {result.get('error', 'Unknown error')}")
+                self.send_json(202, {
+                    'success': True,
+                    'queued': True,
+                    'messageId': message_id,
+                    'status': 'queued',
+                    'statusUrl': f'/api/email-status/{message_id}',
+                    'timestamp': datetime.now().isoformat()
+                })
+                self.logger.info(f"📬 Email queued: {message_id}")
 
             except json.JSONDecodeError:
                 self.send_error(400, "Invalid JSON data")
@@ -178,6 +255,68 @@ def main():
                 self.logger.error(f"❌ Error handling email request: {e}")
                 self.send_error(500, f"Internal server error: {str(e)}")
 
+        def handle_send_bulk_email(self):
+            """Handle templated bulk email API: render per recipient and queue each message"""
+            try:
+                content_length = int(self.headers.get('Content-Length', 0))
+                post_data = self.rfile.read(content_length)
+                bulk_data = json.loads(post_data.decode('utf-8'))
+
+                recipients = bulk_data.get('recipients') or []
+                self.logger.info(f"📨 Received bulk email request for {len(recipients)} recipient(s)")
+
+                result = send_bulk_email_api(bulk_data, email_outbox.enqueue_many)
+
+                # Requests rejected before queueing carry no per-recipient results
+                self.send_json(202 if 'results' in result else 400, result)
+
+            except json.JSONDecodeError:
+                self.send_error(400, "Invalid JSON data")
+            except Exception as e:
+                self.logger.error(f"❌ Error handling bulk email request: {e}")
+                self.send_error(500, f"Internal server error: {str(e)}")
+
+        def handle_email_status(self, message_id):
+            """Handle email delivery status API"""
+            status = email_outbox.get_status(message_id)
+            if status is None:
+                self.send_json(404, {'success': False, 'error': 'Unknown message id'})
+                return
+            self.send_json(200, dict(status, success=True))
+
+        def handle_dead_letters(self, query_string):
+            """Handle email dead-letter listing API"""
+            params = urllib.parse.parse_qs(query_string)
+            try:
+                limit = int(params.get('limit', ['100'])[0])
+                offset = int(params.get('offset', ['0'])[0])
+            except ValueError:
+                self.send_error(400, "Invalid limit or offset")
+                return
+            self.send_json(200, {
+                'success': True,
+                'messages': email_outbox.dead_letters(limit=limit, offset=offset),
+                'counts': email_outbox.counts()
+            })
+
+        def handle_requeue_email(self, message_id):
+            """Handle dead-letter requeue API; the body may carry {"smtp": {"auth": {...}}}"""
+            try:
+                content_length = int(self.headers.get('Content-Length', 0))
+                body = json.loads(self.rfile.read(content_length).decode('utf-8')) if content_length else {}
+                smtp_auth = (body.get('smtp') or {}).get('auth')
+                requeued = email_outbox.requeue(message_id, smtp_auth)
+            except json.JSONDecodeError:
+                self.send_error(400, "Invalid JSON data")
+                return
+            except ValueError as e:
+                self.send_json(400, {'success': False, 'error': str(e)})
+                return
+            if requeued:
+                self.send_json(202, {'success': True, 'messageId': message_id, 'status': 'queued'})
+            else:
+                self.send_json(404, {'success': False, 'error': 'No dead-lettered message with this id'})
+
         def handle_test_smtp(self):
             """Handle SMTP connection test API"""
             try:
@@ -265,58 +404,23 @@ def main():
                 import os
                 from pathlib import Path
 
-                # Clean folder names
-                def clean_folder_name(name):
-                    return name.replace(' ', '_').replace('/', '_').replace('\\', '_')
-
-                # Get category folder name based on authority
-                def get_category_folder_name(auth, cat):
-                    if auth == "BAM":
-                        category_map = {
-                            "I": "I___Situation_comptable_et_états_annexes",
-                            "II": "II___Etats_de_synthèse_et_documents_qui_leur_sont_complémentaires",
-                            "III": "III___Etats_relatifs_à_la_réglementation_prudentielle"
-                        }
-                        return category_map.get(cat, cat)
-                    return cat
-
-                # Get report folder name from ALL_REPORTINGS.json
+                # Get report folder name from the cached ALL_REPORTINGS.json catalog
                 def get_report_folder_name(auth, cat, report_key):
                     try:
-                        # Load ALL_REPORTINGS.json to get the correct folder name
-                        all_reportings_path = Path.cwd() / "ALL_REPORTINGS.json"
-                        if all_reportings_path.exists():
-                            with open(all_reportings_path, 'r', encoding='utf-8') as f:
-                                all_reportings = json.load(f)
-
-                            categories = all_reportings.get('categories', {})
-
-                            if auth == "BAM" and cat in categories:
-                                reportings = categories[cat].get('reportings', {})
-                                if report_key in reportings:
-                                    return reportings[report_key].get('folderName', clean_folder_name(report_key))
-                            elif auth == "AMMC":
-                                # Map AMMC categories
-                                ammc_category_map = {
-                                    "BCP": "AMMC_BCP",
-                                    "BCP2S": "AMMC_BCP2S",
-                                    "BANK_AL_YOUSR": "AMMC_BANK_AL_YOUSR"
-                                }
-                                ammc_category_key = ammc_category_map.get(cat)
-                                if ammc_category_key and ammc_category_key in categories:
-                                    reportings = categories[ammc_category_key].get('reportings', {})
-                                    if report_key in reportings:
-                                        return reportings[report_key].get('folderName', clean_folder_name(report_key))
-                            elif auth == "DGI" and "DGI" in categories:
-                                reportings = categories["DGI"].get('reportings', {})
-                                if report_key in reportings:
-                                    return reportings[report_key].get('folderName', clean_folder_name(report_key))
+                        return reporting_catalog.report_folder_name(auth, cat, report_key)
                     except Exception as e:
                         self.logger.warning(f"⚠️ Could not load report folder name from ALL_REPORTINGS.json: {e}")
 
                     # Fallback to cleaned report key
                     return clean_folder_name(report_key)
 
+                def get_category_folder_name(auth, cat):
+                    try:
+                        return reporting_catalog.category_folder_name(auth, cat)
+                    except Exception as e:
+                        self.logger.warning(f"⚠️ Could not load category folder name from ALL_REPORTINGS.json: {e}")
+                    return cat
+
                 # Remove data URL prefix if present
                 if file_data.startswith("data:"):
                     file_data = file_data.split(",")[1]
@@ -345,7 +449,7 @@ def main():
                 self.log_upload_event(authority, category, report, year, month, filename, str(file_path))
 
                 # Update file listing after successful upload
-                self.update_file_listing()
+                self.update_file_listing(file_path)
 
                 return {
                     'success': True,
@@ -419,38 +523,107 @@ def main():
             except Exception as e:
                 self.logger.warning(f"⚠️ Could not log upload event: {e}")
 
-        def update_file_listing(self):
-            """Update the file_listing.json after a file upload"""
+        def update_file_listing(self, file_path):
+            """Apply an uploaded file to the file listing index"""
             try:
-                import subprocess
-                import os
-                from pathlib import Path
-
-                # Get the path to the generate-file-listing.py script
-                script_path = Path.cwd() / "generate-file-listing.py"
+                if listing_index.add_file(file_path):
+                    self.logger.info("✅ File listing updated successfully")
 
-                if script_path.exists():
-                    self.logger.info("🔄 Updating file listing after upload...")
+            except Exception as e:
+                self.logger.warning(f"⚠️ Could not update file listing: {e}")
 
-                    # Run the generate-file-listing.py script
-                    result = subprocess.run(
-                        [sys.executable, str(script_path)],
-                        capture_output=True,
-                        text=True,
-                        cwd=Path.cwd()
-                    )
+        def handle_reportings_query(self, query_string):
+            """Handle paginated reporting archive query API"""
+            try:
+                params = urllib.parse.parse_qs(query_string)
+
+                def param(name):
+                    values = params.get(name)
+                    return values[0] if values and values[0] != '' else None
+
+                result = listing_index.query(
+                    authority=param('authority'),
+                    category=param('category'),
+                    report=param('report'),
+                    period_from=parse_period(param('from')),
+                    period_to=parse_period(param('to')),
+                    prefix=param('prefix'),
+                    cursor=param('cursor'),
+                    limit=int(param('limit') or 50)
+                )
+                result['success'] = True
 
-                    if result.returncode == 0:
-                        self.logger.info("✅ File listing updated successfully")
-                    else:
-                        self.logger.warning(f"⚠️ File listing update failed: {result.stderr}")
-                else:
-                    self.logger.warning("⚠️ generate-file-listing.py script not found")
+                self.send_response(200)
+                self.send_header('Content-type', 'application/json')
+                self.end_headers()
+                self.wfile.write(json.dumps(result, ensure_ascii=False).encode('utf-8'))
 
+            except ValueError as e:
+                self.send_error(400, str(e))
             except Exception as e:
-                self.logger.warning(f"⚠️ Could not update file listing: {e}")
+                self.logger.error(f"❌ Error handling reportings query: {e}")
+                self.send_error(500, f"Internal server error: {str(e)}")
+
+        def serve_static_asset(self, head_only=False):
+            """Serve a cached static asset with ETag revalidation; False if not an asset"""
+            parsed_url = urllib.parse.urlparse(self.path)
+            file_path = self.translate_path(self.path)
+            if not static_cache.is_static(file_path):
+                return False
+            asset = static_cache.get(file_path)
+            if asset is None:
+                return False
+
+            self.cache_control = cache_policy(parsed_url.path, parsed_url.query)
+            encoding = choose_encoding(self.headers.get('Accept-Encoding'), asset.variants)
+
+            if_none_match = self.headers.get('If-None-Match')
+            if if_none_match:
+                not_modified = asset.matches(if_none_match)
+            else:
+                if_modified_since = self.headers.get('If-Modified-Since')
+                not_modified = bool(if_modified_since) and if_modified_since_matches(if_modified_since, asset)
+
+            if not_modified:
+                self.send_response(304)
+            else:
+                body = asset.variants[encoding] if encoding else asset.data
+                self.send_response(200)
+                self.send_header('Content-Type', asset.content_type)
+                self.send_header('Content-Length', str(len(body)))
+                if encoding:
+                    self.send_header('Content-Encoding', encoding)
+
+            self.send_header('ETag', asset.variant_etag(encoding))
+            self.send_header('Last-Modified', asset.last_modified)
+            if asset.variants:
+                self.send_header('Vary', 'Accept-Encoding')
+            self.end_headers()
+
+            if not not_modified and not head_only:
+                self.wfile.write(body)
+            return True
+
+        def do_HEAD(self):
+            if self.serve_static_asset(head_only=True):
+                return
+            super().do_HEAD()
 
         def do_GET(self):
+            # Reporting archive query API
+            parsed_url = urllib.parse.urlparse(self.path)
+            if parsed_url.path == '/api/reportings':
+                self.handle_reportings_query(parsed_url.query)
+                return
+
+            # Email outbox APIs
+            if parsed_url.path.startswith('/api/email-status/'):
+                self.handle_email_status(parsed_url.path.rsplit('/', 1)[1])
+                return
+            if parsed_url.path == '/api/email-outbox/dead-letter':
+                self.handle_dead_letters(parsed_url.query)
+                return
+
             # Add health check endpoint
             if self.path == '/health':
                 self.send_response(200)
@@ -472,6 +645,9 @@ def main():
                 self.end_headers()
                 return
 
+            if self.serve_static_asset():
+                return
+
             super().do_GET()
 
         def log_message(self, format, *args):
@@ -489,6 +665,7 @@ def main():
     # Signal handler for graceful shutdown
     def signal_handler(signum, frame):
         logger.info(f"📡 Received signal {signum}, shutting down gracefully...")
+        listing_index.flush()
         sys.exit(0)
 
     # Register signal handlers
@@ -497,7 +674,11 @@ def main():
 
     try:
         # Create server with enhanced handler
-        with socketserver.TCPServer((HOST, PORT), EnhancedHTTPRequestHandler) as httpd:
+        # Threaded server so one slow request (upload, SMTP test) does not stall the others
+        class DashboardServer(socketserver.ThreadingTCPServer):
+            daemon_threads = True
+
+        with DashboardServer((HOST, PORT), EnhancedHTTPRequestHandler) as httpd:
 
             # Configure HTTPS if enabled
             if config['ENABLE_HTTPS']:
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+SMTP Connection Pool for the Email Service
+Keeps authenticated SMTP sessions open between sends so the TLS handshake
+and login are paid once per session instead of once per email
+"""
+
+import os
+import time
+import hashlib
+import smtplib
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 30
+
+# Hosts a request may reach without STARTTLS (local relays, the test sink); set on the server only
+PLAINTEXT_HOSTS = frozenset(
+    host.strip() for host in os.getenv('SMTP_PLAINTEXT_HOSTS', '127.0.0.1,localhost,::1').split(',')
+    if host.strip()
+)
+
+
+class PooledSession:
+    """One authenticated SMTP connection and its usage counters"""
+
+    def __init__(self, server, credential):
+        self.server = server
+        self.credential = credential
+        self.created = time.monotonic()
+        self.last_used = self.created
+        self.messages = 0
+
+
+def _credential_fingerprint(password):
+    # Sessions are reused only with the password they were opened with,
+    # without keeping another copy of the password around
+    return hashlib.sha256((password or '').encode('utf-8')).hexdigest()
+
+
+class SMTPConnectionPool:
+    """Pool of logged-in SMTP sessions keyed by (host, port, user)"""
+
+    def __init__(self, max_idle=4, max_messages=100, max_age=600.0,
+                 idle_timeout=120.0, noop_grace=1.0, timeout=DEFAULT_TIMEOUT,
+                 plaintext_hosts=PLAINTEXT_HOSTS):
+        """
+        Args:
+            max_idle (int): Idle sessions kept per (host, port, user)
+            max_messages (int): Messages sent on a session before it is recycled
+            max_age (float): Seconds after which a session is recycled
+            idle_timeout (float): Idle sessions older than this are dropped, not probed
+            noop_grace (float): Sessions used within this many seconds skip the NOOP check
+            timeout (float): Socket timeout for new connections
+            plaintext_hosts (frozenset): Hosts where 'starttls': False is honoured
+        """
+        self.max_idle = max_idle
+        self.max_messages = max_messages
+        self.max_age = max_age
+        self.idle_timeout = idle_timeout
+        self.noop_grace = noop_grace
+        self.timeout = timeout
+        self.plaintext_hosts = frozenset(plaintext_hosts)
+
+        self._lock = threading.Lock()
+        self._idle = {}
+        self.stats = {'opened': 0, 'reused': 0, 'reconnects': 0, 'closed': 0}
+
+    @staticmethod
+    def pool_key(smtp_config):
+        return (smtp_config['host'], int(smtp_config['port']), smtp_config['auth']['user'])
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _open(self, smtp_config):
+        host, port = smtp_config['host'], int(smtp_config['port'])
+        logger.info(f"📧 Connecting to SMTP server: {host}:{port}")
+        if smtp_config.get('secure', False):
+            # Use SSL (port 465)
+            server = smtplib.SMTP_SSL(host, port, timeout=self.timeout)
+        else:
+            # Use TLS (port 587)
+            server = smtplib.SMTP(host, port, timeout=self.timeout)
+            # starttls=False is only honoured for allow-listed local relays and the test sink
+            if smtp_config.get('starttls', True) or host not in self.plaintext_hosts:
+                server.starttls()
+
+        auth = smtp_config['auth']
+        logger.info(f"🔐 Authenticating as: {auth['user']}")
+        try:
+            server.login(auth['user'], auth['pass'])
+        except Exception:
+            self._close_server(server)
+            raise
+
+        self._count('opened')
+        return PooledSession(server, _credential_fingerprint(auth['pass']))
+
+    def _close_server(self, server):
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    def _close(self, session):
+        self._close_server(session.server)
+        self._count('closed')
+
+    def _expired(self, session, now):
+        return (session.messages >= self.max_messages or
+                now - session.created >= self.max_age or
+                now - session.last_used >= self.idle_timeout)
+
+    def _alive(self, session, now):
+        """NOOP-check a session unless it was used a moment ago"""
+        if now - session.last_used < self.noop_grace:
+            return True
+        try:
+            code, _ = session.server.noop()
+            return code == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def _checkout(self, smtp_config):
+        """Take a usable idle session, or open a new one"""
+        key = self.pool_key(smtp_config)
+        credential = _credential_fingerprint(smtp_config['auth']['pass'])
+
+        while True:
+            with self._lock:
+                idle = self._idle.get(key)
+                session = idle.pop() if idle else None
+            if session is None:
+                return self._open(smtp_config)
+
+            now = time.monotonic()
+            if session.credential != credential or self._expired(session, now) or not self._alive(session, now):
+                self._close(session)
+                continue
+            self._count('reused')
+            return session
+
+    def _checkin(self, smtp_config, session):
+        """Return a healthy session to the pool, closing it if the pool is full"""
+        session.last_used = time.monotonic()
+        if self._expired(session, session.last_used):
+            self._close(session)
+            return
+
+        key = self.pool_key(smtp_config)
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle:
+                idle.append(session)
+                return
+        self._close(session)
+
+    @contextmanager
+    def session(self, smtp_config):
+        """Borrow an authenticated session; it goes back to the pool unless the connection broke"""
+        session = self._checkout(smtp_config)
+        try:
+            yield session
+        except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused):
+            # A refused message leaves the connection usable once the transaction is reset
+            self._reset_or_close(smtp_config, session)
+            raise
+        except Exception:
+            self._close(session)
+            raise
+        self._checkin(smtp_config, session)
+
+    def _reset_or_close(self, smtp_config, session):
+        try:
+            session.server.rset()
+        except (smtplib.SMTPException, OSError):
+            self._close(session)
+            return
+        self._checkin(smtp_config, session)
+
+    def sendmail(self, smtp_config, from_addr, to_addrs, message):
+        """Send one message over a pooled session, reconnecting once if the server hung up"""
+        for attempt in range(2):
+            try:
+                with self.session(smtp_config) as session:
+                    session.server.sendmail(from_addr, to_addrs, message)
+                    session.messages += 1
+                    return
+            except smtplib.SMTPServerDisconnected:
+                if attempt:
+                    raise
+                self._count('reconnects')
+                logger.info("🔁 SMTP session dropped by the server, reconnecting")
+
+    def close_all(self):
+        """Quit every idle session"""
+        with self._lock:
+            sessions = [session for idle in self._idle.values() for session in idle]
+            self._idle = {}
+        for session in sessions:
+            self._close(session)
+
+    def snapshot(self):
+        """Counters plus the number of idle sessions currently held"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['idle'] = sum(len(idle) for idle in self._idle.values())
+        return stats
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Local SMTP Sink for Email Service Testing
+Accepts and discards mail like a real submission server, with optional
+latency, authentication failures and dropped connections, so the email
+service can be exercised and benchmarked without a Gmail account
+"""
+
+import sys
+import time
+import random
+import base64
+import logging
+import argparse
+import threading
+import socketserver
+
+logger = logging.getLogger(__name__)
+
+
+class SinkStats:
+    """Counters shared by every connection of a sink"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.values = {'connections': 0, 'logins': 0, 'auth_failures': 0,
+                       'messages': 0, 'recipients': 0, 'disconnects': 0}
+
+    def add(self, name, amount=1):
+        with self._lock:
+            self.values[name] += amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.values)
+
+
+class _SinkHandler(socketserver.StreamRequestHandler):
+    """One SMTP conversation; behaviour comes from the server's settings"""
+
+    def reply(self, line):
+        self.wfile.write((line + '\r\n').encode('ascii'))
+
+    def pause(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def handle(self):
+        settings = self.server.settings
+        stats = self.server.stats
+        stats.add('connections')
+
+        self.pause(settings['connect_latency'])
+        self.reply('220 localhost BCP SMTP sink ready')
+        authenticated = False
+        messages = 0
+
+        while True:
+            line = self.rfile.readline(65536)
+            if not line:
+                return
+            command = line.decode('utf-8', 'replace').strip()
+            verb = command.split(' ', 1)[0].upper()
+            self.pause(settings['latency'])
+
+            if verb in ('EHLO', 'HELO'):
+                if verb == 'EHLO':
+                    self.reply('250-localhost')
+                    self.reply('250-AUTH PLAIN LOGIN')
+                    self.reply('250 8BITMIME')
+                else:
+                    self.reply('250 localhost')
+            elif verb == 'AUTH':
+                authenticated = self._authenticate(command)
+            elif verb == 'MAIL':
+                if settings['require_auth'] and not authenticated:
+                    self.reply('530 5.7.0 Authentication required')
+                else:
+                    self.reply('250 2.1.0 OK')
+            elif verb == 'RCPT':
+                self.reply('250 2.1.5 OK')
+                stats.add('recipients')
+            elif verb == 'DATA':
+                self.reply('354 Go ahead')
+                while True:
+                    data_line = self.rfile.readline(65536)
+                    if not data_line or data_line.rstrip(b'\r\n') == b'.':
+                        break
+                if not data_line:
+                    return
+                self.pause(settings['data_latency'])
+                messages += 1
+                stats.add('messages')
+                self.reply('250 2.0.0 OK queued')
+
+                if self._should_disconnect(messages):
+                    stats.add('disconnects')
+                    return
+            elif verb in ('NOOP', 'RSET'):
+                self.reply('250 2.0.0 OK')
+            elif verb == 'QUIT':
+                self.reply('221 2.0.0 Bye')
+                return
+            elif verb == 'STARTTLS':
+                self.reply('454 4.7.0 TLS not available on the sink')
+            else:
+                self.reply('502 5.5.2 Command not implemented')
+
+    def _authenticate(self, command):
+        settings = self.server.settings
+        stats = self.server.stats
+        parts = command.split()
+        mechanism = parts[1].upper() if len(parts) > 1 else ''
+
+        if mechanism == 'PLAIN':
+            if len(parts) < 3:
+                self.reply('334 ')
+                self.rfile.readline(65536)
+        elif mechanism == 'LOGIN':
+            self.reply('334 ' + base64.b64encode(b'Username:').decode())
+            self.rfile.readline(65536)
+            self.reply('334 ' + base64.b64encode(b'Password:').decode())
+            self.rfile.readline(65536)
+        else:
+            self.reply('504 5.5.4 Unrecognized authentication type')
+            return False
+
+        if random.random() < settings['auth_failure_rate']:
+            stats.add('auth_failures')
+            self.reply('535 5.7.8 Username and Password not accepted')
+            return False
+        stats.add('logins')
+        self.reply('235 2.7.0 Accepted')
+        return True
+
+    def _should_disconnect(self, messages):
+        settings = self.server.settings
+        if settings['disconnect_after'] and messages >= settings['disconnect_after']:
+            return True
+        return random.random() < settings['disconnect_rate']
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """Threaded SMTP server that accepts every message and keeps only counters"""
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=2525, latency=0.0, connect_latency=0.0,
+                 data_latency=0.0, auth_failure_rate=0.0, disconnect_after=0,
+                 disconnect_rate=0.0, require_auth=True):
+        """
+        Args:
+            host (str): Interface to listen on
+            port (int): Port to listen on, 0 for any free port
+            latency (float): Seconds added before every command reply
+            connect_latency (float): Seconds before the greeting, like a TLS handshake
+            data_latency (float): Seconds added after each message body
+            auth_failure_rate (float): Share of logins rejected with 535
+            disconnect_after (int): Drop the connection after this many messages (0 = never)
+            disconnect_rate (float): Chance of dropping the connection after each message
+            require_auth (bool): Reject MAIL FROM before a successful login
+        """
+        super().__init__((host, port), _SinkHandler)
+        self.settings = {
+            'latency': latency,
+            'connect_latency': connect_latency,
+            'data_latency': data_latency,
+            'auth_failure_rate': auth_failure_rate,
+            'disconnect_after': disconnect_after,
+            'disconnect_rate': disconnect_rate,
+            'require_auth': require_auth
+        }
+        self.stats = SinkStats()
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def smtp_config(self, user='sink@localhost', password='sink'):
+        """SMTP settings for the email service pointing at this sink"""
+        return {
+            'host': self.server_address[0],
+            'port': self.port,
+            'secure': False,
+            'starttls': False,
+            'auth': {'user': user, 'pass': password}
+        }
+
+    def start(self):
+        """Serve in a background thread"""
+        self._thread = threading.Thread(target=self.serve_forever, name='smtp-sink', daemon=True)
+        self._thread.start()
+        logger.info(f"📭 SMTP sink listening on {self.server_address[0]}:{self.port}")
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local SMTP sink for the BCP email service')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=2525)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds per command')
+    parser.add_argument('--connect-latency', type=float, default=0.0, help='seconds before the greeting')
+    parser.add_argument('--data-latency', type=float, default=0.0, help='seconds per message body')
+    parser.add_argument('--auth-failure-rate', type=float, default=0.0)
+    parser.add_argument('--disconnect-after', type=int, default=0)
+    parser.add_argument('--disconnect-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+    sink = SMTPSink(args.host, args.port, latency=args.latency,
+                    connect_latency=args.connect_latency, data_latency=args.data_latency,
+                    auth_failure_rate=args.auth_failure_rate,
+                    disconnect_after=args.disconnect_after, disconnect_rate=args.disconnect_rate)
+    logger.info(f"📭 SMTP sink listening on {args.host}:{sink.port} "
+                f"(use secure=false, starttls=false in the SMTP settings)")
+    try:
+        sink.serve_forever()
+    except KeyboardInterrupt:
+        logger.info(f"👋 SMTP sink stopped: {sink.stats.snapshot()}")
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Static Asset Cache for the Dashboard Server
+Holds dashboard assets in memory with strong ETags and gzip/brotli variants
+compressed once, so repeat page views revalidate instead of re-downloading
+"""
+
+import os
+import re
+import gzip
+import hashlib
+import logging
+import mimetypes
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip only when brotli is not installed
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+STATIC_EXTENSIONS = {
+    '.html', '.htm', '.js', '.css', '.svg', '.png', '.jpg', '.jpeg',
+    '.gif', '.ico', '.webp', '.woff', '.woff2', '.ttf', '.map', '.txt'
+}
+COMPRESSIBLE_EXTENSIONS = {'.html', '.htm', '.js', '.css', '.svg', '.map', '.txt'}
+
+# Folders whose contents are data, never cached as static assets
+DATA_DIRECTORIES = {'UPLOADED_REPORTINGS', 'backups', 'logs', 'data'}
+
+# app.3f9a2c1e.js / logo-3f9a2c1e5b.png style content hashes in the filename
+FINGERPRINT_PATTERN = re.compile(r'[.-][0-9a-f]{8,}\.[A-Za-z0-9]+$')
+
+CACHE_IMMUTABLE = 'public, max-age=31536000, immutable'
+CACHE_REVALIDATE = 'no-cache'
+CACHE_NO_STORE = 'no-cache, no-store, must-revalidate'
+
+MIN_COMPRESS_SIZE = 1024
+MAX_CACHED_SIZE = 10 * 1024 * 1024
+
+
+class StaticAsset:
+    """One file held in memory together with its compressed variants"""
+
+    def __init__(self, path, data, signature):
+        self.path = path
+        self.signature = signature
+        self.data = data
+        self.content_type = mimetypes.guess_type(str(path))[0] or 'application/octet-stream'
+        self.etag = '"' + hashlib.sha256(data).hexdigest()[:32] + '"'
+        self.mtime = int(signature[0] // 1_000_000_000)
+        self.last_modified = formatdate(self.mtime, usegmt=True)
+
+        self.variants = {}
+        if path.suffix.lower() in COMPRESSIBLE_EXTENSIONS and len(data) >= MIN_COMPRESS_SIZE:
+            gzipped = gzip.compress(data, compresslevel=9, mtime=0)
+            if len(gzipped) < len(data):
+                self.variants['gzip'] = gzipped
+            if brotli is not None:
+                compressed = brotli.compress(data, quality=11)
+                if len(compressed) < len(data):
+                    self.variants['br'] = compressed
+
+    def variant_etag(self, encoding):
+        """Each encoding is a different representation and gets its own strong ETag"""
+        if encoding is None:
+            return self.etag
+        return self.etag[:-1] + '-' + encoding + '"'
+
+    def matches(self, if_none_match):
+        """True when an If-None-Match header names any representation of this asset"""
+        if if_none_match.strip() == '*':
+            return True
+        tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+        return any(self.variant_etag(encoding) in tags for encoding in [None, *self.variants])
+
+
+def choose_encoding(accept_encoding, variants):
+    """Pick the best precompressed variant the client accepts"""
+    if not accept_encoding or not variants:
+        return None
+
+    accepted = {}
+    for part in accept_encoding.split(','):
+        fields = part.strip().split(';')
+        coding = fields[0].strip().lower()
+        quality = 1.0
+        for param in fields[1:]:
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding] = quality
+
+    for encoding in ('br', 'gzip'):
+        quality = accepted.get(encoding, accepted.get('*', 0.0))
+        if encoding in variants and quality > 0:
+            return encoding
+    return None
+
+
+def cache_policy(rel_path, query=''):
+    """Cache-Control value for a static asset request"""
+    if FINGERPRINT_PATTERN.search(rel_path) or re.search(r'(^|&)v=', query):
+        return CACHE_IMMUTABLE
+    return CACHE_REVALIDATE
+
+
+class StaticAssetCache:
+    """In-memory cache of static assets, refreshed when files change on disk"""
+
+    def __init__(self, root):
+        self.root = Path(root).absolute()
+        self._lock = threading.Lock()
+        self._assets = {}
+
+    def is_static(self, file_path):
+        """True for asset files outside the data folders"""
+        file_path = Path(file_path)
+        if file_path.suffix.lower() not in STATIC_EXTENSIONS:
+            return False
+        try:
+            rel_parts = file_path.absolute().relative_to(self.root).parts
+        except ValueError:
+            return False
+        return not (rel_parts and rel_parts[0] in DATA_DIRECTORIES)
+
+    def get(self, file_path):
+        """Return the cached asset for a file, rebuilding it if the file changed"""
+        file_path = Path(file_path).absolute()
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        if not os.path.isfile(file_path) or stat.st_size > MAX_CACHED_SIZE:
+            return None
+
+        signature = (stat.st_mtime_ns, stat.st_size)
+        asset = self._assets.get(file_path)
+        if asset is not None and asset.signature == signature:
+            return asset
+
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        asset = StaticAsset(file_path, data, signature)
+        with self._lock:
+            self._assets[file_path] = asset
+        return asset
+
+    def warm(self):
+        """Load and precompress every static asset at the top of the served folder"""
+        total, compressed = 0, 0
+        for entry in os.scandir(self.root):
+            if entry.is_file() and self.is_static(entry.path):
+                asset = self.get(entry.path)
+                if asset is not None:
+                    total += 1
+                    compressed += bool(asset.variants)
+        encodings = 'gzip, br' if brotli is not None else 'gzip'
+        logger.info(f"🗜️ Static assets cached: {total} files, {compressed} precompressed ({encodings})")
+        return total
+
+
+def if_modified_since_matches(header_value, asset):
+    """True when an If-Modified-Since header is not older than the asset"""
+    try:
+        since = parsedate_to_datetime(header_value)
+    except (TypeError, ValueError, IndexError):
+        return False
+    if since is None:
+        return False
+    return asset.mtime <= int(since.timestamp())
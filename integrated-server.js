@@ -7,6 +7,10 @@ const xlsx = require('xlsx');
 const stringSimilarity = require('string-similarity');
 const xml2js = require('xml2js');
 
+// The catch-all below sets x-docsecure-socket-address from the TCP peer; the DocSecure
+// routes only believe that header when this process says so (not under plain `next start`)
+process.env.DOCSECURE_SOCKET_ADDRESS_HEADER = '1';
+
 // Next.js setup
 const dev = process.env.NODE_ENV !== 'production';
 const hostname = 'localhost';
@@ -3598,6 +3602,8 @@ function extractSpecificRange(sheet, range) {
 
   // Handle all other requests with Next.js
   app.all('*', (req, res) => {
+    // TCP peer for the DocSecure audit trail; replaces whatever a client sent under this name
+    req.headers['x-docsecure-socket-address'] = (req.socket.remoteAddress || '').replace(/^::ffff:/, '');
     return handle(req, res);
   });
 
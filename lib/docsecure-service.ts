@@ -0,0 +1,170 @@
+import { spawn } from 'child_process'
+import { readFileSync } from 'fs'
+import path from 'path'
+import { verifyDocSecureSession } from './docsecure-session'
+
+// Warm DocSecure process started with `python utils/docsecure/api_integration.py serve`.
+// Routes ask it first and only spawn the per-request script when it is unreachable.
+const SERVICE_URL = process.env.DOCSECURE_SERVICE_URL || 'http://127.0.0.1:8765'
+const AUTOSTART = process.env.DOCSECURE_SERVICE_AUTOSTART !== '0'
+const REQUEST_TIMEOUT_MS = 30000
+// After a failed connection, skip the service for a while instead of paying for it on every request
+const RETRY_AFTER_MS = 5000
+// Shared secret the service writes on first start; sent with every request
+const TOKEN_FILE = process.env.DOCSECURE_SERVICE_TOKEN_FILE || path.join(process.cwd(), 'docsecureDOCS', '.service-token')
+
+const scriptPath = () => path.join(process.cwd(), 'utils', 'docsecure', 'api_integration.py')
+
+let unavailableUntil = 0
+let autostarted = false
+let serviceToken = ''
+
+function readServiceToken(): string {
+  if (!serviceToken) {
+    try {
+      serviceToken = readFileSync(TOKEN_FILE, 'utf8').trim()
+    } catch (error) {
+      // Not written yet: the service has never started
+      serviceToken = ''
+    }
+  }
+  return serviceToken
+}
+
+function startService() {
+  if (!AUTOSTART || autostarted) return
+  autostarted = true
+
+  for (const cmd of ['python', 'python3', 'py']) {
+    try {
+      const child = spawn(cmd, [scriptPath(), 'serve'], {
+        cwd: process.cwd(),
+        detached: true,
+        stdio: 'ignore'
+      })
+      child.on('error', () => {
+        // Not on this machine; the next request tries again through the fallback
+        autostarted = false
+      })
+      child.unref()
+      console.log(`Starting DocSecure service with ${cmd}`)
+      return
+    } catch (error) {
+      continue
+    }
+  }
+  autostarted = false
+}
+
+/**
+ * Send a raw request to the warm service, e.g. to stream a file back to the browser.
+ * Resolves to null when the service cannot be reached.
+ */
+export async function fetchDocSecureService(pathname: string, init: RequestInit = {}): Promise<Response | null> {
+  if (Date.now() < unavailableUntil) return null
+
+  const headers = new Headers(init.headers)
+  headers.set('X-DocSecure-Token', readServiceToken())
+  let response: Response
+  try {
+    response = await fetch(`${SERVICE_URL}${pathname}`, {
+      ...init,
+      headers,
+      signal: AbortSignal.timeout(REQUEST_TIMEOUT_MS)
+    })
+  } catch (error) {
+    unavailableUntil = Date.now() + RETRY_AFTER_MS
+    startService()
+    return null
+  }
+
+  if (response.status === 401) {
+    // Token missing or replaced since it was read: read it again next time, use the script meanwhile
+    console.error(`DocSecure service rejected the token from ${TOKEN_FILE}`)
+    serviceToken = ''
+    return null
+  }
+  return response
+}
+
+async function request(pathname: string, init: RequestInit): Promise<any | null> {
+  const response = await fetchDocSecureService(pathname, init)
+  if (!response) return null
+
+  try {
+    return await response.json()
+  } catch (error) {
+    return null
+  }
+}
+
+/**
+ * Run an api_integration.py action on the warm service.
+ * Resolves to null when the service cannot be reached, so the caller can spawn the script instead.
+ */
+export function callDocSecureService(action: string, params: Record<string, any> = {}): Promise<any | null> {
+  return request('/rpc', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ action, params })
+  })
+}
+
+/**
+ * Store an upload through the warm service, sending the file bytes as the request body.
+ * Resolves to null when the service cannot be reached.
+ */
+export function uploadToDocSecureService(
+  buffer: Buffer,
+  fileName: string,
+  title: string,
+  category: string,
+  description: string
+): Promise<any | null> {
+  const query = new URLSearchParams({ filename: fileName, title, category, description })
+  return request(`/upload?${query}`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/octet-stream' },
+    body: buffer
+  })
+}
+
+// Set by integrated-server.js / server.js from the TCP peer address, replacing any value a client sent.
+// Those servers also set DOCSECURE_SOCKET_ADDRESS_HEADER; without it (e.g. `next start`) nothing
+// overwrites the header, so a client could forge it and it is ignored
+export const SOCKET_ADDRESS_HEADER = 'x-docsecure-socket-address'
+// Reverse proxies (comma-separated addresses) whose X-Forwarded-For entries are believed
+const TRUSTED_PROXIES = (process.env.DOCSECURE_TRUSTED_PROXIES || '')
+  .split(',').map((address) => address.trim()).filter(Boolean)
+
+function clientAddress(headers: Headers): string {
+  if (process.env.DOCSECURE_SOCKET_ADDRESS_HEADER !== '1') return ''
+  let address = headers.get(SOCKET_ADDRESS_HEADER) || ''
+  const forwarded = (headers.get('x-forwarded-for') || '')
+    .split(',').map((entry) => entry.trim()).filter(Boolean)
+  // Step back through the hops our own proxies appended; the first other address is the client
+  while (TRUSTED_PROXIES.includes(address) && forwarded.length) {
+    address = forwarded.pop() as string
+  }
+  return address
+}
+
+/**
+ * Who a view or download is logged for: the admin of a verified session (else anonymous) and the client address.
+ * Passed to the service with each access so the audit trail names the reader.
+ */
+export function docSecureAccessor(headers: Headers): { actor: string; client: string } {
+  const user = verifyDocSecureSession(headers)
+  return { actor: user ? user.username : 'anonymous', client: clientAddress(headers) }
+}
+
+/**
+ * Request headers naming the accessor for the service's /files and /preview endpoints
+ */
+export function docSecureAccessHeaders(headers: Headers): Record<string, string> {
+  const { actor, client } = docSecureAccessor(headers)
+  return {
+    'X-DocSecure-Actor': encodeURIComponent(actor),
+    'X-DocSecure-Client': encodeURIComponent(client)
+  }
+}
@@ -0,0 +1,65 @@
+import { createHmac, randomBytes, timingSafeEqual } from 'crypto'
+
+// DocSecure admin session: the cookie holds "username:role:expiry" signed with a server secret,
+// so the routes can trust who is signed in without a session store
+export const SESSION_COOKIE = 'docsecure-admin-session'
+export const SESSION_MAX_AGE = 86400
+
+export interface DocSecureUser {
+  username: string
+  role: string
+}
+
+// Production requires DOCSECURE_SESSION_SECRET. In development a random secret is kept on
+// globalThis so every route bundle signs with the same one; sessions end when the server restarts.
+const globalSecret = globalThis as typeof globalThis & { docSecureSessionSecret?: string }
+
+function sessionSecret(): string {
+  if (process.env.DOCSECURE_SESSION_SECRET) return process.env.DOCSECURE_SESSION_SECRET
+  if (process.env.NODE_ENV === 'production') {
+    throw new Error('DOCSECURE_SESSION_SECRET must be set in production to sign admin sessions')
+  }
+  if (!globalSecret.docSecureSessionSecret) {
+    console.warn('DOCSECURE_SESSION_SECRET is not set: using a random secret, sessions end on restart')
+    globalSecret.docSecureSessionSecret = randomBytes(32).toString('hex')
+  }
+  return globalSecret.docSecureSessionSecret
+}
+
+function sign(payload: string): string {
+  return createHmac('sha256', sessionSecret()).update(payload).digest('base64url')
+}
+
+export function parseCookies(header: string | null): Record<string, string> {
+  const cookies: Record<string, string> = {}
+  for (const cookie of (header || '').split(';')) {
+    const [name, ...value] = cookie.trim().split('=')
+    if (name) cookies[name] = value.join('=')
+  }
+  return cookies
+}
+
+/**
+ * Value of the session cookie for a user who just signed in
+ */
+export function createSessionToken(user: DocSecureUser): string {
+  const expires = Math.floor(Date.now() / 1000) + SESSION_MAX_AGE
+  const payload = Buffer.from(`${user.username}:${user.role}:${expires}`).toString('base64url')
+  return `${payload}.${sign(payload)}`
+}
+
+/**
+ * The signed-in admin, or null when the session cookie is missing, forged or expired
+ */
+export function verifyDocSecureSession(headers: Headers): DocSecureUser | null {
+  const [payload, signature] = (parseCookies(headers.get('cookie'))[SESSION_COOKIE] || '').split('.')
+  if (!payload || !signature) return null
+
+  const expected = Buffer.from(sign(payload))
+  const given = Buffer.from(signature)
+  if (expected.length !== given.length || !timingSafeEqual(expected, given)) return null
+
+  const [username, role, expires] = Buffer.from(payload, 'base64url').toString('utf8').split(':')
+  if (!username || !role || Number(expires) * 1000 < Date.now()) return null
+  return { username, role }
+}
@@ -0,0 +1,497 @@
+#!/usr/bin/env python3
+"""
+DOC Secure Benchmark
+Synthesizes a large archive (10k to 1M documents plus real files on local
+disk), measures the DocSecureDatabase operations behind the API routes and
+writes a JSON report that can be compared between runs
+
+    python scripts/benchmark_docsecure.py --documents=100000
+    python scripts/benchmark_docsecure.py --documents=1000000 --path=/data/bench --keep
+    python scripts/benchmark_docsecure.py --compare=before.json --output=after.json
+
+The archive lives in a scratch directory, never in docsecureDOCS/.
+"""
+
+import io
+import os
+import sys
+import json
+import math
+import time
+import random
+import shutil
+import sqlite3
+import argparse
+import platform
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add the utils directory to the Python path
+current_dir = Path(__file__).parent
+project_root = current_dir.parent
+utils_dir = project_root / "utils" / "docsecure"
+sys.path.append(str(utils_dir))
+
+from database import DocSecureDatabase
+
+REPORT_VERSION = 1
+SEED_BATCH = 5000
+
+# Extensions with the share they have in a typical archive
+EXTENSIONS = [('.pdf', 0.6), ('.docx', 0.25), ('.xlsx', 0.1), ('.pptx', 0.05)]
+# Leading bytes so the files look like what they claim to be
+MAGIC = {'.pdf': b'%PDF-1.4\n', '.docx': b'PK\x03\x04', '.xlsx': b'PK\x03\x04', '.pptx': b'PK\x03\x04'}
+# File sizes: log-normal around 300 KB, clamped to what the archive accepts
+MEDIAN_FILE_BYTES = 300 * 1024
+MIN_FILE_BYTES = 8 * 1024
+MAX_FILE_BYTES = 20 * 1024 * 1024
+
+# Frequent domain words; titles also get rare words, so searches cover both ends
+COMMON_WORDS = [
+    'procédure', 'contrôle', 'risque', 'liquidité', 'conformité', 'crédit', 'marché', 'client',
+    'compte', 'ouverture', 'calcul', 'déclaration', 'ratio', 'fonds', 'propres', 'limites',
+    'indicateurs', 'gestion', 'politique', 'sécurité', 'données', 'trading', 'système', 'note',
+    'interne', 'guide', 'utilisation', 'cartographie', 'reporting', 'audit', 'blanchiment',
+    'capitaux', 'opérations', 'règlement', 'trésorerie', 'change', 'taux', 'garanties',
+]
+RARE_WORD_COUNT = 20000
+DEPARTMENTS = ['Conformité', 'Risques', 'Trésorerie', 'Opérations', 'Juridique', 'Informatique']
+
+# Mixed read workload of the concurrency test: operation -> weight
+READ_MIX = [('get_by_id', 0.4), ('list_category', 0.3), ('search', 0.2), ('stats', 0.1)]
+
+
+def _rare_word(rng: random.Random) -> str:
+    return f"ref{rng.randrange(RARE_WORD_COUNT):05d}"
+
+
+def _weighted(rng: random.Random, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights)[0]
+
+
+def _file_size(rng: random.Random) -> int:
+    size = int(rng.lognormvariate(0, 1) * MEDIAN_FILE_BYTES)
+    return max(MIN_FILE_BYTES, min(size, MAX_FILE_BYTES))
+
+
+def _file_bytes(rng: random.Random, extension: str, unique: bool = False) -> bytes:
+    """Random content of a typical size; unique content differs from every earlier run's"""
+    token = f"{time.time_ns()}-{rng.random()}".encode('ascii') if unique else b''
+    return MAGIC[extension] + token + rng.randbytes(_file_size(rng))
+
+
+def _title(rng: random.Random) -> str:
+    words = rng.sample(COMMON_WORDS, rng.randint(2, 5)) + [_rare_word(rng)]
+    rng.shuffle(words)
+    return ' '.join(words).capitalize()
+
+
+def _percentile(ordered, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples, elapsed: float = None) -> dict:
+    """Latency percentiles in milliseconds and throughput of a list of durations in seconds"""
+    ordered = sorted(samples)
+    total = elapsed if elapsed is not None else sum(ordered)
+    return {
+        'count': len(ordered),
+        'mean_ms': round(sum(ordered) / len(ordered) * 1000, 3) if ordered else 0,
+        'p50_ms': round(_percentile(ordered, 0.50) * 1000, 3),
+        'p90_ms': round(_percentile(ordered, 0.90) * 1000, 3),
+        'p99_ms': round(_percentile(ordered, 0.99) * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3) if ordered else 0,
+        'ops_per_second': round(len(ordered) / total, 1) if total else 0
+    }
+
+
+class Benchmark:
+    """Seeds a scratch archive and times DocSecureDatabase operations against it"""
+
+    def __init__(self, path: Path, documents: int, files: int, seed: int):
+        self.path = path
+        self.documents = documents
+        self.files = min(files, documents)
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.db = DocSecureDatabase(str(path))
+        self.categories = list(self.db.categories.keys())
+        self.max_id = 0
+        # Documents added by the timed uploads, removed again by the timed deletes
+        self.uploaded = []
+
+    # ------------------------------------------------------------------
+    # Seeding
+    # ------------------------------------------------------------------
+
+    def _existing(self) -> int:
+        return self.db._db.connection().execute('SELECT COUNT(*) FROM documents').fetchone()[0]
+
+    def seed_archive(self) -> dict:
+        """
+        Store a pool of real files through ingest_stream, then add the remaining
+        rows in bulk, each referencing one of the pooled objects. Every row goes
+        through the same triggers (search index, statistics, extraction queue)
+        as an upload.
+        """
+        existing = self._existing()
+        if existing >= self.documents:
+            self.max_id = self._max_id()
+            return {'reused': True, 'documents': existing}
+
+        started = time.perf_counter()
+        pool = []
+        for i in range(self.files):
+            extension = _weighted(self.rng, EXTENSIONS)
+            success, message, document_id = self.db.ingest_stream(
+                io.BytesIO(_file_bytes(self.rng, extension)), f"seed_{i:05d}{extension}",
+                _title(self.rng), self.rng.choice(self.categories), 'Document de référence'
+            )
+            if not success:
+                raise RuntimeError(f"Seeding failed: {message}")
+            pool.append(document_id)
+        files_seconds = time.perf_counter() - started
+
+        conn = self.db._db.connection()
+        objects = conn.execute(
+            f"SELECT file_hash, file_size, file_path, original_filename, mime_type FROM documents "
+            f"WHERE id IN ({','.join('?' * len(pool))})", pool
+        ).fetchall()
+
+        # Upload dates spread over three years, oldest first like a real archive
+        remaining = self.documents - self._existing()
+        start_date = datetime.now() - timedelta(days=3 * 365)
+        step = timedelta(days=3 * 365) / max(remaining, 1)
+        rows_started = time.perf_counter()
+        for batch_start in range(0, remaining, SEED_BATCH):
+            rows = []
+            references = {}
+            for i in range(batch_start, min(batch_start + SEED_BATCH, remaining)):
+                file_hash, file_size, file_path, original_filename, mime_type = self.rng.choice(objects)
+                uploaded = (start_date + step * i).strftime('%Y-%m-%d %H:%M:%S')
+                metadata = {
+                    'department': self.rng.choice(DEPARTMENTS),
+                    'version': f"{self.rng.randint(1, 9)}.{self.rng.randint(0, 9)}"
+                }
+                description = ' '.join(self.rng.sample(COMMON_WORDS, 6) + [_rare_word(self.rng)])
+                rows.append((
+                    _title(self.rng), original_filename, f"bench_{i}_{original_filename}",
+                    self.rng.choice(self.categories), description, file_size, file_hash, mime_type,
+                    uploaded, uploaded, file_path, json.dumps(metadata)
+                ))
+                references[file_hash] = references.get(file_hash, 0) + 1
+            with self.db._db.transaction() as conn:
+                conn.executemany('''
+                    INSERT INTO documents
+                    (title, original_filename, stored_filename, category, description, file_size,
+                     file_hash, mime_type, upload_date, last_modified, file_path, metadata)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', rows)
+                conn.executemany('UPDATE blobs SET refcount = refcount + ? WHERE file_hash = ?',
+                                 [(count, file_hash) for file_hash, count in references.items()])
+            print(f"   seeded {min(batch_start + SEED_BATCH, remaining) + self.files}/{self.documents}",
+                  end='\r', flush=True)
+        print()
+        rows_seconds = time.perf_counter() - rows_started
+
+        self.max_id = self._max_id()
+        conn = self.db._db.connection()
+        conn.execute('PRAGMA optimize')
+        return {
+            'reused': False,
+            'documents': self._existing(),
+            'files': len(objects),
+            'files_bytes': sum(row[1] for row in objects),
+            'files_seconds': round(files_seconds, 2),
+            'rows_seconds': round(rows_seconds, 2),
+            'rows_per_second': round(remaining / rows_seconds, 1) if rows_seconds else 0
+        }
+
+    def _max_id(self) -> int:
+        return self.db._db.connection().execute('SELECT MAX(id) FROM documents').fetchone()[0] or 0
+
+    def database_size(self) -> int:
+        return sum(
+            path.stat().st_size for path in self.path.glob('metadata.db*') if path.is_file()
+        )
+
+    # ------------------------------------------------------------------
+    # Operations
+    # ------------------------------------------------------------------
+
+    def op_get_by_id(self, db, rng):
+        db.get_document_by_id(rng.randint(1, self.max_id))
+
+    def op_list_recent(self, db, rng):
+        db.get_documents_page(limit=50, include_total=True)
+
+    def op_list_category(self, db, rng):
+        db.get_documents_page(category=rng.choice(self.categories), limit=50, include_total=True)
+
+    def op_list_metadata(self, db, rng):
+        db.get_documents_page(metadata_filters=[f"department={rng.choice(DEPARTMENTS)}"], limit=50)
+
+    def op_search(self, db, rng):
+        # Half the searches hit a frequent word, half a rare reference
+        term = rng.choice(COMMON_WORDS) if rng.random() < 0.5 else _rare_word(rng)
+        db.get_documents(search_term=term, limit=50)
+
+    def op_search_common(self, db, rng):
+        db.get_documents(search_term=rng.choice(COMMON_WORDS), limit=50)
+
+    def op_search_rare(self, db, rng):
+        db.get_documents(search_term=_rare_word(rng), limit=50)
+
+    def op_stats(self, db, rng):
+        db.get_statistics()
+
+    def measure(self, name: str, iterations: int, warmup: int = 5) -> dict:
+        operation = getattr(self, f"op_{name}")
+        rng = random.Random(f"{self.seed}-{name}")
+        for _ in range(warmup):
+            operation(self.db, rng)
+        samples = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            operation(self.db, rng)
+            samples.append(time.perf_counter() - started)
+        return summarize(samples)
+
+    def measure_list_deep(self, pages: int = 20) -> dict:
+        """Follow next_cursor through a category, timing each page"""
+        samples = []
+        for category in self.categories:
+            cursor = None
+            for _ in range(pages):
+                started = time.perf_counter()
+                page = self.db.get_documents_page(category=category, cursor=cursor, limit=50)
+                samples.append(time.perf_counter() - started)
+                cursor = page['next_cursor']
+                if cursor is None:
+                    break
+        return summarize(samples)
+
+    def measure_uploads(self, iterations: int) -> dict:
+        """New content each time: hash, write, rename into the store and insert"""
+        rng = random.Random(f"{self.seed}-upload")
+        samples = []
+        uploaded_bytes = 0
+        for i in range(iterations):
+            extension = _weighted(rng, EXTENSIONS)
+            data = _file_bytes(rng, extension, unique=True)
+            started = time.perf_counter()
+            success, message, document_id = self.db.ingest_stream(
+                io.BytesIO(data), f"upload_{i:05d}{extension}", _title(rng), rng.choice(self.categories)
+            )
+            samples.append(time.perf_counter() - started)
+            if not success:
+                raise RuntimeError(f"Upload failed: {message}")
+            uploaded_bytes += len(data)
+            self.uploaded.append(document_id)
+        result = summarize(samples)
+        result['mb_per_second'] = round(uploaded_bytes / 1024 / 1024 / sum(samples), 1) if samples else 0
+        return result
+
+    def measure_deletes(self) -> dict:
+        """
+        Delete what measure_uploads added, which also removes each file from the
+        store, so a reused archive keeps its size from run to run
+        """
+        samples = []
+        for document_id in self.uploaded:
+            started = time.perf_counter()
+            self.db.delete_document(document_id)
+            samples.append(time.perf_counter() - started)
+        self.uploaded = []
+        return summarize(samples)
+
+    # ------------------------------------------------------------------
+    # Concurrency
+    # ------------------------------------------------------------------
+
+    def measure_readers(self, readers: int, duration: float, writer: bool) -> dict:
+        """
+        Mixed reads (READ_MIX) from `readers` threads for `duration` seconds,
+        optionally while one thread keeps uploading
+        """
+        stop = threading.Event()
+        samples = [[] for _ in range(readers)]
+        write_samples = []
+        written = []
+        errors = []
+
+        def read_loop(index):
+            # One instance per thread: each thread gets its own SQLite connection
+            db = DocSecureDatabase(str(self.path))
+            rng = random.Random(f"{self.seed}-reader-{readers}-{index}")
+            try:
+                while not stop.is_set():
+                    name = _weighted(rng, READ_MIX)
+                    operation = getattr(self, f"op_{name}")
+                    started = time.perf_counter()
+                    operation(db, rng)
+                    samples[index].append((name, time.perf_counter() - started))
+            except Exception as e:
+                errors.append(f"reader {index}: {e}")
+
+        def write_loop():
+            db = DocSecureDatabase(str(self.path))
+            rng = random.Random(f"{self.seed}-writer-{readers}")
+            i = 0
+            while not stop.is_set():
+                extension = _weighted(rng, EXTENSIONS)
+                data = _file_bytes(rng, extension, unique=True)
+                started = time.perf_counter()
+                success, message, document_id = db.ingest_stream(
+                    io.BytesIO(data), f"concurrent_{readers}_{i}{extension}", _title(rng),
+                    rng.choice(self.categories)
+                )
+                write_samples.append(time.perf_counter() - started)
+                if success:
+                    written.append(document_id)
+                else:
+                    errors.append(f"writer: {message}")
+                i += 1
+
+        threads = [threading.Thread(target=read_loop, args=(i,)) for i in range(readers)]
+        if writer:
+            threads.append(threading.Thread(target=write_loop))
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        for document_id in written:
+            self.db.delete_document(document_id)
+
+        reads = [sample for thread_samples in samples for sample in thread_samples]
+        result = {'readers': readers, 'writer': writer,
+                  **summarize([duration for _, duration in reads], elapsed)}
+        # The mix is dominated by its slowest operation; show each one too
+        result['by_operation'] = {
+            name: summarize([duration for operation, duration in reads if operation == name], elapsed)
+            for name, _ in READ_MIX
+        }
+        if writer:
+            result['writes'] = summarize(write_samples, elapsed)
+        if errors:
+            result['errors'] = errors[:10]
+        return result
+
+
+def compare(previous: dict, current: dict):
+    """Print p50/p99 changes of every operation both reports measured"""
+    print(f"\n📊 Compared with {previous.get('started_at')} "
+          f"({previous.get('config', {}).get('documents')} documents)")
+    print(f"   {'operation':<16} {'p50 ms':>20} {'p99 ms':>20}")
+    for name, result in current['operations'].items():
+        before = previous.get('operations', {}).get(name)
+        if not before:
+            continue
+        cells = []
+        for key in ('p50_ms', 'p99_ms'):
+            change = (result[key] - before[key]) / before[key] * 100 if before[key] else 0
+            cells.append(f"{before[key]:.2f} → {result[key]:.2f} ({change:+.0f}%)")
+        print(f"   {name:<16} {cells[0]:>20} {cells[1]:>20}")
+    previous_readers = {(r['readers'], r['writer']): r for r in previous.get('concurrency', [])}
+    for result in current.get('concurrency', []):
+        before = previous_readers.get((result['readers'], result['writer']))
+        if before:
+            label = f"{result['readers']} readers" + (' + writer' if result['writer'] else '')
+            print(f"   {label:<16} {before['ops_per_second']:>9} → {result['ops_per_second']} ops/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the DOC Secure database layer')
+    parser.add_argument('--documents', type=int, default=10000, help='Rows in the archive (10k to 1M)')
+    parser.add_argument('--files', type=int, default=200, help='Distinct files stored on disk')
+    parser.add_argument('--iterations', type=int, default=500, help='Samples per read operation')
+    parser.add_argument('--uploads', type=int, default=100, help='Timed uploads, deleted again by the timed deletes')
+    parser.add_argument('--readers', default='1,2,4,8', help='Reader thread counts for the concurrency test')
+    parser.add_argument('--duration', type=float, default=5.0, help='Seconds per concurrency level')
+    parser.add_argument('--writer', action='store_true', help='Keep one upload thread busy during the concurrency test')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed, for comparable runs')
+    parser.add_argument('--path', help='Archive directory; an archive already seeded there is reused')
+    parser.add_argument('--keep', action='store_true', help='Keep the archive afterwards')
+    parser.add_argument('--output', help='Report file (default: docsecure-benchmark-<timestamp>.json)')
+    parser.add_argument('--compare', help='Earlier report to compare with')
+    args = parser.parse_args()
+
+    path = Path(args.path) if args.path else Path(tempfile.mkdtemp(prefix='docsecure-bench-'))
+    if path.resolve() == (project_root / 'docsecureDOCS').resolve():
+        print("❌ Refusing to benchmark the live archive; choose another --path")
+        sys.exit(1)
+    path.mkdir(parents=True, exist_ok=True)
+
+    print("⏱️  DOC Secure Benchmark")
+    print("=" * 50)
+    print(f"📁 Archive: {path}")
+    report = {
+        'version': REPORT_VERSION,
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'environment': {
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()
+        },
+        'config': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')}
+    }
+
+    try:
+        benchmark = Benchmark(path, args.documents, args.files, args.seed)
+        print(f"🌱 Seeding {args.documents} documents ({benchmark.files} files)...")
+        report['seed'] = benchmark.seed_archive()
+        report['seed']['database_bytes'] = benchmark.database_size()
+
+        operations = {}
+        for name in ('get_by_id', 'list_recent', 'list_category', 'list_metadata',
+                     'search_common', 'search_rare', 'stats'):
+            print(f"🔍 {name}...")
+            operations[name] = benchmark.measure(name, args.iterations)
+        print("🔍 list_deep...")
+        operations['list_deep'] = benchmark.measure_list_deep()
+        print("📤 upload...")
+        operations['upload'] = benchmark.measure_uploads(args.uploads)
+        print("🗑️  delete...")
+        operations['delete'] = benchmark.measure_deletes()
+        report['operations'] = operations
+
+        report['concurrency'] = []
+        for readers in [int(count) for count in args.readers.split(',') if count.strip()]:
+            print(f"👥 {readers} concurrent readers{' + writer' if args.writer else ''}...")
+            report['concurrency'].append(benchmark.measure_readers(readers, args.duration, args.writer))
+        report['finished_at'] = datetime.now().isoformat(timespec='seconds')
+    finally:
+        if not args.keep and not args.path:
+            shutil.rmtree(path, ignore_errors=True)
+
+    output = Path(args.output or f"docsecure-benchmark-{datetime.now():%Y%m%d-%H%M%S}.json")
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding='utf-8')
+
+    print(f"\n   {'operation':<16} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'ops/s':>10}")
+    for name, result in report['operations'].items():
+        print(f"   {name:<16} {result['p50_ms']:>9.2f} {result['p90_ms']:>9.2f} "
+              f"{result['p99_ms']:>9.2f} {result['ops_per_second']:>10}")
+    for result in report['concurrency']:
+        label = f"{result['readers']} readers" + (' + writer' if result['writer'] else '')
+        print(f"   {label:<16} {result['p50_ms']:>9.2f} {result['p90_ms']:>9.2f} "
+              f"{result['p99_ms']:>9.2f} {result['ops_per_second']:>10}")
+
+    if args.compare:
+        compare(json.loads(Path(args.compare).read_text(encoding='utf-8')), report)
+    print(f"\n✅ Report written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+DOC Secure Blob Store Test Script
+Checks that deleting documents releases stored files correctly when legacy
+documents (files in category folders) and object-store documents share content
+"""
+
+import sys
+import shutil
+import tempfile
+from pathlib import Path
+
+# Add the utils directory to the Python path
+current_dir = Path(__file__).parent
+project_root = current_dir.parent
+utils_dir = project_root / "utils" / "docsecure"
+sys.path.append(str(utils_dir))
+
+from database import DocSecureDatabase
+
+CONTENT = b'%PDF-1.4\nblob store regression\n' * 64
+
+
+def _legacy_document(db, content: bytes, title: str) -> int:
+    """Insert a row the way uploads were stored before the object store: in its category folder"""
+    upload_path = Path(tempfile.mkdtemp()) / 'legacy.pdf'
+    upload_path.write_bytes(content)
+    success, message, document_id = db.upload_document(str(upload_path), title, 'Procédures')
+    shutil.rmtree(upload_path.parent)
+    assert success, message
+
+    conn = db._db.connection()
+    file_hash, object_path = conn.execute(
+        'SELECT file_hash, file_path FROM documents WHERE id = ?', (document_id,)
+    ).fetchone()
+    legacy_path = f"procedures/legacy_{document_id}.pdf"
+    with db._db.transaction() as conn:
+        (db.base_path / object_path).rename(db.base_path / legacy_path)
+        conn.execute('UPDATE documents SET file_path = ? WHERE id = ?', (legacy_path, document_id))
+        conn.execute('DELETE FROM blobs WHERE file_hash = ?', (file_hash,))
+    return document_id
+
+
+def _upload(db, content: bytes, title: str) -> int:
+    upload_path = Path(tempfile.mkdtemp()) / 'upload.pdf'
+    upload_path.write_bytes(content)
+    success, message, document_id = db.upload_document(str(upload_path), title, 'Politiques')
+    shutil.rmtree(upload_path.parent)
+    assert success, message
+    return document_id
+
+
+def _file_path(db, document_id: int) -> Path:
+    row = db._db.connection().execute('SELECT file_path FROM documents WHERE id = ?', (document_id,)).fetchone()
+    return db.base_path / row[0]
+
+
+def test_delete_legacy_keeps_object():
+    """Deleting a legacy document leaves the object-store copy of the same content alone"""
+    print("🔧 Deleting a legacy document that shares content with an upload...")
+    base_path = Path(tempfile.mkdtemp(prefix='docsecure-test-'))
+    try:
+        db = DocSecureDatabase(str(base_path))
+        legacy_id = _legacy_document(db, CONTENT, 'Ancienne procédure')
+        legacy_path = _file_path(db, legacy_id)
+        upload_id = _upload(db, CONTENT, 'Nouvelle politique')
+        object_path = _file_path(db, upload_id)
+
+        success, message = db.delete_document(legacy_id)
+        assert success, message
+        assert object_path.exists(), "the upload's stored object was removed"
+        assert not legacy_path.exists(), "the legacy file was left behind"
+        refcount = db._db.connection().execute(
+            'SELECT refcount FROM blobs WHERE file_hash = (SELECT file_hash FROM documents WHERE id = ?)',
+            (upload_id,)
+        ).fetchone()
+        assert refcount == (1,), f"refcount is {refcount}"
+        assert db.reconcile_statistics() == {}, "statistics drifted"
+
+        success, message = db.delete_document(upload_id)
+        assert success, message
+        assert not object_path.exists(), "the object outlived its last document"
+        print("✅ Legacy and object-store deletes release only their own files")
+        return True
+    finally:
+        shutil.rmtree(base_path, ignore_errors=True)
+
+
+def test_delete_object_keeps_legacy():
+    """Deleting the upload leaves the legacy document's file alone"""
+    print("🔧 Deleting an upload that shares content with a legacy document...")
+    base_path = Path(tempfile.mkdtemp(prefix='docsecure-test-'))
+    try:
+        db = DocSecureDatabase(str(base_path))
+        legacy_id = _legacy_document(db, CONTENT, 'Ancienne procédure')
+        legacy_path = _file_path(db, legacy_id)
+        upload_id = _upload(db, CONTENT, 'Nouvelle politique')
+        object_path = _file_path(db, upload_id)
+
+        success, message = db.delete_document(upload_id)
+        assert success, message
+        assert legacy_path.exists(), "the legacy file was removed"
+        assert not object_path.exists(), "the object outlived its last document"
+        assert db.reconcile_statistics() == {}, "statistics drifted"
+        print("✅ The legacy file survives the upload's delete")
+        return True
+    finally:
+        shutil.rmtree(base_path, ignore_errors=True)
+
+
+def main():
+    results = [test_delete_legacy_keeps_object(), test_delete_object_keeps_legacy()]
+    print("=" * 50)
+    print(f"{sum(results)}/{len(results)} blob store checks passed")
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+DOC Secure Pagination Test Script
+Checks keyset pages from get_documents_page against a plain ORDER BY over
+the same rows, including ties on upload_date and rows written between pages,
+and metadata_filters against the same conditions evaluated on the JSON
+"""
+
+import io
+import sys
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+# Add the utils directory to the Python path
+current_dir = Path(__file__).parent
+project_root = current_dir.parent
+utils_dir = project_root / "utils" / "docsecure"
+sys.path.append(str(utils_dir))
+
+from database import DocSecureDatabase, LISTING_COLUMN_NAMES
+
+CATEGORIES = ['Procédures', 'Politiques', 'Notes internes']
+# Few distinct dates, so many documents tie and the id decides their order
+UPLOAD_DATES = ['2025-06-01 09:00:00', '2025-06-02 09:00:00', '2025-06-02 09:00:00', '2025-06-03 17:30:00']
+
+
+def _archive(count: int, metadata=None):
+    """A temporary archive holding `count` small documents spread over categories and dates"""
+    base_path = Path(tempfile.mkdtemp(prefix='docsecure-test-'))
+    db = DocSecureDatabase(str(base_path))
+    for number in range(count):
+        content = b'%PDF-1.4\npagination ' + str(number).encode() + b'\n'
+        success, message, document_id = db.ingest_stream(
+            io.BytesIO(content), f'doc_{number}.pdf', f'Document {number}',
+            CATEGORIES[number % len(CATEGORIES)], metadata=metadata(number) if metadata else None
+        )
+        assert success, message
+        with db._db.transaction() as conn:
+            conn.execute('UPDATE documents SET upload_date = ? WHERE id = ?',
+                         (UPLOAD_DATES[number % len(UPLOAD_DATES)], document_id))
+    return base_path, db
+
+
+def _expected_ids(db, where: str = '', params=()):
+    """Document ids in page order, read without the keyset query"""
+    query = 'SELECT id FROM documents'
+    if where:
+        query += ' WHERE ' + where
+    return [row[0] for row in db._db.connection().execute(
+        query + ' ORDER BY upload_date DESC, id DESC', params
+    )]
+
+
+def _all_pages(db, limit: int, **options):
+    ids = []
+    pages = []
+    cursor = None
+    while True:
+        page = db.get_documents_page(cursor=cursor, limit=limit, **options)
+        pages.append(page)
+        ids.extend(document['id'] for document in page['documents'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            return ids, pages
+
+
+def test_keyset_pages():
+    """Pages chained by next_cursor return every document once, newest first"""
+    print("🔧 Paging through documents with keyset cursors...")
+    base_path, db = _archive(23)
+    try:
+        for category in [None, *CATEGORIES]:
+            expected = _expected_ids(db, 'category = ?', (category,)) if category else _expected_ids(db)
+            for limit in (1, 4, 7, 100):
+                ids, pages = _all_pages(db, limit, category=category, include_total=True)
+                assert ids == expected, f"{category} limit={limit}: {ids} != {expected}"
+                assert len(pages) == max(1, -(-len(expected) // limit)), \
+                    f"{category} limit={limit}: {len(pages)} pages"
+                assert all(page['total'] == len(expected) for page in pages), f"{category}: wrong total"
+                assert all(len(page['documents']) <= limit for page in pages), f"{category}: page over limit"
+
+        page = db.get_documents_page(limit=5, listing_only=True)
+        assert all(tuple(document) == LISTING_COLUMN_NAMES for document in page['documents']), \
+            "listing_only returned other columns"
+
+        for cursor in ('not-a-cursor', 'WzFd'):
+            try:
+                db.get_documents_page(cursor=cursor)
+                raise AssertionError(f"invalid cursor {cursor!r} was accepted")
+            except ValueError:
+                pass
+        print("✅ Keyset pages match ORDER BY upload_date DESC, id DESC")
+        return True
+    finally:
+        shutil.rmtree(base_path, ignore_errors=True)
+
+
+def test_pages_stable_under_writes():
+    """Uploads and deletes between two requests neither repeat nor skip documents"""
+    print("🔧 Writing between page requests...")
+    base_path, db = _archive(12)
+    try:
+        expected = _expected_ids(db)
+        first = db.get_documents_page(limit=5)
+        seen = [document['id'] for document in first['documents']]
+        assert seen == expected[:5], f"first page {seen}"
+
+        # A newer upload lands before the cursor; deleting an unread document drops only it
+        success, message, newer_id = db.ingest_stream(
+            io.BytesIO(b'%PDF-1.4\nnewer\n'), 'newer.pdf', 'Newer', CATEGORIES[0]
+        )
+        assert success, message
+        success, message = db.delete_document(expected[7])
+        assert success, message
+
+        cursor = first['next_cursor']
+        while cursor:
+            page = db.get_documents_page(cursor=cursor, limit=5)
+            seen.extend(document['id'] for document in page['documents'])
+            cursor = page['next_cursor']
+
+        assert newer_id not in seen, "a document newer than the cursor appeared on a later page"
+        assert seen == [document_id for document_id in expected if document_id != expected[7]], \
+            f"pages after the writes: {seen}"
+        assert db.get_documents_page(include_total=True)['total'] == 12, "total did not follow the writes"
+        print("✅ Pages after the cursor are unaffected by writes elsewhere")
+        return True
+    finally:
+        shutil.rmtree(base_path, ignore_errors=True)
+
+
+DEPARTMENTS = ['Conformité', 'Risques', 'Opérations']
+
+
+def _metadata(number: int) -> dict:
+    metadata = {'department': DEPARTMENTS[number % len(DEPARTMENTS)],
+                'valid_until': f'2025-{number % 12 + 1:02d}-15'}
+    if number % 5 == 0:
+        # Keys outside METADATA_SCHEMA are kept but cannot be filtered
+        metadata = {'owner': f'user{number}'}
+    return metadata
+
+
+def _matches(metadata: dict, key: str, operator: str, value: str) -> bool:
+    stored = metadata.get(key)
+    if stored is None:
+        # SQL comparisons with NULL are never true, != included
+        return False
+    return {'=': stored == value, '!=': stored != value, '<': stored < value,
+            '<=': stored <= value, '>': stored > value, '>=': stored >= value}[operator]
+
+
+def test_metadata_filters():
+    """metadata_filters select the same documents as the conditions applied to each row's JSON"""
+    print("🔧 Filtering pages on metadata...")
+    base_path, db = _archive(30, metadata=_metadata)
+    try:
+        metadata = {row[0]: json.loads(row[1]) for row in db._db.connection().execute(
+            'SELECT id, metadata FROM documents'
+        )}
+        cases = [
+            [('department', '=', 'Conformité')],
+            [('department', '!=', 'Risques')],
+            [('valid_until', '>=', '2025-06-01')],
+            [('department', '=', 'Opérations'), ('valid_until', '<', '2025-09-01')],
+            [('department', '=', 'Inconnu')],
+        ]
+        for conditions in cases:
+            filters = [f'{key}{operator}{value}' for key, operator, value in conditions]
+            for category in (None, CATEGORIES[1]):
+                expected = [
+                    document_id
+                    for document_id in (_expected_ids(db, 'category = ?', (category,)) if category
+                                        else _expected_ids(db))
+                    if all(_matches(metadata[document_id], *condition) for condition in conditions)
+                ]
+                ids, pages = _all_pages(db, 4, category=category, metadata_filters=filters,
+                                        include_total=True, include_metadata=True)
+                assert ids == expected, f"{filters} {category}: {ids} != {expected}"
+                assert all(page['total'] == len(expected) for page in pages), f"{filters} {category}: wrong total"
+                for page in pages:
+                    for document in page['documents']:
+                        assert document['metadata'] == metadata[document['id']], "metadata not decoded"
+
+        # Spaces around the operator are allowed
+        spaced = db.get_documents_page(metadata_filters=['department = Risques'], include_total=True)
+        assert spaced['total'] == sum(1 for value in metadata.values() if value.get('department') == 'Risques')
+
+        for invalid in ('owner=user5', 'department~Risques', 'valid_until'):
+            try:
+                db.get_documents_page(metadata_filters=[invalid])
+                raise AssertionError(f"metadata filter {invalid!r} was accepted")
+            except ValueError:
+                pass
+
+        # One malformed row does not break filtered listings
+        with db._db.transaction() as conn:
+            conn.execute("UPDATE documents SET metadata = '{not json' WHERE id = ?", (next(iter(metadata)),))
+        db.get_documents_page(metadata_filters=['department=Risques'], include_total=True)
+
+        plan = ' '.join(row[-1] for row in db._db.connection().execute(
+            'EXPLAIN QUERY PLAN SELECT id FROM documents WHERE meta_department = ? '
+            'ORDER BY upload_date DESC, id DESC', ('Risques',)
+        ))
+        assert 'idx_meta_department' in plan, f"department filter does not use its index: {plan}"
+        print("✅ Metadata filters match the stored JSON and use their indexes")
+        return True
+    finally:
+        shutil.rmtree(base_path, ignore_errors=True)
+
+
+def main():
+    results = [test_keyset_pages(), test_pages_stable_under_writes(), test_metadata_filters()]
+    print("=" * 50)
+    print(f"{sum(results)}/{len(results)} pagination checks passed")
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
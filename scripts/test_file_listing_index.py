@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Reporting Archive Listing Index Test Script
+Checks /api/reportings queries against a brute-force scan of the same files:
+cursor pages, period bounds and aggregate counts, plus uploads made during a
+rescan and the debounced file_listing.json writes
+"""
+
+import sys
+import json
+import time
+import shutil
+import tempfile
+from pathlib import Path
+
+# Add the dashboard directory to the Python path
+current_dir = Path(__file__).parent
+project_root = current_dir.parent
+dashboard_dir = project_root / "dashboard prez app"
+sys.path.append(str(dashboard_dir))
+
+import file_listing_index
+from file_listing_index import FileListingIndex, decode_cursor, encode_cursor, parse_period
+
+# (folder below UPLOADED_REPORTINGS, filenames)
+FOLDERS = [
+    ("BAM/I/Etat 4001/2024/9", ["a.xlsx", "b.pdf"]),
+    ("BAM/I/Etat 4001/2024/10", ["a.xlsx", "c.docx"]),
+    ("BAM/I/Etat 4001/2025/1", ["a.xlsx"]),
+    ("BAM/II/Etat 4100/2024/12", ["x.xlsx", "y.xlsx", "z.xls"]),
+    ("AMMC/Rapport annuel/2023/12", ["rapport.pdf"]),
+    ("AMMC/Rapport annuel/2024/6", ["rapport.pdf", "annexe.xlsx"]),
+    ("DGI/IS/2025/3", ["declaration.pdf"]),
+    ("Conformite/LBCFT/2024/11", ["note.docx", "annexe.pdf"]),
+]
+
+
+def _build_archive():
+    """A temporary UPLOADED_REPORTINGS tree and an index rebuilt from it"""
+    base_path = Path(tempfile.mkdtemp(prefix='listing-test-'))
+    archive = base_path / "UPLOADED_REPORTINGS"
+    for folder, filenames in FOLDERS:
+        (archive / folder).mkdir(parents=True)
+        for filename in filenames:
+            (archive / folder / filename).write_bytes(b'report')
+    # Not month-level folders or not reporting files: never indexed
+    (archive / "BAM" / "I" / "notes.txt").write_bytes(b'ignored')
+    (archive / "BAM/I/Etat 4001/2024/9/readme.txt").write_bytes(b'ignored')
+
+    index = FileListingIndex(archive, listing_file=base_path / "file_listing.json", persist_delay=0)
+    index.rescan(persist=False)
+    return base_path, index
+
+
+def _expected(authority=None, category=None, report=None, period_from=None, period_to=None, prefix=None):
+    """Files matching the filters, found without the index"""
+    matches = []
+    for folder, filenames in FOLDERS:
+        parts = folder.split('/')
+        if parts[0] == "BAM":
+            folder_authority, folder_category, folder_report, year, month = parts
+        elif parts[0] in ("AMMC", "DGI"):
+            folder_authority, folder_category = parts[0], parts[0]
+            folder_report, year, month = parts[1:]
+        else:
+            folder_authority = None
+            folder_category, folder_report, year, month = parts
+        period = (int(year), int(month))
+        for filename in filenames:
+            if authority is not None and folder_authority != authority:
+                continue
+            if category is not None and folder_category != category:
+                continue
+            if report is not None and folder_report != report:
+                continue
+            if period_from and period < (period_from[0], period_from[1] or 1):
+                continue
+            if period_to and period > (period_to[0], period_to[1] or 12):
+                continue
+            if prefix and not filename.startswith(prefix):
+                continue
+            matches.append((folder_authority, folder_category, folder_report, year, month, filename))
+    return matches
+
+
+def _all_pages(index, limit, **filters):
+    items = []
+    cursor = None
+    pages = 0
+    while True:
+        page = index.query(cursor=cursor, limit=limit, **filters)
+        items.extend(page["items"])
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return items, pages, page
+
+
+def _as_tuple(item):
+    return (item["authority"], item["category"], item["report"], item["year"], item["month"], item["filename"])
+
+
+def test_cursor_pages():
+    """Pages chained by next_cursor cover every match once, in key order"""
+    print("🔧 Paging through the archive with cursors...")
+    base_path, index = _build_archive()
+    try:
+        for filters in ({}, {"category": "I"}, {"category": "I", "report": "Etat 4001"}, {"authority": "AMMC"}):
+            expected = _expected(**filters)
+            for limit in (1, 2, 3, 100):
+                items, pages, last_page = _all_pages(index, limit, **filters)
+                found = [_as_tuple(item) for item in items]
+                assert sorted(found, key=repr) == sorted(expected, key=repr), f"{filters} limit={limit}: {found}"
+                assert len(set(found)) == len(found), f"{filters} limit={limit}: duplicates across pages"
+                assert pages == max(1, -(-len(expected) // limit)), f"{filters} limit={limit}: {pages} pages"
+                assert last_page["total"] == len(expected), f"{filters}: total {last_page['total']}"
+
+        # Months sort numerically: 9 before 10 before 12
+        items, _, _ = _all_pages(index, 2, category="I", report="Etat 4001")
+        assert [(item["year"], item["month"]) for item in items] == [
+            ("2024", "9"), ("2024", "9"), ("2024", "10"), ("2024", "10"), ("2025", "1")
+        ], items
+
+        key = ("I", "Etat 4001", (2024, "2024"), (10, "10"), "a.xlsx")
+        assert decode_cursor(encode_cursor(key)) == key, "cursor does not round-trip"
+        try:
+            index.query(cursor="not-a-cursor")
+            raise AssertionError("an invalid cursor was accepted")
+        except ValueError:
+            pass
+        print("✅ Cursor pages return every file exactly once")
+        return True
+    finally:
+        shutil.rmtree(base_path, ignore_errors=True)
+
+
+def test_period_bounds():
+    """from/to are inclusive, by year or by month"""
+    print("🔧 Filtering by period...")
+    base_path, index = _build_archive()
+    try:
+        cases = [
+            ("2024", None), (None, "2024"), ("2024-10", "2024-12"), ("2024-12", "2024-12"),
+            ("2025", "2025"), ("2023-12", "2024-06"), ("2026", None),
+        ]
+        for period_from, period_to in cases:
+            bounds = {"period_from": parse_period(period_from), "period_to": parse_period(period_to)}
+            for filters in ({}, {"category": "I", "report": "Etat 4001"}, {"category": "AMMC"}):
+                expected = _expected(**filters, **bounds)
+                items, _, page = _all_pages(index, 2, **filters, **bounds)
+                found = [_as_tuple(item) for item in items]
+                assert sorted(found, key=repr) == sorted(expected, key=repr), \
+                    f"{period_from}..{period_to} {filters}: {found}"
+                assert page["total"] == len(expected), f"{period_from}..{period_to} {filters}: {page['total']}"
+
+        for invalid in ("2024-13", "20x4", "2024-0"):
+            try:
+                parse_period(invalid)
+                raise AssertionError(f"invalid period {invalid!r} was accepted")
+            except ValueError:
+                pass
+        print("✅ Period bounds match a full scan")
+        return True
+    finally:
+        shutil.rmtree(base_path, ignore_errors=True)
+
+
+def test_aggregate_counts():
+    """total and counts cover the whole filter, not just the page"""
+    print("🔧 Checking aggregate counts...")
+    base_path, index = _build_archive()
+    try:
+        cases = [
+            {}, {"authority": "BAM"}, {"category": "II"}, {"prefix": "a"},
+            {"authority": "BAM", "prefix": "a", "period_from": (2024, 10)},
+            {"category": "Conformite"}, {"period_to": (2024, None)},
+        ]
+        for filters in cases:
+            expected = _expected(**filters)
+            by_authority, by_category, by_year = {}, {}, {}
+            for authority, category, _, year, _, _ in expected:
+                by_authority[authority or "LEGACY"] = by_authority.get(authority or "LEGACY", 0) + 1
+                by_category[category] = by_category.get(category, 0) + 1
+                by_year[year] = by_year.get(year, 0) + 1
+
+            page = index.query(limit=1, **filters)
+            assert page["total"] == len(expected), f"{filters}: total {page['total']}"
+            assert page["counts"] == {
+                "by_authority": by_authority, "by_category": by_category, "by_year": by_year
+            }, f"{filters}: {page['counts']}"
+
+        # Counters follow per-file deltas
+        new_file = index.base_path / "BAM/II/Etat 4100/2024/12/w.xlsx"
+        new_file.write_bytes(b'report')
+        assert index.add_file(new_file, persist=False), "new file not indexed"
+        assert index.query(category="II")["total"] == 4, "count ignores an added file"
+        assert index.remove_file(new_file, persist=False), "removed file not found"
+        assert index.query(category="II")["counts"]["by_year"] == {"2024": 3}, "count ignores a removed file"
+        print("✅ Aggregate counts match a full scan")
+        return True
+    finally:
+        shutil.rmtree(base_path, ignore_errors=True)
+
+
+def test_rescan_keeps_deltas():
+    """Files added or removed while a rescan walks the folder survive the swap"""
+    print("🔧 Uploading and deleting files during a rescan...")
+    base_path, index = _build_archive()
+    added = index.base_path / "BAM/I/Etat 4001/2024/9/late.xlsx"
+    removed = index.base_path / "DGI/IS/2025/3/declaration.pdf"
+    walk = file_listing_index.os.walk
+
+    def stale_walk(top):
+        # The walk finishes before the changes, so it has the old view of every folder
+        entries = list(walk(top))
+        added.write_bytes(b'report')
+        assert index.add_file(added, persist=False), "upload not indexed"
+        removed.unlink()
+        assert index.remove_file(removed, persist=False), "delete not indexed"
+        return iter(entries)
+
+    file_listing_index.os.walk = stale_walk
+    try:
+        index.rescan(persist=False)
+    finally:
+        file_listing_index.os.walk = walk
+    try:
+        items = index.query(limit=1000)["items"]
+        found = {item["filename"] for item in items}
+        assert "late.xlsx" in found, "a file uploaded during the rescan was dropped"
+        assert "declaration.pdf" not in found, "a file deleted during the rescan came back"
+        assert index.statistics["total_files"] == len(items) == 14, index.statistics
+        assert index.query(authority="DGI")["total"] == 0, "counters kept the deleted file"
+
+        # Without a rescan running, deltas are not recorded for replay
+        assert index._rescan_deltas is None, "deltas still recorded after the rescan"
+        print("✅ Changes made during a rescan are applied after it")
+        return True
+    finally:
+        shutil.rmtree(base_path, ignore_errors=True)
+
+
+def test_debounced_persist():
+    """Changes reach file_listing.json from the background writer, coalesced"""
+    print("🔧 Writing file_listing.json in the background...")
+    base_path, index = _build_archive()
+    try:
+        index.persist_delay = 0.2
+        folder = index.base_path / "BAM/II/Etat 4100/2024/12"
+        for number in range(5):
+            (folder / f"batch{number}.xlsx").write_bytes(b'report')
+            assert index.add_file(folder / f"batch{number}.xlsx"), "file not indexed"
+        assert not index.listing_file.exists(), "written before the debounce delay"
+
+        deadline = time.monotonic() + 5
+        while not index.listing_file.exists() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        with open(index.listing_file, encoding='utf-8') as f:
+            listing = json.load(f)
+        assert listing["statistics"]["total_files"] == 19, listing["statistics"]
+        assert len(listing["structure"]["II"]["Etat 4100"]["2024"]["12"]) == 8, "a batched file is missing"
+
+        # flush() writes pending changes immediately, e.g. on shutdown
+        index.persist_delay = 60
+        (folder / "last.xlsx").write_bytes(b'report')
+        index.add_file(folder / "last.xlsx")
+        index.flush()
+        with open(index.listing_file, encoding='utf-8') as f:
+            assert json.load(f)["statistics"]["total_files"] == 20, "flush did not write the change"
+        print("✅ Listing writes are debounced and flushed")
+        return True
+    finally:
+        shutil.rmtree(base_path, ignore_errors=True)
+
+
+def main():
+    results = [test_cursor_pages(), test_period_bounds(), test_aggregate_counts(),
+               test_rescan_keeps_deltas(), test_debounced_persist()]
+    print("=" * 50)
+    print(f"{sum(results)}/{len(results)} listing index checks passed")
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
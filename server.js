@@ -16,6 +16,10 @@ try {
   pdfParse = null;
 }
 
+// The catch-all below sets x-docsecure-socket-address from the TCP peer; the DocSecure
+// routes only believe that header when this process says so (not under plain `next start`)
+process.env.DOCSECURE_SOCKET_ADDRESS_HEADER = '1';
+
 const dev = process.env.NODE_ENV !== 'production';
 const hostname = 'localhost';
 const port = 3002;
@@ -609,6 +613,8 @@ app.prepare().then(() => {
 
   // Handle all other requests with Next.js
   server.all('*', (req, res) => {
+    // TCP peer for the DocSecure audit trail; replaces whatever a client sent under this name
+    req.headers['x-docsecure-socket-address'] = (req.socket.remoteAddress || '').replace(/^::ffff:/, '');
     return handle(req, res);
   });
 
@@ -7,17 +7,82 @@ Connects Node.js API routes with Python database backend
 import sys
 import json
 import os
+import hmac
+import time
+import secrets
 from pathlib import Path
 import tempfile
 import shutil
+import subprocess
+import signal
+import threading
+import http.server
+import urllib.parse
 
 # Add the current directory to path so we can import our database module
 current_dir = Path(__file__).parent
 sys.path.insert(0, str(current_dir))
 
 from database import DocSecureDatabase, create_database_instance
+from extraction import ExtractionPipeline
+from bulk_ingest import BulkIngester, is_within
+from previews import PreviewCache, KIND_IMAGE, KIND_TEXT, KINDS
+from scrubber import Scrubber
+from audit import AuditLog, ACTION_DOWNLOAD, ACTION_VIEW, AUDIT_RETENTION_DAYS
+from file_serving import (RangeNotSatisfiable, content_disposition, document_etag,
+                          etag_matches, if_range_allows, parse_range)
 
-def handle_upload(temp_file_path: str, title: str, category: str, description: str = "") -> dict:
+# Service mode: localhost JSON-RPC answering the Next.js routes from one warm process
+SERVICE_HOST = os.environ.get("DOCSECURE_SERVICE_HOST", "127.0.0.1")
+SERVICE_PORT = int(os.environ.get("DOCSECURE_SERVICE_PORT", "8765"))
+# Seconds an idle keep-alive connection keeps its thread
+SERVICE_IDLE_TIMEOUT = 30
+# Largest JSON-RPC request body; file bytes go to /upload instead
+MAX_RPC_BODY = 1024 * 1024
+# Shared secret the routes send as X-DocSecure-Token; created by the service on first start
+SERVICE_TOKEN_FILE = os.environ.get("DOCSECURE_SERVICE_TOKEN_FILE")
+# Only folder whose files upload and bulk-ingest may name over the service; unset disables them
+IMPORT_ROOT = os.environ.get("DOCSECURE_IMPORT_ROOT")
+
+# Extraction pipeline running inside the service, if any
+_pipeline = None
+# Access audit buffered inside the service, if any
+_audit = None
+
+def start_background_extraction():
+    """Run pending text extraction in a detached process so uploads return at once"""
+    if _pipeline is not None:
+        # The service extracts in its own background thread
+        _pipeline.wake()
+        return
+    try:
+        subprocess.Popen(
+            [sys.executable, str(Path(__file__).absolute()), "extract"],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True
+        )
+    except OSError:
+        # Jobs stay pending and are picked up by the next extract run
+        pass
+
+def _audit_log(db) -> AuditLog:
+    return _audit if _audit is not None else AuditLog(db)
+
+def record_access(db, document_id: int, action: str, actor=None, client=None):
+    """Log a view or download; the service buffers entries and writes them in batches"""
+    try:
+        audit = _audit_log(db)
+        audit.record(document_id, action, actor, client)
+        if audit is not _audit:
+            # One-shot process: write before exiting
+            audit.flush()
+    except Exception as e:
+        print(f"Audit error: {e}", file=sys.stderr)
+
+def handle_upload(temp_file_path: str, title: str, category: str, description: str = "",
+                  metadata: dict = None) -> dict:
     """Handle document upload from Node.js"""
     try:
         # Create database instance
@@ -28,9 +93,13 @@ def handle_upload(temp_file_path: str, title: str, category: str, description: s
             file_path=temp_file_path,
             title=title,
             category=category,
-            description=description
+            description=description,
+            metadata=metadata
         )
         
+        if success:
+            start_background_extraction()
+        
         return {
             "success": success,
             "message": message,
@@ -43,21 +112,94 @@ def handle_upload(temp_file_path: str, title: str, category: str, description: s
             "error": f"Upload processing error: {str(e)}"
         }
 
-def handle_list_documents(category=None, search_term=None, limit=100, offset=0) -> dict:
-    """Handle document listing request"""
+def handle_upload_stream(stream, filename: str, title: str, category: str, description: str = "") -> dict:
+    """Handle document upload with the file bytes piped on stdin"""
     try:
         db = create_database_instance()
-        documents = db.get_documents(
+        success, message, doc_id = db.ingest_stream(stream, filename, title, category, description)
+        
+        if success:
+            start_background_extraction()
+        
+        return {
+            "success": success,
+            "message": message,
+            "documentId": doc_id
+        }
+        
+    except Exception as e:
+        return {
+            "success": False,
+            "error": f"Upload processing error: {str(e)}"
+        }
+
+def handle_bulk_ingest(source: str, category=None, workers=None, import_root=None) -> dict:
+    """Handle importing a directory or a CSV/JSON manifest in one batch"""
+    try:
+        db = create_database_instance()
+        if not Path(source).exists():
+            return {
+                "success": False,
+                "error": f"Source not found: {source}"
+            }
+        
+        report = BulkIngester(db, workers=workers, import_root=import_root).ingest_source(source, category)
+        if report["counts"]["stored"] or report["counts"]["linked"]:
+            start_background_extraction()
+        
+        return {
+            "success": True,
+            **report
+        }
+        
+    except Exception as e:
+        return {
+            "success": False,
+            "error": f"Bulk ingest error: {str(e)}"
+        }
+
+def handle_list_documents(category=None, search_term=None, limit=100, offset=0,
+                          cursor=None, with_total=False, fields=None,
+                          metadata_filters=None, with_metadata=False) -> dict:
+    """
+    Handle document listing request; without a search term or offset, pages by cursor.
+    metadata_filters are expressions like 'department=Conformité'; metadata itself
+    is only returned with with_metadata
+    """
+    try:
+        db = create_database_instance()
+        
+        if search_term or offset:
+            documents = db.get_documents(
+                category=category,
+                search_term=search_term,
+                limit=limit,
+                offset=offset,
+                metadata_filters=metadata_filters,
+                include_metadata=with_metadata
+            )
+            return {
+                "success": True,
+                "documents": documents
+            }
+        
+        page = db.get_documents_page(
             category=category,
-            search_term=search_term,
+            cursor=cursor,
             limit=limit,
-            offset=offset
+            include_total=with_total,
+            listing_only=(fields == "listing"),
+            metadata_filters=metadata_filters,
+            include_metadata=with_metadata
         )
-        
-        return {
+        result = {
             "success": True,
-            "documents": documents
+            "documents": page["documents"],
+            "nextCursor": page["next_cursor"]
         }
+        if with_total:
+            result["total"] = page["total"]
+        return result
         
     except Exception as e:
         return {
@@ -82,11 +224,33 @@ def handle_get_statistics() -> dict:
             "error": f"Statistics error: {str(e)}"
         }
 
+def handle_reconcile_statistics() -> dict:
+    """Handle recomputing the materialized statistics from scratch"""
+    try:
+        db = create_database_instance()
+        drift = db.reconcile_statistics()
+        
+        return {
+            "success": True,
+            "drift": drift,
+            "statistics": db.get_statistics()
+        }
+        
+    except Exception as e:
+        return {
+            "success": False,
+            "error": f"Statistics reconcile error: {str(e)}"
+        }
+
 def handle_delete_document(document_id: int) -> dict:
     """Handle document deletion"""
     try:
         db = create_database_instance()
+        info = db.get_file_info(document_id)
         success, message = db.delete_document(document_id)
+        if success and info:
+            # Only this content's derivatives, once no document uses it any more
+            PreviewCache(db).purge(info["file_hash"])
         
         return {
             "success": success,
@@ -99,13 +263,15 @@ def handle_delete_document(document_id: int) -> dict:
             "error": f"Delete error: {str(e)}"
         }
 
-def handle_get_document(document_id: int) -> dict:
-    """Handle get document by ID"""
+def handle_get_document(document_id: int, access=None, actor=None, client=None) -> dict:
+    """Handle get document by ID; access ('view' or 'download') logs who asked"""
     try:
         db = create_database_instance()
         document = db.get_document_by_id(document_id)
         
         if document:
+            if access:
+                record_access(db, document_id, access, actor, client)
             return {
                 "success": True,
                 "document": document
@@ -122,6 +288,584 @@ def handle_get_document(document_id: int) -> dict:
             "error": f"Get document error: {str(e)}"
         }
 
+def handle_preview(document_id: int, actor=None, client=None) -> dict:
+    """Handle a document's cached text preview, rendered on first request; logged as a view"""
+    try:
+        db = create_database_instance()
+        document = db.get_document_by_id(document_id)
+        if not document:
+            return {
+                "success": False,
+                "error": "Document not found"
+            }
+        record_access(db, document_id, ACTION_VIEW, actor, client)
+        
+        cache = PreviewCache(db)
+        preview = cache.read_text(document_id)
+        suffix = Path(document["original_filename"]).suffix
+        return {
+            "success": True,
+            "document": document,
+            "preview": {
+                "type": "text",
+                "content": preview["content"],
+                "etag": preview["etag"],
+                "image": cache.available(suffix, KIND_IMAGE)
+            }
+        }
+        
+    except Exception as e:
+        return {
+            "success": False,
+            "error": f"Preview error: {str(e)}"
+        }
+
+def handle_extract(workers=None, requeue_all=False) -> dict:
+    """Handle text extraction of pending documents (backfill with requeue_all)"""
+    try:
+        db = create_database_instance()
+        pipeline = ExtractionPipeline(db, workers=workers, previews=PreviewCache(db))
+        if requeue_all:
+            pipeline.queue_all()
+        
+        started = time.perf_counter()
+        counts = pipeline.process_pending()
+        
+        return {
+            "success": True,
+            "processed": counts,
+            "jobs": pipeline.summary(),
+            "durationMs": int((time.perf_counter() - started) * 1000)
+        }
+        
+    except Exception as e:
+        return {
+            "success": False,
+            "error": f"Extraction error: {str(e)}"
+        }
+
+def handle_extraction_status(document_id: int) -> dict:
+    """Handle extraction status of one document"""
+    try:
+        db = create_database_instance()
+        status = ExtractionPipeline(db).status(document_id)
+        
+        if status:
+            return {
+                "success": True,
+                "extraction": status
+            }
+        else:
+            return {
+                "success": False,
+                "error": "Document not found"
+            }
+        
+    except Exception as e:
+        return {
+            "success": False,
+            "error": f"Extraction status error: {str(e)}"
+        }
+
+def handle_get_documents(document_ids) -> dict:
+    """Handle get of several documents by ID"""
+    try:
+        db = create_database_instance()
+        documents = db.get_documents_by_ids(document_ids)
+        
+        found = {document['id'] for document in documents}
+        return {
+            "success": True,
+            "documents": documents,
+            "missing": [document_id for document_id in document_ids if document_id not in found]
+        }
+        
+    except Exception as e:
+        return {
+            "success": False,
+            "error": f"Get documents error: {str(e)}"
+        }
+
+def handle_migrate_blobs() -> dict:
+    """Handle moving files stored per category into the content-addressed store"""
+    try:
+        db = create_database_instance()
+        counts = db.migrate_legacy_files()
+        
+        return {
+            "success": True,
+            "migrated": counts,
+            "stats": db.get_statistics()
+        }
+        
+    except Exception as e:
+        return {
+            "success": False,
+            "error": f"Blob migration error: {str(e)}"
+        }
+
+def handle_scrub(limit=None, max_seconds=None, stale_hours=0, mbps=None, workers=None,
+                 repair=False, orphans=True) -> dict:
+    """Handle integrity verification of stored files, longest-unverified first"""
+    try:
+        db = create_database_instance()
+        scrubber = Scrubber(db, workers=workers, mbps=mbps)
+        report = scrubber.run(limit=limit, max_seconds=max_seconds, stale_hours=stale_hours,
+                              repair=repair, orphans=orphans)
+        if orphans:
+            # Maintenance sweep for derivatives whose content is gone
+            report["previews_purged"] = PreviewCache(db).purge_unreferenced()
+        
+        return {
+            "success": True,
+            **report,
+            "status": scrubber.status()
+        }
+        
+    except Exception as e:
+        return {
+            "success": False,
+            "error": f"Scrub error: {str(e)}"
+        }
+
+def handle_scrub_status() -> dict:
+    """Handle summary of the last verification of every stored file"""
+    try:
+        db = create_database_instance()
+        
+        return {
+            "success": True,
+            "status": Scrubber(db).status()
+        }
+        
+    except Exception as e:
+        return {
+            "success": False,
+            "error": f"Scrub status error: {str(e)}"
+        }
+
+def handle_access_log(document_id: int, limit: int = 100) -> dict:
+    """Handle who viewed or downloaded a document"""
+    try:
+        db = create_database_instance()
+        
+        return {
+            "success": True,
+            **_audit_log(db).document_accesses(document_id, limit)
+        }
+        
+    except Exception as e:
+        return {
+            "success": False,
+            "error": f"Access log error: {str(e)}"
+        }
+
+def handle_top_documents(month=None, action=None, limit: int = 10) -> dict:
+    """Handle the most accessed documents of a month"""
+    try:
+        db = create_database_instance()
+        
+        return {
+            "success": True,
+            "month": month or time.strftime("%Y-%m"),
+            "documents": _audit_log(db).top_documents(month, action, limit)
+        }
+        
+    except Exception as e:
+        return {
+            "success": False,
+            "error": f"Top documents error: {str(e)}"
+        }
+
+def handle_audit_rollup(retention_days: int = AUDIT_RETENTION_DAYS) -> dict:
+    """Handle folding old access entries into daily counts"""
+    try:
+        db = create_database_instance()
+        audit = _audit_log(db)
+        audit.flush()
+        
+        return {
+            "success": True,
+            "retention_days": retention_days,
+            **audit.rollup(retention_days)
+        }
+        
+    except Exception as e:
+        return {
+            "success": False,
+            "error": f"Audit rollup error: {str(e)}"
+        }
+
+def _import_path(path: str) -> str:
+    """A server-side path named over the service, which must lie below IMPORT_ROOT"""
+    if not IMPORT_ROOT:
+        raise ValueError("importing server-side paths is disabled (set DOCSECURE_IMPORT_ROOT)")
+    if not is_within(path, IMPORT_ROOT):
+        raise ValueError(f"{path} is outside DOCSECURE_IMPORT_ROOT")
+    return path
+
+def _as_list(value) -> list:
+    """A parameter given once or as a list"""
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+# Actions served by the JSON-RPC service; params arrive as a JSON object
+ACTIONS = {
+    "list": lambda params: handle_list_documents(
+        params.get("category"), params.get("search"),
+        int(params.get("limit", 100)), int(params.get("offset", 0)),
+        params.get("cursor"), bool(params.get("withTotal")), params.get("fields"),
+        _as_list(params.get("meta")), bool(params.get("withMetadata"))
+    ),
+    "stats": lambda params: handle_get_statistics(),
+    "reconcile-stats": lambda params: handle_reconcile_statistics(),
+    "delete": lambda params: handle_delete_document(int(params["documentId"])),
+    "get": lambda params: handle_get_document(
+        int(params["documentId"]), params.get("access"), params.get("actor"), params.get("client")
+    ),
+    "preview": lambda params: handle_preview(
+        int(params["documentId"]), params.get("actor"), params.get("client")
+    ),
+    "get-many": lambda params: handle_get_documents([int(i) for i in params["documentIds"]]),
+    "upload": lambda params: handle_upload(
+        _import_path(params["filePath"]), params["title"], params["category"],
+        params.get("description", ""), params.get("metadata")
+    ),
+    "bulk-ingest": lambda params: handle_bulk_ingest(
+        _import_path(params["source"]), params.get("category"), params.get("workers"), IMPORT_ROOT
+    ),
+    "extract": lambda params: handle_extract(params.get("workers")),
+    "reindex": lambda params: handle_extract(params.get("workers"), requeue_all=True),
+    "extraction-status": lambda params: handle_extraction_status(int(params["documentId"])),
+    "migrate-blobs": lambda params: handle_migrate_blobs(),
+    "scrub": lambda params: handle_scrub(
+        params.get("limit"), params.get("maxSeconds"), float(params.get("staleHours", 0)),
+        params.get("mbps"), params.get("workers"), bool(params.get("repair")),
+        params.get("orphans", True)
+    ),
+    "scrub-status": lambda params: handle_scrub_status(),
+    "access-log": lambda params: handle_access_log(int(params["documentId"]), int(params.get("limit", 100))),
+    "top-documents": lambda params: handle_top_documents(
+        params.get("month"), params.get("action"), int(params.get("limit", 10))
+    ),
+    "audit-rollup": lambda params: handle_audit_rollup(
+        int(params.get("retentionDays", AUDIT_RETENTION_DAYS))
+    ),
+}
+
+class _BoundedReader:
+    """Reads at most `remaining` bytes of a request body, then reports EOF"""
+    
+    def __init__(self, stream, remaining: int):
+        self.stream = stream
+        self.remaining = remaining
+    
+    def read(self, size: int = -1) -> bytes:
+        if self.remaining <= 0:
+            return b""
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.stream.read(size)
+        self.remaining -= len(data)
+        if not data:
+            self.remaining = 0
+        return data
+
+class DocSecureRequestHandler(http.server.BaseHTTPRequestHandler):
+    """
+    POST /rpc      {"action": "get", "params": {"documentId": 5}}
+    POST /upload   ?filename=&title=&category=&description=, raw file bytes as the body
+    GET  /preview/<id>?kind=text|image   cached preview derivative, with ETag
+    GET  /files/<id>   the stored file, streamed; Range, If-Range and If-None-Match
+    GET  /health
+    
+    Every request but /health carries the shared secret in X-DocSecure-Token.
+    X-DocSecure-Actor and X-DocSecure-Client (URL-encoded) name who a download is logged for
+
+    """
+    
+    # Keep-alive: a client connection keeps its thread, and so its SQLite connection
+    protocol_version = "HTTP/1.1"
+    timeout = SERVICE_IDLE_TIMEOUT
+    # Headers and body go out as separate writes; do not let them wait on a delayed ACK
+    disable_nagle_algorithm = True
+    
+    def send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def authorized(self) -> bool:
+        """Check the shared secret, answering 401 when it is missing or wrong"""
+        token = self.headers.get("X-DocSecure-Token", "")
+        if hmac.compare_digest(token.encode("utf-8"), self.server.token.encode("utf-8")):
+            return True
+        # The body, if any, is left unread
+        self.close_connection = True
+        self.send_json(401, {"success": False, "error": "Missing or invalid service token"})
+        return False
+    
+    def content_length(self) -> int:
+        try:
+            return int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            return -1
+    
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        if url.path == "/health":
+            self.send_json(200, {
+                "success": True,
+                "pid": os.getpid(),
+                "database_path": str(create_database_instance().db_path)
+            })
+        elif not self.authorized():
+            return
+        elif url.path.startswith("/preview/"):
+            self.handle_preview_file(url.path[len("/preview/"):], urllib.parse.parse_qs(url.query))
+        elif url.path.startswith("/files/"):
+            self.handle_file(url.path[len("/files/"):])
+        else:
+            self.send_json(404, {"success": False, "error": "Not found"})
+    
+    def do_HEAD(self):
+        url = urllib.parse.urlsplit(self.path)
+        if not self.authorized():
+            return
+        if url.path.startswith("/files/"):
+            self.handle_file(url.path[len("/files/"):], send_body=False)
+        else:
+            self.close_connection = True
+            self.send_json(404, {"success": False, "error": "Not found"})
+    
+    def handle_file(self, document_id: str, send_body: bool = True):
+        if not document_id.isdigit():
+            self.send_json(400, {"success": False, "error": "Expected /files/<id>"})
+            return
+        try:
+            db = create_database_instance()
+            info = db.get_file_info(int(document_id))
+        except Exception as e:
+            self.send_json(500, {"success": False, "error": f"Download error: {str(e)}"})
+            return
+        if info is None:
+            self.send_json(404, {"success": False, "error": "Document not found"})
+            return
+        try:
+            f = open(info["path"], "rb")
+        except FileNotFoundError:
+            self.send_json(404, {"success": False, "error": "Document file missing from storage"})
+            return
+        
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            etag = document_etag(info["file_hash"])
+            if etag_matches(self.headers.get("If-None-Match"), etag):
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Cache-Control", "private, no-cache")
+                self.end_headers()
+                return
+            
+            status, first, last = 200, 0, size - 1
+            if if_range_allows(self.headers.get("If-Range"), etag):
+                try:
+                    requested = parse_range(self.headers.get("Range"), size)
+                except RangeNotSatisfiable:
+                    self.send_response(416)
+                    self.send_header("Content-Range", f"bytes */{size}")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                if requested is not None:
+                    status, (first, last) = 206, requested
+            
+            self.send_response(status)
+            self.send_header("Content-Type", info["mime_type"])
+            self.send_header("Content-Length", str(last - first + 1))
+            if status == 206:
+                self.send_header("Content-Range", f"bytes {first}-{last}/{size}")
+            self.send_header("Accept-Ranges", "bytes")
+            self.send_header("ETag", etag)
+            self.send_header("Content-Disposition", content_disposition(info["original_filename"]))
+            # Revalidate every time: access to the document may have been revoked
+            self.send_header("Cache-Control", "private, no-cache")
+            self.end_headers()
+            if not send_body or last < first:
+                return
+            if first == 0:
+                # Resumed ranges of a download already logged are not logged again
+                record_access(db, int(document_id), ACTION_DOWNLOAD,
+                              urllib.parse.unquote(self.headers.get("X-DocSecure-Actor", "")),
+                              urllib.parse.unquote(self.headers.get("X-DocSecure-Client", "")) or None)
+            try:
+                # Kernel-side copy: memory per download does not grow with the file
+                self.connection.sendfile(f, offset=first, count=last - first + 1)
+            except (BrokenPipeError, ConnectionResetError):
+                # Client went away (cancelled or resumed elsewhere)
+                self.close_connection = True
+    
+    def handle_preview_file(self, document_id: str, query: dict):
+        kind = (query.get("kind") or [KIND_TEXT])[0]
+        if not document_id.isdigit() or kind not in KINDS:
+            self.send_json(400, {"success": False, "error": f"Expected /preview/<id>?kind={'|'.join(KINDS)}"})
+            return
+        
+        try:
+            preview = PreviewCache(create_database_instance()).get(int(document_id), kind)
+        except Exception as e:
+            self.send_json(500, {"success": False, "error": f"Preview error: {str(e)}"})
+            return
+        if preview is None:
+            self.send_json(404, {"success": False, "error": "Document not found"})
+            return
+        if preview["path"] is None:
+            self.send_json(404, {"success": False, "error": "No preview of this kind for this document"})
+            return
+        
+        if etag_matches(self.headers.get("If-None-Match"), preview["etag"]):
+            self.send_response(304)
+            self.send_header("ETag", preview["etag"])
+            self.send_header("Cache-Control", "private, no-cache")
+            self.end_headers()
+            return
+        try:
+            f = open(preview["path"], "rb")
+        except FileNotFoundError:
+            # Evicted since the lookup; the next request renders it again
+            self.send_json(503, {"success": False, "error": "Preview is being regenerated"})
+            return
+        with f:
+            self.send_response(200)
+            self.send_header("Content-Type", preview["content_type"])
+            self.send_header("Content-Length", str(os.fstat(f.fileno()).st_size))
+            self.send_header("ETag", preview["etag"])
+            # Revalidate every time: access to the document may have been revoked
+            self.send_header("Cache-Control", "private, no-cache")
+            self.end_headers()
+            shutil.copyfileobj(f, self.wfile)
+    
+    def do_POST(self):
+        url = urllib.parse.urlsplit(self.path)
+        if not self.authorized():
+            return
+        if url.path == "/rpc":
+            self.handle_rpc()
+        elif url.path == "/upload":
+            self.handle_upload_body(urllib.parse.parse_qs(url.query))
+        else:
+            self.close_connection = True
+            self.send_json(404, {"success": False, "error": "Not found"})
+    
+    def handle_rpc(self):
+        length = self.content_length()
+        if length < 0 or length > MAX_RPC_BODY:
+            self.close_connection = True
+            self.send_json(400, {"success": False, "error": "Invalid request body"})
+            return
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+            action = request["action"]
+            params = request.get("params") or {}
+        except (ValueError, KeyError, TypeError):
+            self.send_json(400, {"success": False, "error": "Expected {\"action\": ..., \"params\": {...}}"})
+            return
+        
+        handler = ACTIONS.get(action)
+        if handler is None:
+            self.send_json(404, {"success": False, "error": f"Unknown action: {action}"})
+            return
+        try:
+            result = handler(params)
+        except (KeyError, ValueError, TypeError) as e:
+            self.send_json(400, {"success": False, "error": f"Invalid parameters for {action}: {str(e)}"})
+            return
+        self.send_json(200, result)
+    
+    def handle_upload_body(self, query: dict):
+        def param(name):
+            values = query.get(name)
+            return values[0] if values else ""
+        
+        length = self.content_length()
+        if length < 0 or not param("filename") or not param("title") or not param("category"):
+            self.close_connection = True
+            self.send_json(400, {"success": False, "error": "Missing upload parameters: filename, title, category"})
+            return
+        
+        body = _BoundedReader(self.rfile, length)
+        result = handle_upload_stream(body, param("filename"), param("title"),
+                                      param("category"), param("description"))
+        if body.remaining:
+            # Rejected before the whole body was read; do not reuse the connection
+            self.close_connection = True
+        self.send_json(200, result)
+    
+    def log_message(self, format, *args):
+        pass
+
+class DocSecureService(http.server.ThreadingHTTPServer):
+    """HTTP server with one thread per client connection"""
+    
+    daemon_threads = True
+    
+    def __init__(self, address, token: str):
+        super().__init__(address, DocSecureRequestHandler)
+        self.token = token
+
+def service_token(token_file: Path) -> str:
+    """Read the shared secret, creating it (readable by its owner only) if missing or empty"""
+    try:
+        token = token_file.read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        token = ""
+    if token:
+        return token
+    token = secrets.token_urlsafe(32)
+    temp_path = token_file.with_name(f"{token_file.name}.{os.getpid()}.tmp")
+    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(token)
+    os.replace(temp_path, token_file)
+    return token
+
+def _terminate(signum, frame):
+    # Shut down like Ctrl-C, so queued audit entries are written
+    raise KeyboardInterrupt
+
+def serve(host: str = SERVICE_HOST, port: int = SERVICE_PORT):
+    """Run the JSON-RPC service until interrupted"""
+    global _pipeline, _audit
+    
+    # Migrate and prepare folders once, before the first request
+    db = create_database_instance()
+    _pipeline = ExtractionPipeline(db, previews=PreviewCache(db))
+    _pipeline.start()
+    _pipeline.wake()
+    _audit = AuditLog(db)
+    _audit.start()
+    signal.signal(signal.SIGTERM, _terminate)
+    
+    token_file = Path(SERVICE_TOKEN_FILE) if SERVICE_TOKEN_FILE else db.base_path / ".service-token"
+    service = DocSecureService((host, port), service_token(token_file))
+    print(json.dumps({
+        "success": True,
+        "message": f"DOC Secure service listening on http://{host}:{service.server_address[1]}",
+        "database_path": str(db.db_path)
+    }), flush=True)
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.server_close()
+        _pipeline.stop()
+        _audit.stop()
+
 def main():
     """Main function to handle command line arguments from Node.js"""
     try:
@@ -150,12 +894,53 @@ def main():
             result = handle_upload(file_path, title, category, description)
             print(json.dumps(result))
             
+        elif action == "upload-stream":
+            if len(sys.argv) < 5:
+                print(json.dumps({
+                    "success": False,
+                    "error": "Missing upload parameters: filename, title, category"
+                }))
+                return
+            
+            filename = sys.argv[2]
+            title = sys.argv[3]
+            category = sys.argv[4]
+            description = sys.argv[5] if len(sys.argv) > 5 else ""
+            
+            result = handle_upload_stream(sys.stdin.buffer, filename, title, category, description)
+            print(json.dumps(result))
+            
+        elif action == "bulk-ingest":
+            # bulk-ingest <directory|manifest.csv|manifest.json> [--category=...] [--workers=N]
+            if len(sys.argv) < 3:
+                print(json.dumps({
+                    "success": False,
+                    "error": "Missing source directory or manifest"
+                }))
+                return
+            
+            category = None
+            workers = None
+            for arg in sys.argv[3:]:
+                if arg.startswith("--category="):
+                    category = arg.split("=", 1)[1]
+                elif arg.startswith("--workers="):
+                    workers = int(arg.split("=", 1)[1])
+            
+            result = handle_bulk_ingest(sys.argv[2], category, workers)
+            print(json.dumps(result))
+            
         elif action == "list":
             # Parse optional parameters
             category = None
             search_term = None
             limit = 100
             offset = 0
+            cursor = None
+            with_total = False
+            fields = None
+            metadata_filters = []
+            with_metadata = False
             
             # Simple parameter parsing (can be enhanced)
             for i in range(2, len(sys.argv)):
@@ -168,14 +953,30 @@ def main():
                     limit = int(arg.split("=", 1)[1])
                 elif arg.startswith("--offset="):
                     offset = int(arg.split("=", 1)[1])
+                elif arg.startswith("--cursor="):
+                    cursor = arg.split("=", 1)[1]
+                elif arg == "--with-total":
+                    with_total = True
+                elif arg.startswith("--fields="):
+                    fields = arg.split("=", 1)[1]
+                elif arg.startswith("--meta="):
+                    # Repeatable: --meta=department=Conformité --meta=valid_until>=2025-01-01
+                    metadata_filters.append(arg.split("=", 1)[1])
+                elif arg == "--with-metadata":
+                    with_metadata = True
             
-            result = handle_list_documents(category, search_term, limit, offset)
+            result = handle_list_documents(category, search_term, limit, offset, cursor, with_total, fields,
+                                           metadata_filters, with_metadata)
             print(json.dumps(result))
             
         elif action == "stats":
             result = handle_get_statistics()
             print(json.dumps(result))
             
+        elif action == "reconcile-stats":
+            result = handle_reconcile_statistics()
+            print(json.dumps(result))
+            
         elif action == "delete":
             if len(sys.argv) < 3:
                 print(json.dumps({
@@ -196,10 +997,151 @@ def main():
                 }))
                 return
             
+            # get <id> [--access=view|download --actor=... --client=...]
+            options = {}
+            for arg in sys.argv[3:]:
+                for name in ("access", "actor", "client"):
+                    if arg.startswith(f"--{name}="):
+                        options[name] = arg.split("=", 1)[1]
+            
             document_id = int(sys.argv[2])
-            result = handle_get_document(document_id)
+            result = handle_get_document(document_id, **options)
             print(json.dumps(result))
             
+        elif action == "preview":
+            if len(sys.argv) < 3:
+                print(json.dumps({
+                    "success": False,
+                    "error": "Missing document ID"
+                }))
+                return
+            
+            # preview <id> [--actor=... --client=...]
+            options = {}
+            for arg in sys.argv[3:]:
+                for name in ("actor", "client"):
+                    if arg.startswith(f"--{name}="):
+                        options[name] = arg.split("=", 1)[1]
+            
+            result = handle_preview(int(sys.argv[2]), **options)
+            print(json.dumps(result))
+            
+        elif action in ("extract", "reindex"):
+            # extract: pending documents only; reindex: every document again
+            workers = None
+            for arg in sys.argv[2:]:
+                if arg.startswith("--workers="):
+                    workers = int(arg.split("=", 1)[1])
+            
+            result = handle_extract(workers, requeue_all=(action == "reindex"))
+            print(json.dumps(result))
+            
+        elif action == "extraction-status":
+            if len(sys.argv) < 3:
+                print(json.dumps({
+                    "success": False,
+                    "error": "Missing document ID"
+                }))
+                return
+            
+            result = handle_extraction_status(int(sys.argv[2]))
+            print(json.dumps(result))
+            
+        elif action == "get-many":
+            if len(sys.argv) < 3:
+                print(json.dumps({
+                    "success": False,
+                    "error": "Missing document IDs"
+                }))
+                return
+            
+            document_ids = [int(part) for part in sys.argv[2].split(",") if part.strip()]
+            result = handle_get_documents(document_ids)
+            print(json.dumps(result))
+            
+        elif action == "migrate-blobs":
+            result = handle_migrate_blobs()
+            print(json.dumps(result))
+            
+        elif action == "scrub":
+            # scrub [--limit=N] [--max-seconds=S] [--stale-hours=H] [--mbps=M] [--workers=N]
+            #       [--repair] [--no-orphans]
+            options = {}
+            for arg in sys.argv[2:]:
+                if arg.startswith("--limit="):
+                    options["limit"] = int(arg.split("=", 1)[1])
+                elif arg.startswith("--max-seconds="):
+                    options["max_seconds"] = float(arg.split("=", 1)[1])
+                elif arg.startswith("--stale-hours="):
+                    options["stale_hours"] = float(arg.split("=", 1)[1])
+                elif arg.startswith("--mbps="):
+                    options["mbps"] = float(arg.split("=", 1)[1])
+                elif arg.startswith("--workers="):
+                    options["workers"] = int(arg.split("=", 1)[1])
+                elif arg == "--repair":
+                    options["repair"] = True
+                elif arg == "--no-orphans":
+                    options["orphans"] = False
+            
+            result = handle_scrub(**options)
+            print(json.dumps(result))
+            
+        elif action == "scrub-status":
+            result = handle_scrub_status()
+            print(json.dumps(result))
+            
+        elif action == "access-log":
+            # access-log <id> [--limit=N]
+            if len(sys.argv) < 3:
+                print(json.dumps({
+                    "success": False,
+                    "error": "Missing document ID"
+                }))
+                return
+            
+            limit = 100
+            for arg in sys.argv[3:]:
+                if arg.startswith("--limit="):
+                    limit = int(arg.split("=", 1)[1])
+            
+            result = handle_access_log(int(sys.argv[2]), limit)
+            print(json.dumps(result))
+            
+        elif action == "top-documents":
+            # top-documents [--month=YYYY-MM] [--action=view|download] [--limit=N]
+            options = {}
+            for arg in sys.argv[2:]:
+                if arg.startswith("--month="):
+                    options["month"] = arg.split("=", 1)[1]
+                elif arg.startswith("--action="):
+                    options["action"] = arg.split("=", 1)[1]
+                elif arg.startswith("--limit="):
+                    options["limit"] = int(arg.split("=", 1)[1])
+            
+            result = handle_top_documents(**options)
+            print(json.dumps(result))
+            
+        elif action == "audit-rollup":
+            # audit-rollup [--retention-days=N]
+            retention_days = AUDIT_RETENTION_DAYS
+            for arg in sys.argv[2:]:
+                if arg.startswith("--retention-days="):
+                    retention_days = int(arg.split("=", 1)[1])
+            
+            result = handle_audit_rollup(retention_days)
+            print(json.dumps(result))
+            
+        elif action == "serve":
+            host = SERVICE_HOST
+            port = SERVICE_PORT
+            for arg in sys.argv[2:]:
+                if arg.startswith("--host="):
+                    host = arg.split("=", 1)[1]
+                elif arg.startswith("--port="):
+                    port = int(arg.split("=", 1)[1])
+            
+            serve(host, port)
+            
         elif action == "test":
             # Test connection
             result = {
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+DOC Secure Access Audit
+Records who viewed and downloaded which document. Entries are buffered in
+memory and written in batched transactions; old entries are rolled up into
+daily aggregates
+"""
+
+import os
+import sys
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+ACTION_VIEW = 'view'
+ACTION_DOWNLOAD = 'download'
+ACTIONS = (ACTION_VIEW, ACTION_DOWNLOAD)
+
+ANONYMOUS = 'anonymous'
+
+# Flush when this many entries are waiting, or after this many seconds
+AUDIT_BATCH_SIZE = 200
+AUDIT_FLUSH_SECONDS = 2.0
+# Entries kept while the database cannot be written; beyond it the oldest are dropped
+AUDIT_MAX_BUFFER = 100000
+# Individual entries are kept this long, then only their daily counts
+AUDIT_RETENTION_DAYS = int(os.environ.get('DOCSECURE_AUDIT_RETENTION_DAYS', '90'))
+ROLLUP_INTERVAL_SECONDS = 3600
+
+
+class AuditLog:
+    """Buffered writer and query API for the access_log and access_daily tables"""
+
+    def __init__(self, db, batch_size: int = AUDIT_BATCH_SIZE, flush_interval: float = AUDIT_FLUSH_SECONDS):
+        """
+        Args:
+            db (DocSecureDatabase): Database holding the audit tables
+            batch_size (int): Entries that trigger a flush
+            flush_interval (float): Seconds an entry may wait when started in the background
+        """
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffer = []
+        self._lock = threading.Lock()
+        # Serializes flushes so entries are written in the order they were taken
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_rollup = 0.0
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+
+    def record(self, document_id: int, action: str, actor: Optional[str] = None, client: Optional[str] = None):
+        """Queue one access; cheap enough to call on every request"""
+        if action not in ACTIONS:
+            raise ValueError(f"Invalid audit action '{action}'. Must be one of: {', '.join(ACTIONS)}")
+        entry = (int(document_id), action, actor or ANONYMOUS, client,
+                 datetime.now().isoformat(timespec='milliseconds'))
+        with self._lock:
+            self._buffer.append(entry)
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            if self._thread is not None:
+                self._wakeup.set()
+            else:
+                self.flush()
+
+    def flush(self) -> int:
+        """Write every queued entry in one transaction; returns how many were written"""
+        with self._flush_lock:
+            with self._lock:
+                entries, self._buffer = self._buffer, []
+            if not entries:
+                return 0
+            try:
+                with self.db._db.transaction() as conn:
+                    conn.executemany(
+                        'INSERT INTO access_log (document_id, action, actor, client, accessed_at) '
+                        'VALUES (?, ?, ?, ?, ?)', entries
+                    )
+            except Exception:
+                # Keep them for the next attempt, ahead of anything queued meanwhile
+                with self._lock:
+                    self._buffer[:0] = entries
+                    overflow = len(self._buffer) - AUDIT_MAX_BUFFER
+                    if overflow > 0:
+                        del self._buffer[:overflow]
+                        print(f"Audit buffer full: dropped {overflow} entries", file=sys.stderr)
+                raise
+            return len(entries)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._buffer)
+
+    # ------------------------------------------------------------------
+    # Retention
+    # ------------------------------------------------------------------
+
+    def rollup(self, retention_days: int = AUDIT_RETENTION_DAYS) -> Dict[str, int]:
+        """Fold entries older than retention_days into access_daily and delete them"""
+        cutoff = (date.today() - timedelta(days=retention_days)).isoformat()
+        with self.db._db.transaction() as conn:
+            aggregated = conn.execute('''
+                INSERT INTO access_daily (day, document_id, action, actor, accesses)
+                SELECT substr(accessed_at, 1, 10), document_id, action, actor, COUNT(*)
+                FROM access_log WHERE accessed_at < ?
+                GROUP BY 1, 2, 3, 4
+                ON CONFLICT (day, document_id, action, actor) DO UPDATE SET
+                    accesses = accesses + excluded.accesses
+            ''', (cutoff,)).rowcount
+            deleted = conn.execute('DELETE FROM access_log WHERE accessed_at < ?', (cutoff,)).rowcount
+        return {'rolled_up_entries': deleted, 'daily_rows': aggregated}
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def document_accesses(self, document_id: int, limit: int = 100) -> Dict:
+        """
+        Who accessed a document: recent individual entries, newest first, and
+        the daily counts of entries past retention
+        """
+        self.flush()
+        conn = self.db._db.connection()
+        entries = [
+            {'action': row[0], 'actor': row[1], 'client': row[2], 'accessed_at': row[3]}
+            for row in conn.execute('''
+                SELECT action, actor, client, accessed_at FROM access_log
+                WHERE document_id = ? ORDER BY accessed_at DESC LIMIT ?
+            ''', (document_id, limit))
+        ]
+        daily = [
+            {'day': row[0], 'action': row[1], 'actor': row[2], 'accesses': row[3]}
+            for row in conn.execute('''
+                SELECT day, action, actor, accesses FROM access_daily
+                WHERE document_id = ? ORDER BY day DESC LIMIT ?
+            ''', (document_id, limit))
+        ]
+        actors = [
+            {'actor': row[0], 'accesses': row[1], 'last_access': row[2]}
+            for row in conn.execute('''
+                SELECT actor, SUM(accesses), MAX(last_access) FROM (
+                    SELECT actor, COUNT(*) AS accesses, MAX(accessed_at) AS last_access
+                    FROM access_log WHERE document_id = ? GROUP BY actor
+                    UNION ALL
+                    SELECT actor, SUM(accesses), MAX(day)
+                    FROM access_daily WHERE document_id = ? GROUP BY actor
+                ) GROUP BY actor ORDER BY 2 DESC
+            ''', (document_id, document_id))
+        ]
+        return {'document_id': document_id, 'actors': actors, 'entries': entries, 'daily': daily}
+
+    def top_documents(self, month: Optional[str] = None, action: Optional[str] = None,
+                      limit: int = 10) -> List[Dict]:
+        """
+        Most accessed documents of a month ('YYYY-MM', default this month),
+        counting individual entries and rolled-up days alike
+        """
+        self.flush()
+        first = datetime.strptime(month, '%Y-%m').date() if month else date.today().replace(day=1)
+        following = (first + timedelta(days=32)).replace(day=1)
+        start, end = first.isoformat(), following.isoformat()
+
+        action_condition = ' AND action = ?' if action else ''
+        params = [start, end] + ([action] if action else []) + [start, end] + ([action] if action else [])
+        rows = self.db._db.connection().execute(f'''
+            SELECT a.document_id, d.title, d.category, SUM(a.accesses) AS accesses,
+                   COUNT(DISTINCT a.actor) AS actors
+            FROM (
+                SELECT document_id, actor, COUNT(*) AS accesses
+                FROM access_log WHERE accessed_at >= ? AND accessed_at < ?{action_condition}
+                GROUP BY document_id, actor
+                UNION ALL
+                SELECT document_id, actor, SUM(accesses)
+                FROM access_daily WHERE day >= ? AND day < ?{action_condition}
+                GROUP BY document_id, actor
+            ) a
+            LEFT JOIN documents d ON d.id = a.document_id
+            GROUP BY a.document_id
+            ORDER BY accesses DESC, a.document_id
+            LIMIT ?
+        ''', params + [limit]).fetchall()
+        return [
+            {'document_id': row[0], 'title': row[1], 'category': row[2],
+             'accesses': row[3], 'actors': row[4]}
+            for row in rows
+        ]
+
+    # ------------------------------------------------------------------
+    # Long-running mode
+    # ------------------------------------------------------------------
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+                now = datetime.now().timestamp()
+                if now - self._last_rollup > ROLLUP_INTERVAL_SECONDS:
+                    self._last_rollup = now
+                    self.rollup()
+            except Exception as e:
+                print(f"Audit flush error: {e}", file=sys.stderr)
+
+    def start(self):
+        """Flush in a background thread every flush_interval, or sooner when a batch fills"""
+        self._thread = threading.Thread(target=self._run, name='docsecure-audit', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread and write what is still queued"""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+        self.flush()
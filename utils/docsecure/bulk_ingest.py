@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+DOC Secure Bulk Ingestion
+Imports many files at once from a directory or a CSV/JSON manifest: hashes
+on a thread pool, deduplicates with one query, copies new content in
+parallel and inserts every document in a single transaction
+"""
+
+import os
+import csv
+import json
+import time
+import hashlib
+import mimetypes
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from database import INCOMING_FOLDER, IO_BUFFER_SIZE
+
+STATUS_STORED = 'stored'         # new content copied into the object store
+STATUS_LINKED = 'linked'         # content already stored; only a document row was added
+STATUS_DUPLICATE = 'duplicate'   # same content, category and title already exist
+STATUS_ERROR = 'error'
+
+# Manifest fields that are not metadata
+MANIFEST_COLUMNS = ('path', 'title', 'category', 'description')
+
+
+def _hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(IO_BUFFER_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(manifest_path) -> List[Dict]:
+    """
+    Read items from a CSV (header: path,title,category,description, any other
+    column becoming a metadata key) or a JSON list of objects with the same keys
+    and an optional metadata object. Relative paths are resolved against the
+    manifest's folder.
+    """
+    manifest_path = Path(manifest_path)
+    is_json = manifest_path.suffix.lower() == '.json'
+    if is_json:
+        with open(manifest_path, encoding='utf-8') as f:
+            entries = json.load(f)
+    else:
+        with open(manifest_path, newline='', encoding='utf-8-sig') as f:
+            entries = list(csv.DictReader(f))
+
+    items = []
+    for entry in entries:
+        if is_json:
+            metadata = entry.get('metadata') or {}
+        else:
+            metadata = {key: value for key, value in entry.items()
+                        if key and key not in MANIFEST_COLUMNS and value not in (None, '')}
+        path = Path(entry.get('path') or '')
+        if not path.is_absolute():
+            path = manifest_path.parent / path
+        items.append({
+            'path': path,
+            'title': entry.get('title') or '',
+            'category': entry.get('category') or '',
+            'description': entry.get('description') or '',
+            'metadata': metadata
+        })
+    return items
+
+
+def is_within(path, root) -> bool:
+    """Whether path, symlinks resolved, is root or below it"""
+    return Path(path).resolve().is_relative_to(Path(root).resolve())
+
+
+class BulkIngester:
+    """Adds many documents to a DocSecureDatabase in one pass"""
+
+    def __init__(self, db, workers: Optional[int] = None, import_root=None):
+        """
+        Args:
+            db (DocSecureDatabase): Destination archive
+            workers (int): Threads hashing and copying; hashlib and file I/O release the GIL
+            import_root (str): If set, files outside this folder (after resolving
+                symlinks) are refused, including those a manifest names
+        """
+        self.db = db
+        self.workers = workers or min(32, (os.cpu_count() or 2) * 4)
+        self.import_root = import_root
+
+    def scan_directory(self, root, category: Optional[str] = None) -> List[Dict]:
+        """
+        Items for every allowed file below root. Without a category, the first
+        folder level decides it, by category name or storage folder name
+        (e.g. procedures/ or "Procédures/").
+        """
+        root = Path(root)
+        by_folder = {}
+        for name, folder in self.db.categories.items():
+            by_folder[name.lower()] = name
+            by_folder[folder.lower()] = name
+
+        items = []
+        for dirpath, _, filenames in os.walk(root):
+            for filename in sorted(filenames):
+                path = Path(dirpath) / filename
+                if path.suffix.lower() not in self.db.allowed_extensions:
+                    continue
+                item_category = category
+                if item_category is None:
+                    parts = path.relative_to(root).parts
+                    item_category = by_folder.get(parts[0].lower(), '') if len(parts) > 1 else ''
+                items.append({
+                    'path': path,
+                    'title': path.stem.replace('_', ' ').strip(),
+                    'category': item_category,
+                    'description': '',
+                    'metadata': {}
+                })
+        return items
+
+    def _validate(self, item: Dict) -> Optional[str]:
+        path = item['path']
+        if not item['title']:
+            return "Missing title"
+        if item['category'] not in self.db.categories:
+            return f"Invalid category. Must be one of: {', '.join(self.db.categories.keys())}"
+        if path.suffix.lower() not in self.db.allowed_extensions:
+            return f"File type '{path.suffix.lower()}' is not allowed"
+        if self.import_root is not None and not is_within(path, self.import_root):
+            return "File is outside the import root"
+        try:
+            size = path.stat().st_size
+        except OSError as e:
+            return f"Cannot read file: {e.strerror}"
+        if size == 0:
+            return "File is empty"
+        if size > self.db.max_file_size:
+            return f"File size ({size / 1024 / 1024:.2f}MB) exceeds maximum allowed size (50MB)"
+        item['size'] = size
+        return None
+
+    def _stage(self, source: Path, expected_hash: str) -> Path:
+        """Copy a file into .incoming, checking it still has the hash it was planned with"""
+        incoming_path = self.db.base_path / INCOMING_FOLDER
+        fd, temp_name = tempfile.mkstemp(dir=incoming_path, suffix=source.suffix.lower())
+        digest = hashlib.sha256()
+        try:
+            with os.fdopen(fd, 'wb') as target, open(source, 'rb') as f:
+                for chunk in iter(lambda: f.read(IO_BUFFER_SIZE), b''):
+                    digest.update(chunk)
+                    target.write(chunk)
+            if digest.hexdigest() != expected_hash:
+                raise ValueError("File changed while it was being imported")
+            os.chmod(temp_name, 0o644)
+        except BaseException:
+            os.unlink(temp_name)
+            raise
+        return Path(temp_name)
+
+    def ingest(self, items: List[Dict]) -> Dict:
+        """
+        Import items (dicts with path, title, category, description, metadata)
+
+        Returns:
+            Dict: per-item results in input order and counts per status
+        """
+        started = time.perf_counter()
+        results = [{'path': str(item['path']), 'title': item['title'], 'status': None} for item in items]
+
+        def fail(index, message):
+            results[index].update(status=STATUS_ERROR, message=message)
+
+        pending = []
+        for index, item in enumerate(items):
+            item['path'] = Path(item['path'])
+            error = self._validate(item)
+            if error:
+                fail(index, error)
+            else:
+                pending.append(index)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            # 1. Hash in parallel
+            hashes = {}
+            for index, outcome in zip(pending, executor.map(self._try_hash, [items[i]['path'] for i in pending])):
+                if isinstance(outcome, Exception):
+                    fail(index, f"Cannot read file: {outcome}")
+                else:
+                    hashes[index] = outcome
+            pending = [index for index in pending if index in hashes]
+
+            # 2. One query against what the archive already holds
+            existing_entries, existing_blobs = self._lookup(set(hashes.values()))
+
+            # 3. Plan: skip duplicates (also within the batch), copy each new content once
+            to_insert = []
+            to_copy = {}
+            # entry -> index of the item that adds it in this batch
+            batch_entries = {}
+            batch_duplicates = []
+            for index in pending:
+                item = items[index]
+                file_hash = hashes[index]
+                entry = (file_hash, item['category'], item['title'])
+                if entry in existing_entries or entry in batch_entries:
+                    results[index].update(
+                        status=STATUS_DUPLICATE, documentId=existing_entries.get(entry),
+                        message=f"File already exists with title: '{item['title']}'"
+                    )
+                    if entry in batch_entries:
+                        batch_duplicates.append((index, batch_entries[entry]))
+                    continue
+                batch_entries[entry] = index
+                to_insert.append(index)
+                if file_hash not in existing_blobs and file_hash not in to_copy:
+                    to_copy[file_hash] = index
+
+            # 4. Copy new content into .incoming in parallel
+            (self.db.base_path / INCOMING_FOLDER).mkdir(exist_ok=True)
+            staged = {}
+            copy_hashes = list(to_copy)
+            outcomes = executor.map(self._try_stage, [(items[to_copy[h]]['path'], h) for h in copy_hashes])
+            for file_hash, outcome in zip(copy_hashes, outcomes):
+                if isinstance(outcome, Exception):
+                    # Every item sharing this content fails with it
+                    for index in to_insert:
+                        if hashes[index] == file_hash:
+                            fail(index, f"Copy failed: {outcome}")
+                else:
+                    staged[file_hash] = outcome
+            to_insert = [index for index in to_insert if results[index]['status'] is None]
+
+        # 5. One transaction for every row; objects are placed under the same write lock
+        try:
+            self._insert(items, hashes, to_insert, staged, results)
+        except Exception as e:
+            # Rolled back: nothing from this batch was recorded
+            for index in to_insert:
+                fail(index, f"Database error: {str(e)}")
+        finally:
+            for temp_path in staged.values():
+                temp_path.unlink(missing_ok=True)
+        for index, first in batch_duplicates:
+            results[index]['documentId'] = results[first].get('documentId')
+
+        counts = {status: 0 for status in (STATUS_STORED, STATUS_LINKED, STATUS_DUPLICATE, STATUS_ERROR)}
+        for result in results:
+            counts[result['status']] += 1
+        return {
+            'results': results,
+            'counts': counts,
+            'durationMs': int((time.perf_counter() - started) * 1000)
+        }
+
+    def _try_hash(self, path: Path):
+        try:
+            return _hash_file(path)
+        except OSError as e:
+            return e
+
+    def _try_stage(self, job):
+        try:
+            return self._stage(*job)
+        except (OSError, ValueError) as e:
+            return e
+
+    def _lookup(self, file_hashes):
+        """Existing (hash, category, title) -> id, and hashes already in the object store"""
+        conn = self.db._db.connection()
+        conn.execute('CREATE TEMP TABLE IF NOT EXISTS bulk_hashes (file_hash TEXT PRIMARY KEY)')
+        conn.execute('DELETE FROM bulk_hashes')
+        try:
+            conn.executemany('INSERT OR IGNORE INTO bulk_hashes VALUES (?)', [(h,) for h in file_hashes])
+            entries = {
+                (file_hash, category, title): document_id
+                for document_id, file_hash, category, title in conn.execute('''
+                    SELECT d.id, d.file_hash, d.category, d.title
+                    FROM documents d JOIN bulk_hashes USING (file_hash)
+                ''')
+            }
+            blobs = {row[0] for row in conn.execute('SELECT file_hash FROM blobs JOIN bulk_hashes USING (file_hash)')}
+        finally:
+            conn.execute('DELETE FROM bulk_hashes')
+        return entries, blobs
+
+    def _insert(self, items, hashes, to_insert, staged, results):
+        db = self.db
+        # Objects moved into the store by this batch, removed again if it rolls back
+        placed = []
+        with db._db.transaction() as conn:
+            try:
+                for index in to_insert:
+                    item = items[index]
+                    file_hash = hashes[index]
+                    blob_relative = db._blob_relative_path(file_hash)
+                    blob_path = db.base_path / blob_relative
+
+                    status = STATUS_LINKED
+                    if not blob_path.exists():
+                        temp_path = staged.pop(file_hash, None)
+                        if temp_path is None:
+                            # Collected since the lookup; copy it again while holding the lock
+                            temp_path = self._try_stage((item['path'], file_hash))
+                            if isinstance(temp_path, Exception):
+                                results[index].update(status=STATUS_ERROR, message=f"Copy failed: {temp_path}")
+                                continue
+                        blob_path.parent.mkdir(parents=True, exist_ok=True)
+                        os.replace(temp_path, blob_path)
+                        placed.append(blob_path)
+                        status = STATUS_STORED
+
+                    original_filename = item['path'].name
+                    mime_type, _ = mimetypes.guess_type(original_filename)
+                    cursor = conn.execute('''
+                        INSERT INTO documents
+                        (title, original_filename, stored_filename, category, description,
+                         file_size, file_hash, mime_type, file_path, metadata)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ''', (
+                        item['title'],
+                        original_filename,
+                        db._generate_unique_filename(original_filename, item['category']),
+                        item['category'],
+                        item['description'],
+                        item['size'],
+                        file_hash,
+                        mime_type,
+                        blob_relative,
+                        json.dumps(item['metadata'] or {})
+                    ))
+                    conn.execute('''
+                        INSERT INTO blobs (file_hash, file_size, refcount) VALUES (?, ?, 1)
+                        ON CONFLICT (file_hash) DO UPDATE SET refcount = refcount + 1
+                    ''', (file_hash, item['size']))
+                    results[index].update(status=status, documentId=cursor.lastrowid)
+            except BaseException:
+                # Still under the write lock: no upload can have referenced them yet
+                for blob_path in placed:
+                    blob_path.unlink(missing_ok=True)
+                raise
+
+    def ingest_source(self, source, category: Optional[str] = None) -> Dict:
+        """Import a directory, or a .csv/.json manifest"""
+        source = Path(source)
+        if source.is_dir():
+            items = self.scan_directory(source, category)
+        else:
+            items = load_manifest(source)
+            if category:
+                for item in items:
+                    item['category'] = item['category'] or category
+        return self.ingest(items)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+DOC Secure SQLite Connection Manager
+Long-lived per-thread connections in WAL mode, tuned pragmas and
+versioned schema migrations applied once per database
+"""
+
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence, Union
+
+# A migration is a list of SQL statements or a callable taking the connection
+Migration = Union[Sequence[str], Callable[[sqlite3.Connection], None]]
+
+PRAGMAS = (
+    'PRAGMA journal_mode = WAL',       # readers never block the writer and vice versa
+    'PRAGMA synchronous = NORMAL',     # durable across app crashes; WAL makes FULL unnecessary
+    'PRAGMA cache_size = -16000',      # 16 MB page cache per connection
+    'PRAGMA mmap_size = 268435456',    # 256 MB memory-mapped reads
+    'PRAGMA temp_store = MEMORY',
+    'PRAGMA foreign_keys = ON',
+)
+
+BUSY_TIMEOUT_SECONDS = 30
+STATEMENT_CACHE_SIZE = 256
+
+
+class ConnectionManager:
+    """Hands out one SQLite connection per thread for a database file"""
+
+    def __init__(self, db_path: Path, migrations: List[Migration]):
+        self.db_path = Path(db_path)
+        self.migrations = migrations
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._migrated = False
+
+    def _open(self) -> sqlite3.Connection:
+        # Autocommit mode: writes are grouped explicitly with transaction()
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=BUSY_TIMEOUT_SECONDS,
+            isolation_level=None,
+            cached_statements=STATEMENT_CACHE_SIZE
+        )
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def connection(self) -> sqlite3.Connection:
+        """The calling thread's connection, opened and migrated on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._open()
+            self._local.conn = conn
+        if not self._migrated:
+            self._migrate(conn)
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """Run a block in one write transaction, taking the write lock up front"""
+        conn = self.connection()
+        if conn.in_transaction:
+            # Nested use joins the enclosing transaction
+            yield conn
+            return
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def schema_version(self) -> int:
+        return self.connection().execute('PRAGMA user_version').fetchone()[0]
+
+    def _migrate(self, conn: sqlite3.Connection):
+        """Bring the schema up to len(migrations), once per process"""
+        with self._lock:
+            if self._migrated:
+                return
+            target = len(self.migrations)
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+            if version < target:
+                # Table rebuilds must not cascade deletes to child rows, so foreign
+                # keys are off while migrating and checked before committing
+                conn.execute('PRAGMA foreign_keys = OFF')
+                # Another process may be migrating too; re-check under the write lock
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    version = conn.execute('PRAGMA user_version').fetchone()[0]
+                    for number in range(version, target):
+                        migration = self.migrations[number]
+                        if callable(migration):
+                            migration(conn)
+                        else:
+                            for statement in migration:
+                                conn.execute(statement)
+                        conn.execute(f'PRAGMA user_version = {number + 1}')
+                    violation = conn.execute('PRAGMA foreign_key_check').fetchone()
+                    if violation is not None:
+                        raise sqlite3.IntegrityError(f'Migration broke a foreign key: {violation}')
+                    conn.execute('COMMIT')
+                except BaseException:
+                    conn.execute('ROLLBACK')
+                    raise
+                finally:
+                    conn.execute('PRAGMA foreign_keys = ON')
+            self._migrated = True
+
+    def close(self):
+        """Close the calling thread's connection"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+_managers: Dict[str, ConnectionManager] = {}
+_managers_lock = threading.Lock()
+
+
+def get_manager(db_path: Path, migrations: List[Migration]) -> ConnectionManager:
+    """Process-wide connection manager for a database file"""
+    key = str(Path(db_path).absolute())
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            manager = ConnectionManager(Path(key), migrations)
+            _managers[key] = manager
+        return manager
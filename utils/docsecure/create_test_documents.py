@@ -3,17 +3,16 @@
 Create real test documents in the proper docsecureDOCS folder structure
 """
 
-import os
 import sys
 from pathlib import Path
-import json
-from datetime import datetime
+import tempfile
 
 # Add the current directory to path so we can import our database module
 current_dir = Path(__file__).parent
 sys.path.insert(0, str(current_dir))
 
 from database import DocSecureDatabase
+from bulk_ingest import BulkIngester
 
 def create_real_test_documents():
     """Create real PDF-like documents in the docsecureDOCS folders"""
@@ -408,65 +407,31 @@ startxref
     
     print("Creating real test documents...")
     
-    for doc_info in test_docs:
-        # Create the document file directly in the appropriate category folder
-        category_folder = db.categories[doc_info["category"]]
-        category_path = db.base_path / category_folder
+    # Write the PDF files, then import them in one batch into the object store
+    with tempfile.TemporaryDirectory() as temp_dir:
+        items = []
+        for doc_info in test_docs:
+            file_path = Path(temp_dir) / doc_info["filename"]
+            with open(file_path, 'w', encoding='latin-1') as f:
+                f.write(doc_info["content"])
+            items.append({
+                "path": file_path,
+                "title": doc_info["title"],
+                "category": doc_info["category"],
+                "description": doc_info["description"],
+                "metadata": {}
+            })
         
-        # Generate unique filename with timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        clean_name = "".join(c for c in doc_info["filename"].replace('.pdf', '') if c.isalnum() or c in (' ', '-', '_')).rstrip()
-        unique_filename = f"{timestamp}_{clean_name}.pdf"
-        file_path = category_path / unique_filename
-        
-        # Write the PDF content to the file
-        with open(file_path, 'w', encoding='latin-1') as f:
-            f.write(doc_info["content"])
-        
-        # Get file size
-        file_size = file_path.stat().st_size
-        
-        # Insert into database using raw SQL (bypassing the upload_document validation)
-        import sqlite3
-        import hashlib
-        import json
-        
-        # Calculate file hash
-        hash_sha256 = hashlib.sha256()
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_sha256.update(chunk)
-        file_hash = hash_sha256.hexdigest()
-        
-        # Insert into database
-        conn = sqlite3.connect(db.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO documents 
-            (title, original_filename, stored_filename, category, description, 
-             file_size, file_hash, mime_type, file_path, metadata)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            doc_info["title"],
-            doc_info["filename"],
-            unique_filename,
-            doc_info["category"],
-            doc_info["description"],
-            file_size,
-            file_hash,
-            "application/pdf",
-            str(Path(category_folder) / unique_filename),
-            json.dumps({})
-        ))
-        
-        document_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        
-        print(f"[OK] Created: {doc_info['title']} (ID: {document_id})")
-        print(f"     File: {file_path}")
-        print(f"     Size: {file_size} bytes")
+        report = BulkIngester(db).ingest(items)
+    
+    for result in report["results"]:
+        if result["status"] in ("stored", "linked"):
+            document = db.get_document_by_id(result["documentId"])
+            print(f"[OK] Created: {result['title']} (ID: {result['documentId']})")
+            print(f"     File: {db.base_path / document['file_path']}")
+            print(f"     Size: {document['file_size']} bytes")
+        else:
+            print(f"[ERROR] Failed: {result['title']} - {result['message']}")
     
     # Show final statistics
     stats = db.get_statistics()
@@ -477,14 +442,13 @@ startxref
     for category, count in stats['category_counts'].items():
         print(f"  - {category}: {count}")
     
-    # List actual files in each directory
-    print(f"\nActual files in docsecureDOCS:")
-    for category_name, folder_name in db.categories.items():
-        category_path = db.base_path / folder_name
-        files = list(category_path.glob("*.pdf"))
-        print(f"  {category_name} ({folder_name}): {len(files)} files")
-        for file in files:
-            print(f"    - {file.name}")
+    # List the stored documents per category
+    print(f"\nStored documents in docsecureDOCS:")
+    for category_name in db.categories:
+        documents = db.get_documents(category=category_name)
+        print(f"  {category_name}: {len(documents)} documents")
+        for document in documents:
+            print(f"    - {document['original_filename']} -> {document['file_path']}")
 
 if __name__ == "__main__":
     create_real_test_documents()
\ No newline at end of file
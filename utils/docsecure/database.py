@@ -5,14 +5,431 @@ Handles document storage, categorization, and metadata management
 """
 
 import os
+import re
 import json
 import sqlite3
 import hashlib
 import mimetypes
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import BinaryIO, Dict, List, Optional, Tuple
+import io
+import base64
 import shutil
+import tempfile
+import threading
+
+from connection import get_manager
+
+# Content-addressed store: a file lives once at objects/<hash[:2]>/<hash[2:]>
+OBJECTS_FOLDER = 'objects'
+
+# Keep the search index in step with documents; recreated when the table is rebuilt
+SEARCH_TRIGGERS = (
+    '''
+        CREATE TRIGGER IF NOT EXISTS documents_fts_insert AFTER INSERT ON documents BEGIN
+            INSERT INTO documents_fts (rowid, title, description, content)
+            VALUES (new.id, new.title, coalesce(new.description, ''), '');
+        END
+    ''',
+    '''
+        CREATE TRIGGER IF NOT EXISTS documents_fts_update AFTER UPDATE OF title, description ON documents BEGIN
+            UPDATE documents_fts SET title = new.title, description = coalesce(new.description, '')
+            WHERE rowid = new.id;
+        END
+    ''',
+    '''
+        CREATE TRIGGER IF NOT EXISTS documents_fts_delete AFTER DELETE ON documents BEGIN
+            DELETE FROM documents_fts WHERE rowid = old.id;
+        END
+    ''',
+)
+
+EXTRACTION_QUEUE_TRIGGER = '''
+    CREATE TRIGGER IF NOT EXISTS documents_extraction_queue AFTER INSERT ON documents BEGIN
+        INSERT INTO extraction_jobs (document_id, status, queued_at)
+        VALUES (new.id, 'pending', strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime'));
+    END
+'''
+
+DOCUMENT_INDEXES = (
+    'CREATE INDEX IF NOT EXISTS idx_category ON documents(category)',
+    'CREATE INDEX IF NOT EXISTS idx_title ON documents(title)',
+    'CREATE INDEX IF NOT EXISTS idx_upload_date ON documents(upload_date)',
+    'CREATE INDEX IF NOT EXISTS idx_file_hash ON documents(file_hash)',
+)
+
+
+def _fts5_available(conn) -> bool:
+    try:
+        conn.execute('CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)')
+        conn.execute('DROP TABLE temp.fts5_probe')
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def _create_search_index(conn):
+    """FTS5 index over title, description and extracted content, synced by triggers"""
+    if not _fts5_available(conn):
+        # SQLite built without FTS5: searches fall back to LIKE
+        return
+    
+    # unicode61 with remove_diacritics 2 matches 'procedure' against 'Procédure';
+    # the prefix indexes make 'proc*' lookups cheap
+    conn.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+            title, description, content,
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3 4'
+        )
+    ''')
+    for statement in SEARCH_TRIGGERS:
+        conn.execute(statement)
+    conn.execute('''
+        INSERT INTO documents_fts (rowid, title, description, content)
+        SELECT id, title, coalesce(description, ''), '' FROM documents
+        WHERE id NOT IN (SELECT rowid FROM documents_fts)
+    ''')
+
+def _create_blob_store(conn):
+    """Rebuild documents without UNIQUE(file_hash) and add the refcounted blobs table"""
+    # SQLite cannot drop a constraint in place: copy into a new table and swap it in
+    conn.execute('''
+        CREATE TABLE documents_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            original_filename TEXT NOT NULL,
+            stored_filename TEXT NOT NULL,
+            category TEXT NOT NULL,
+            description TEXT,
+            file_size INTEGER NOT NULL,
+            file_hash TEXT NOT NULL,
+            mime_type TEXT,
+            upload_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_modified TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            file_path TEXT NOT NULL,
+            metadata TEXT  -- JSON string for additional metadata
+        )
+    ''')
+    conn.execute('INSERT INTO documents_new SELECT * FROM documents')
+    # Keep AUTOINCREMENT from reusing the IDs of documents deleted before the rebuild
+    sequence = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'documents'").fetchone()
+    conn.execute('DROP TABLE documents')
+    conn.execute('ALTER TABLE documents_new RENAME TO documents')
+    if sequence is not None:
+        conn.execute("UPDATE sqlite_sequence SET seq = max(seq, ?) WHERE name = 'documents'", sequence)
+    
+    for statement in DOCUMENT_INDEXES:
+        conn.execute(statement)
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'documents_fts'").fetchone():
+        for statement in SEARCH_TRIGGERS:
+            conn.execute(statement)
+    conn.execute(EXTRACTION_QUEUE_TRIGGER)
+    
+    # One row per stored object; refcount is the number of documents pointing at it.
+    # Files uploaded before this migration stay in their category folders, unreferenced
+    # here, until DocSecureDatabase.migrate_legacy_files() moves them into the store
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS blobs (
+            file_hash TEXT PRIMARY KEY,
+            file_size INTEGER NOT NULL,
+            refcount INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+# Materialized statistics: (dimension, key) -> documents and bytes, kept current by
+# triggers. Keys are SQL expressions over the row ('{row}' is new or old); a NULL
+# key leaves the row out of that dimension
+STAT_DIMENSIONS = (
+    ('total', "''"),
+    ('category', '{row}.category'),
+    ('mime_type', "coalesce({row}.mime_type, '')"),
+    ('month', "strftime('%Y-%m', {row}.upload_date)"),
+    # Files still in category folders, outside the object store
+    ('legacy', f"CASE WHEN {{row}}.file_path NOT LIKE '{OBJECTS_FOLDER}/%' THEN '' END"),
+)
+
+
+def _stats_add(dimension: str, key: str, row: str) -> str:
+    key = key.replace('{row}', row)
+    return f'''
+        INSERT INTO doc_stats (dimension, key, documents, bytes)
+        SELECT '{dimension}', {key}, 1, {row}.file_size WHERE {key} IS NOT NULL
+        ON CONFLICT (dimension, key) DO UPDATE SET
+            documents = documents + 1, bytes = bytes + excluded.bytes;
+    '''
+
+
+def _stats_remove(dimension: str, key: str, row: str) -> str:
+    key = key.replace('{row}', row)
+    return f'''
+        UPDATE doc_stats SET documents = documents - 1, bytes = bytes - {row}.file_size
+        WHERE dimension = '{dimension}' AND key = {key};
+        DELETE FROM doc_stats WHERE dimension = '{dimension}' AND key = {key} AND documents <= 0;
+    '''
+
+
+STATS_TRIGGERS = (
+    'CREATE TRIGGER IF NOT EXISTS documents_stats_insert AFTER INSERT ON documents BEGIN'
+    + ''.join(_stats_add(dimension, key, 'new') for dimension, key in STAT_DIMENSIONS)
+    + 'END',
+    'CREATE TRIGGER IF NOT EXISTS documents_stats_delete AFTER DELETE ON documents BEGIN'
+    + ''.join(_stats_remove(dimension, key, 'old') for dimension, key in STAT_DIMENSIONS)
+    + 'END',
+    'CREATE TRIGGER IF NOT EXISTS documents_stats_update '
+    'AFTER UPDATE OF category, mime_type, file_size, upload_date, file_path ON documents BEGIN'
+    + ''.join(_stats_remove(dimension, key, 'old') for dimension, key in STAT_DIMENSIONS)
+    + ''.join(_stats_add(dimension, key, 'new') for dimension, key in STAT_DIMENSIONS)
+    + 'END',
+    # Stored objects, each counted once however many documents share it
+    'CREATE TRIGGER IF NOT EXISTS blobs_stats_insert AFTER INSERT ON blobs BEGIN'
+    + _stats_add('blobs', "''", 'new')
+    + 'END',
+    'CREATE TRIGGER IF NOT EXISTS blobs_stats_delete AFTER DELETE ON blobs BEGIN'
+    + _stats_remove('blobs', "''", 'old')
+    + 'END',
+)
+
+
+def _recompute_stats(conn):
+    """Rebuild doc_stats from the documents and blobs tables"""
+    conn.execute('DELETE FROM doc_stats')
+    for dimension, key in STAT_DIMENSIONS:
+        key = key.replace('{row}', 'documents')
+        conn.execute(f'''
+            INSERT INTO doc_stats (dimension, key, documents, bytes)
+            SELECT '{dimension}', {key}, COUNT(*), SUM(file_size) FROM documents
+            WHERE {key} IS NOT NULL GROUP BY {key}
+        ''')
+    conn.execute('''
+        INSERT INTO doc_stats (dimension, key, documents, bytes)
+        SELECT 'blobs', '', COUNT(*), SUM(file_size) FROM blobs HAVING COUNT(*) > 0
+    ''')
+
+
+# Metadata keys promoted to indexed generated columns (SQLite JSON1), so lists can
+# filter on them. Adding a key: extend this and append another
+# _create_metadata_columns migration. Dates are ISO strings and compare as text
+METADATA_SCHEMA = {
+    'department': 'TEXT',
+    'version': 'TEXT',
+    'valid_from': 'TEXT',
+    'valid_until': 'TEXT',
+}
+
+# key=value, key!=value, key<value, key<=value, key>value, key>=value
+METADATA_FILTER_PATTERN = re.compile(r'^\s*(\w+)\s*(<=|>=|!=|=|<|>)\s*(.*?)\s*$')
+
+
+def _metadata_column(key: str) -> str:
+    return f'meta_{key}'
+
+
+def _create_metadata_columns(conn):
+    """Generated column and index for every METADATA_SCHEMA key not promoted yet"""
+    existing = {row[1] for row in conn.execute('PRAGMA table_xinfo(documents)')}
+    for key, sql_type in METADATA_SCHEMA.items():
+        column = _metadata_column(key)
+        if column not in existing:
+            # VIRTUAL: computed on read, so adding it does not rewrite the table;
+            # json_valid keeps one malformed row from failing every query
+            conn.execute(f'''
+                ALTER TABLE documents ADD COLUMN {column} {sql_type}
+                GENERATED ALWAYS AS (
+                    CASE WHEN json_valid(metadata) THEN json_extract(metadata, '$.{key}') END
+                ) VIRTUAL
+            ''')
+        # Ends like idx_upload_date, so a filtered list is still read in page order
+        conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{column} ON documents({column}, upload_date, id)')
+
+
+def _metadata_conditions(expressions: Optional[List[str]], alias: str = '') -> Tuple[List[str], List]:
+    """
+    SQL conditions for metadata filters such as 'department=Conformité' or
+    'valid_until>=2025-01-01'; only METADATA_SCHEMA keys can be filtered
+    """
+    conditions = []
+    params = []
+    for expression in expressions or []:
+        match = METADATA_FILTER_PATTERN.match(expression)
+        if match is None:
+            raise ValueError(f"Invalid metadata filter: {expression!r}; expected key=value, key>=value, ...")
+        key, operator, value = match.groups()
+        if key not in METADATA_SCHEMA:
+            raise ValueError(f"Unknown metadata field '{key}'. Filterable fields: {', '.join(METADATA_SCHEMA)}")
+        conditions.append(f'{alias}{_metadata_column(key)} {operator} ?')
+        params.append(value)
+    return conditions, params
+
+
+def _create_stats(conn):
+    """Statistics table, its triggers and the initial counts"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS doc_stats (
+            dimension TEXT NOT NULL,
+            key TEXT NOT NULL,
+            documents INTEGER NOT NULL,
+            bytes INTEGER NOT NULL,
+            PRIMARY KEY (dimension, key)
+        ) WITHOUT ROWID
+    ''')
+    for statement in STATS_TRIGGERS:
+        conn.execute(statement)
+    _recompute_stats(conn)
+
+# Schema migrations, applied in order; PRAGMA user_version records how many ran
+MIGRATIONS = [
+    # 1: documents table and lookup indexes
+    [
+        '''
+            CREATE TABLE IF NOT EXISTS documents (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                title TEXT NOT NULL,
+                original_filename TEXT NOT NULL,
+                stored_filename TEXT NOT NULL,
+                category TEXT NOT NULL,
+                description TEXT,
+                file_size INTEGER NOT NULL,
+                file_hash TEXT NOT NULL UNIQUE,
+                mime_type TEXT,
+                upload_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_modified TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                file_path TEXT NOT NULL,
+                metadata TEXT  -- JSON string for additional metadata
+            )
+        ''',
+        *DOCUMENT_INDEXES,
+    ],
+    # 2: full-text search index
+    _create_search_index,
+    # 3: background text extraction: results cached by content hash, one job per document
+    [
+        '''
+            CREATE TABLE IF NOT EXISTS extracted_text (
+                file_hash TEXT PRIMARY KEY,
+                content TEXT NOT NULL,
+                page_count INTEGER NOT NULL DEFAULT 0,
+                extracted_at TIMESTAMP NOT NULL,
+                duration_ms INTEGER
+            )
+        ''',
+        '''
+            CREATE TABLE IF NOT EXISTS extraction_jobs (
+                document_id INTEGER PRIMARY KEY REFERENCES documents(id) ON DELETE CASCADE,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                queued_at TIMESTAMP NOT NULL,
+                started_at TIMESTAMP,
+                finished_at TIMESTAMP,
+                duration_ms INTEGER,
+                error TEXT
+            )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_extraction_jobs_status ON extraction_jobs(status, queued_at)',
+        EXTRACTION_QUEUE_TRIGGER,
+        '''
+            INSERT OR IGNORE INTO extraction_jobs (document_id, status, queued_at)
+            SELECT id, 'pending', strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime') FROM documents
+        ''',
+    ],
+    # 4: content-addressed blobs; many documents may share one file
+    _create_blob_store,
+    # 5: keyset pagination, newest first, optionally within one category.
+    # Every index ends with the rowid, so idx_upload_date already orders (upload_date, id)
+    [
+        'DROP INDEX IF EXISTS idx_category',
+        'CREATE INDEX IF NOT EXISTS idx_category_upload_date ON documents(category, upload_date, id)',
+    ],
+    # 6: statistics maintained by triggers instead of scanning documents
+    _create_stats,
+    # 7: preview derivatives on disk, by content hash; size 0 records that none exists
+    [
+        '''
+            CREATE TABLE IF NOT EXISTS previews (
+                file_hash TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (file_hash, kind)
+            ) WITHOUT ROWID
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_previews_last_used ON previews(last_used)',
+    ],
+    # 8: integrity scrubbing: when each stored file last matched its recorded hash
+    [
+        '''
+            CREATE TABLE IF NOT EXISTS file_checks (
+                file_path TEXT PRIMARY KEY,
+                file_hash TEXT NOT NULL,
+                last_verified REAL NOT NULL,
+                status TEXT NOT NULL,
+                detail TEXT
+            ) WITHOUT ROWID
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_file_checks_last_verified ON file_checks(last_verified)',
+        'CREATE INDEX IF NOT EXISTS idx_file_path ON documents(file_path)',
+    ],
+    # 9: indexed metadata keys
+    _create_metadata_columns,
+    # 10: access audit. No foreign key: the trail outlives deleted documents.
+    # The time index covers the monthly rankings and the rollup
+    [
+        '''
+            CREATE TABLE IF NOT EXISTS access_log (
+                id INTEGER PRIMARY KEY,
+                document_id INTEGER NOT NULL,
+                action TEXT NOT NULL,
+                actor TEXT NOT NULL,
+                client TEXT,
+                accessed_at TEXT NOT NULL
+            )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_access_log_document ON access_log(document_id, accessed_at)',
+        'CREATE INDEX IF NOT EXISTS idx_access_log_time ON access_log(accessed_at, document_id, action, actor)',
+        '''
+            CREATE TABLE IF NOT EXISTS access_daily (
+                day TEXT NOT NULL,
+                document_id INTEGER NOT NULL,
+                action TEXT NOT NULL,
+                actor TEXT NOT NULL,
+                accesses INTEGER NOT NULL,
+                PRIMARY KEY (day, document_id, action, actor)
+            ) WITHOUT ROWID
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_access_daily_document ON access_daily(document_id, day)',
+    ],
+]
+
+# Column order expected by DocSecureDatabase._row_to_document
+DOCUMENT_COLUMN_NAMES = ('id', 'title', 'original_filename', 'stored_filename', 'category',
+                         'description', 'file_size', 'upload_date', 'last_modified',
+                         'file_path', 'mime_type', 'metadata')
+DOCUMENT_COLUMNS = ', '.join(DOCUMENT_COLUMN_NAMES)
+QUALIFIED_DOCUMENT_COLUMNS = ', '.join(f'd.{name}' for name in DOCUMENT_COLUMN_NAMES)
+
+# bm25 column weights: a hit in the title outranks one in the description or body
+SEARCH_WEIGHTS = (10.0, 5.0, 1.0)
+SNIPPET_TOKENS = 12
+
+MAX_IDS_PER_QUERY = 500
+
+# Columns a document list needs; skips file_path, hashes and the metadata JSON
+LISTING_COLUMN_NAMES = ('id', 'title', 'original_filename', 'category', 'description',
+                        'file_size', 'upload_date', 'mime_type')
+LISTING_COLUMNS = ', '.join(LISTING_COLUMN_NAMES)
+
+# Large buffers keep hashing and copying of 50 MB files to a few dozen syscalls
+IO_BUFFER_SIZE = 1024 * 1024
+
+# Uploads are staged here, inside base_path, so placing them is an atomic rename
+INCOMING_FOLDER = '.incoming'
+STALE_INCOMING_SECONDS = 3600
+
+# Storage folders already prepared by this process
+_prepared_paths = set()
+_prepared_lock = threading.Lock()
 
 class DocSecureDatabase:
     """Main database class for DOC Secure document management"""
@@ -33,43 +450,21 @@ class DocSecureDatabase:
         self.max_file_size = 50 * 1024 * 1024  # 50MB in bytes
         self.allowed_extensions = {'.pdf', '.docx', '.xlsx', '.pptx', '.doc', '.xls', '.ppt'}
         
+        # Folders and schema are set up once per process, not on every instantiation
+        with _prepared_lock:
+            if self.base_path not in _prepared_paths:
+                self.base_path.mkdir(exist_ok=True)
+                self._create_folder_structure()
+                self._clean_incoming()
+                _prepared_paths.add(self.base_path)
+        
+        self._db = get_manager(self.db_path, MIGRATIONS)
+        self._fts_enabled = None
         self._initialize_database()
-        self._create_folder_structure()
     
     def _initialize_database(self):
-        """Initialize SQLite database with document metadata schema"""
-        self.base_path.mkdir(exist_ok=True)
-        
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Create documents table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS documents (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                original_filename TEXT NOT NULL,
-                stored_filename TEXT NOT NULL,
-                category TEXT NOT NULL,
-                description TEXT,
-                file_size INTEGER NOT NULL,
-                file_hash TEXT NOT NULL UNIQUE,
-                mime_type TEXT,
-                upload_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                last_modified TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                file_path TEXT NOT NULL,
-                metadata TEXT  -- JSON string for additional metadata
-            )
-        ''')
-        
-        # Create index for faster searches
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_category ON documents(category)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_title ON documents(title)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_upload_date ON documents(upload_date)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_file_hash ON documents(file_hash)')
-        
-        conn.commit()
-        conn.close()
+        """Open this thread's connection, migrating the schema if it is behind"""
+        self._db.connection()
     
     def _create_folder_structure(self):
         """Create the folder structure for document categories"""
@@ -85,11 +480,24 @@ class DocSecureDatabase:
                     f.write(f"Ce dossier contient les documents de type: {category_name}\n")
                     f.write(f"Créé automatiquement par DOC Secure le {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
     
+    def _clean_incoming(self):
+        """Remove staged uploads abandoned by a crashed process"""
+        incoming_path = self.base_path / INCOMING_FOLDER
+        if not incoming_path.exists():
+            return
+        cutoff = datetime.now().timestamp() - STALE_INCOMING_SECONDS
+        for entry in os.scandir(incoming_path):
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.unlink(entry.path)
+            except OSError:
+                continue
+    
     def _calculate_file_hash(self, file_path: Path) -> str:
         """Calculate SHA256 hash of a file"""
         hash_sha256 = hashlib.sha256()
         with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
+            for chunk in iter(lambda: f.read(IO_BUFFER_SIZE), b""):
                 hash_sha256.update(chunk)
         return hash_sha256.hexdigest()
     
@@ -142,80 +550,148 @@ class DocSecureDatabase:
             if not is_valid:
                 return False, validation_message, None
             
+            with open(source_path, 'rb') as source:
+                return self.ingest_stream(source, source_path.name, title, category, description, metadata)
+            
+        except Exception as e:
+            return False, f"Error uploading document: {str(e)}", None
+    
+    def ingest_stream(self,
+                      stream: BinaryIO,
+                      original_filename: str,
+                      title: str,
+                      category: str,
+                      description: str = "",
+                      metadata: Dict = None) -> Tuple[bool, str, Optional[int]]:
+        """
+        Store a document read once from a binary stream
+        
+        The bytes are written to a temp file next to the archive while being
+        hashed, then renamed into the object store, so a file is read and
+        written exactly once. Content already in the store is not kept twice:
+        the new document references the existing object.
+        
+        Returns:
+            Tuple[bool, str, Optional[int]]: (success, message, document_id)
+        """
+        temp_path = None
+        try:
+            file_ext = Path(original_filename).suffix.lower()
+            if file_ext not in self.allowed_extensions:
+                return False, f"File type '{file_ext}' is not allowed. Allowed types: {', '.join(self.allowed_extensions)}", None
+            
             # Check if category is valid
             if category not in self.categories:
                 return False, f"Invalid category. Must be one of: {', '.join(self.categories.keys())}", None
             
-            # Calculate file hash to check for duplicates
-            file_hash = self._calculate_file_hash(source_path)
-            
-            # Check for duplicate files
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute('SELECT id, title FROM documents WHERE file_hash = ?', (file_hash,))
-            existing = cursor.fetchone()
+            # Stream into the archive's own filesystem so the final move is a rename
+            incoming_path = self.base_path / INCOMING_FOLDER
+            incoming_path.mkdir(exist_ok=True)
+            fd, temp_name = tempfile.mkstemp(dir=incoming_path, suffix=file_ext)
+            temp_path = Path(temp_name)
             
-            if existing:
-                conn.close()
-                return False, f"File already exists with title: '{existing[1]}' (ID: {existing[0]})", None
+            hash_sha256 = hashlib.sha256()
+            file_size = 0
+            with os.fdopen(fd, 'wb') as temp_file:
+                while True:
+                    chunk = stream.read(IO_BUFFER_SIZE)
+                    if not chunk:
+                        break
+                    file_size += len(chunk)
+                    if file_size > self.max_file_size:
+                        return False, "File size exceeds maximum allowed size (50MB)", None
+                    hash_sha256.update(chunk)
+                    temp_file.write(chunk)
+            file_hash = hash_sha256.hexdigest()
             
-            # Generate unique filename and destination path
-            category_folder = self.categories[category]
-            unique_filename = self._generate_unique_filename(source_path.name, category)
-            dest_path = self.base_path / category_folder / unique_filename
+            if file_size == 0:
+                return False, "File is empty", None
             
-            # Copy file to destination
-            shutil.copy2(source_path, dest_path)
+            blob_relative = self._blob_relative_path(file_hash)
+            blob_path = self.base_path / blob_relative
+            unique_filename = self._generate_unique_filename(original_filename, category)
             
             # Get MIME type
-            mime_type, _ = mimetypes.guess_type(str(dest_path))
+            mime_type, _ = mimetypes.guess_type(original_filename)
             
-            # Insert document metadata into database
+            # Insert document metadata into database; a trigger queues its text extraction
             metadata_json = json.dumps(metadata or {})
-            cursor.execute('''
-                INSERT INTO documents 
-                (title, original_filename, stored_filename, category, description, 
-                 file_size, file_hash, mime_type, file_path, metadata)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                title,
-                source_path.name,
-                unique_filename,
-                category,
-                description,
-                file_size,
-                file_hash,
-                mime_type,
-                str(dest_path.relative_to(self.base_path)),
-                metadata_json
-            ))
-            
-            document_id = cursor.lastrowid
-            conn.commit()
-            conn.close()
+            with self._db.transaction() as conn:
+                # Identical content may be filed under several titles or categories,
+                # but the same entry submitted twice is still a mistake. Checked under
+                # the write lock so concurrent identical uploads cannot both insert
+                existing = conn.execute(
+                    'SELECT id, title FROM documents WHERE file_hash = ? AND category = ? AND title = ?',
+                    (file_hash, category, title)
+                ).fetchone()
+                if existing:
+                    return False, f"File already exists with title: '{existing[1]}' (ID: {existing[0]})", None
+                
+                cursor = conn.execute('''
+                    INSERT INTO documents 
+                    (title, original_filename, stored_filename, category, description, 
+                     file_size, file_hash, mime_type, file_path, metadata)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    title,
+                    original_filename,
+                    unique_filename,
+                    category,
+                    description,
+                    file_size,
+                    file_hash,
+                    mime_type,
+                    blob_relative,
+                    metadata_json
+                ))
+                document_id = cursor.lastrowid
+                conn.execute('''
+                    INSERT INTO blobs (file_hash, file_size, refcount) VALUES (?, ?, 1)
+                    ON CONFLICT (file_hash) DO UPDATE SET refcount = refcount + 1
+                ''', (file_hash, file_size))
+                
+                # Known content is not stored again: the upload is only a metadata insert.
+                # Placing the object under the write lock orders it against deletes
+                if not blob_path.exists():
+                    blob_path.parent.mkdir(parents=True, exist_ok=True)
+                    # Atomic move into place; mkstemp files are private, archived files are not
+                    os.chmod(temp_path, 0o644)
+                    os.replace(temp_path, blob_path)
+                    temp_path = None
             
             return True, f"Document uploaded successfully with ID: {document_id}", document_id
             
         except Exception as e:
             return False, f"Error uploading document: {str(e)}", None
+        
+        finally:
+            if temp_path is not None:
+                temp_path.unlink(missing_ok=True)
     
     def get_documents(self, 
                      category: Optional[str] = None, 
                      search_term: Optional[str] = None,
                      limit: int = 100,
-                     offset: int = 0) -> List[Dict]:
-        """Get documents with optional filtering"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        query = '''
-            SELECT id, title, original_filename, stored_filename, category, 
-                   description, file_size, upload_date, last_modified, 
-                   file_path, mime_type, metadata
-            FROM documents
-        '''
-        params = []
-        conditions = []
+                     offset: int = 0,
+                     metadata_filters: Optional[List[str]] = None,
+                     include_metadata: bool = False) -> List[Dict]:
+        """
+        Get documents with optional filtering
+        
+        Args:
+            metadata_filters (List[str]): e.g. ['department=Conformité', 'valid_until>=2025-01-01'],
+                on METADATA_SCHEMA keys
+            include_metadata (bool): Decode each row's metadata JSON into a 'metadata' key
+        """
+        conn = self._db.connection()
+        
+        if search_term and self._search_enabled():
+            return self.search_documents(search_term, category=category, limit=limit, offset=offset,
+                                         metadata_filters=metadata_filters,
+                                         include_metadata=include_metadata)
+        
+        query = f'SELECT {DOCUMENT_COLUMNS} FROM documents'
+        conditions, params = _metadata_conditions(metadata_filters)
         
         if category:
             conditions.append('category = ?')
@@ -228,98 +704,372 @@ class DocSecureDatabase:
         if conditions:
             query += ' WHERE ' + ' AND '.join(conditions)
         
-        query += ' ORDER BY upload_date DESC LIMIT ? OFFSET ?'
+        query += ' ORDER BY upload_date DESC, id DESC LIMIT ? OFFSET ?'
         params.extend([limit, offset])
         
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
-        conn.close()
+        rows = conn.execute(query, params).fetchall()
         
-        documents = []
-        for row in rows:
-            doc = {
-                'id': row[0],
-                'title': row[1],
-                'original_filename': row[2],
-                'stored_filename': row[3],
-                'category': row[4],
-                'description': row[5],
-                'file_size': row[6],
-                'upload_date': row[7],
-                'last_modified': row[8],
-                'file_path': row[9],
-                'mime_type': row[10],
-                'metadata': json.loads(row[11]) if row[11] else {}
-            }
-            documents.append(doc)
+        return [self._row_to_document(row, include_metadata) for row in rows]
+    
+    @staticmethod
+    def _encode_cursor(upload_date: str, document_id: int) -> str:
+        raw = json.dumps([upload_date, document_id]).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+    
+    @staticmethod
+    def _decode_cursor(cursor: str) -> Tuple[str, int]:
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            upload_date, document_id = json.loads(raw)
+            return str(upload_date), int(document_id)
+        except (ValueError, TypeError):
+            raise ValueError(f"Invalid cursor: {cursor}")
+    
+    def get_documents_page(self,
+                           category: Optional[str] = None,
+                           cursor: Optional[str] = None,
+                           limit: int = 100,
+                           include_total: bool = False,
+                           listing_only: bool = False,
+                           metadata_filters: Optional[List[str]] = None,
+                           include_metadata: bool = False) -> Dict:
+        """
+        One page of documents, newest first, using keyset pagination
+        
+        Each page seeks straight to its position in idx_upload_date (or
+        idx_category_upload_date), so page 1000 costs the same as page 1.
+        
+        Args:
+            category (str): Only documents of this category
+            cursor (str): next_cursor of the previous page; None for the first page
+            limit (int): Page size
+            include_total (bool): Also count all matching documents
+            listing_only (bool): Return LISTING_COLUMN_NAMES only
+            metadata_filters (List[str]): Conditions on METADATA_SCHEMA keys, see get_documents
+            include_metadata (bool): Decode each row's metadata JSON
+        
+        Returns:
+            Dict: documents, next_cursor (None on the last page) and total if requested
+        """
+        conn = self._db.connection()
+        columns = LISTING_COLUMNS if listing_only else DOCUMENT_COLUMNS
+        conditions, params = _metadata_conditions(metadata_filters)
+        filtered = bool(conditions)
+        
+        if category:
+            conditions.append('category = ?')
+            params.append(category)
+        count_conditions = list(conditions)
+        count_params = list(params)
+        
+        if cursor:
+            conditions.append('(upload_date, id) < (?, ?)')
+            params.extend(self._decode_cursor(cursor))
+        
+        query = f'SELECT {columns} FROM documents'
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        # One extra row tells whether another page follows
+        query += ' ORDER BY upload_date DESC, id DESC LIMIT ?'
+        params.append(limit + 1)
+        
+        rows = conn.execute(query, params).fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        
+        if listing_only:
+            documents = [dict(zip(LISTING_COLUMN_NAMES, row)) for row in rows]
+        else:
+            documents = [self._row_to_document(row, include_metadata) for row in rows]
+        
+        page = {'documents': documents, 'next_cursor': None}
+        if has_more:
+            last = documents[-1]
+            page['next_cursor'] = self._encode_cursor(last['upload_date'], last['id'])
         
+        if include_total and filtered:
+            # Metadata filters are not in doc_stats; their indexes make the count cheap
+            page['total'] = conn.execute(
+                'SELECT COUNT(*) FROM documents WHERE ' + ' AND '.join(count_conditions), count_params
+            ).fetchone()[0]
+        elif include_total:
+            # Read from the trigger-maintained counters, not counted per request
+            dimension, key = ('category', category) if category else ('total', '')
+            row = conn.execute(
+                'SELECT documents FROM doc_stats WHERE dimension = ? AND key = ?', (dimension, key)
+            ).fetchone()
+            page['total'] = row[0] if row else 0
+        
+        return page
+    
+    def _search_enabled(self) -> bool:
+        if self._fts_enabled is None:
+            self._fts_enabled = self._db.connection().execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'documents_fts'"
+            ).fetchone() is not None
+        return self._fts_enabled
+    
+    @staticmethod
+    def _match_expression(search_term: str) -> Optional[str]:
+        """Turn free text into an FTS5 query: every word must match, as a prefix"""
+        words = re.findall(r'\w+', search_term)
+        if not words:
+            return None
+        return ' '.join(f'"{word}"*' for word in words)
+    
+    def search_documents(self,
+                         search_term: str,
+                         category: Optional[str] = None,
+                         limit: int = 100,
+                         offset: int = 0,
+                         metadata_filters: Optional[List[str]] = None,
+                         include_metadata: bool = False) -> List[Dict]:
+        """Full-text search ranked by relevance, each result with a highlighted snippet"""
+        match = self._match_expression(search_term)
+        if match is None:
+            return []
+        
+        query = f'''
+            SELECT {QUALIFIED_DOCUMENT_COLUMNS},
+                   snippet(documents_fts, -1, '<mark>', '</mark>', '…', {SNIPPET_TOKENS}),
+                   bm25(documents_fts, {', '.join(str(weight) for weight in SEARCH_WEIGHTS)}) AS score
+            FROM documents_fts
+            JOIN documents d ON d.id = documents_fts.rowid
+            WHERE documents_fts MATCH ?
+        '''
+        params = [match]
+        if category:
+            query += ' AND d.category = ?'
+            params.append(category)
+        conditions, condition_params = _metadata_conditions(metadata_filters, alias='d.')
+        for condition in conditions:
+            query += f' AND {condition}'
+        params.extend(condition_params)
+        query += ' ORDER BY score LIMIT ? OFFSET ?'
+        params.extend([limit, offset])
+        
+        documents = []
+        for row in self._db.connection().execute(query, params):
+            document = self._row_to_document(row, include_metadata)
+            document['snippet'] = row[len(DOCUMENT_COLUMN_NAMES)]
+            # bm25 is lower-is-better; expose a higher-is-better score
+            document['score'] = round(-row[len(DOCUMENT_COLUMN_NAMES) + 1], 4)
+            documents.append(document)
         return documents
     
+    def set_document_content(self, document_id: int, content: str):
+        """Store a document's extracted text in the search index"""
+        if not self._search_enabled():
+            return
+        with self._db.transaction() as conn:
+            conn.execute('UPDATE documents_fts SET content = ? WHERE rowid = ?', (content, document_id))
+    
+    @staticmethod
+    def _row_to_document(row, include_metadata: bool = True) -> Dict:
+        """
+        Convert a DOCUMENT_COLUMNS row to the document dict returned by the API;
+        the metadata JSON is only decoded when include_metadata is set
+        """
+        document = {
+            'id': row[0],
+            'title': row[1],
+            'original_filename': row[2],
+            'stored_filename': row[3],
+            'category': row[4],
+            'description': row[5],
+            'file_size': row[6],
+            'upload_date': row[7],
+            'last_modified': row[8],
+            'file_path': row[9],
+            'mime_type': row[10]
+        }
+        if include_metadata:
+            document['metadata'] = json.loads(row[11]) if row[11] else {}
+        return document
+    
     def get_document_by_id(self, document_id: int) -> Optional[Dict]:
-        """Get a specific document by ID"""
-        documents = self.get_documents()
-        for doc in documents:
-            if doc['id'] == document_id:
-                return doc
-        return None
+        """Get a specific document by ID (primary-key lookup)"""
+        row = self._db.connection().execute(
+            f'SELECT {DOCUMENT_COLUMNS} FROM documents WHERE id = ?', (document_id,)
+        ).fetchone()
+        return self._row_to_document(row) if row else None
+    
+    def get_file_info(self, document_id: int) -> Optional[Dict]:
+        """What serving a document's file needs: absolute path, hash, name and type"""
+        row = self._db.connection().execute(
+            'SELECT file_path, file_hash, original_filename, mime_type FROM documents WHERE id = ?',
+            (document_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            'path': self.base_path / row[0],
+            'file_hash': row[1],
+            'original_filename': row[2],
+            'mime_type': row[3] or 'application/octet-stream'
+        }
+    
+    def get_documents_by_ids(self, document_ids: List[int]) -> List[Dict]:
+        """Get several documents by ID in one query, in the order requested; unknown IDs are skipped"""
+        ids = list(dict.fromkeys(int(document_id) for document_id in document_ids))
+        if not ids:
+            return []
+        
+        found = {}
+        conn = self._db.connection()
+        # Stay under SQLite's bound-parameter limit for very long ID lists
+        for start in range(0, len(ids), MAX_IDS_PER_QUERY):
+            chunk = ids[start:start + MAX_IDS_PER_QUERY]
+            placeholders = ', '.join('?' * len(chunk))
+            rows = conn.execute(
+                f'SELECT {DOCUMENT_COLUMNS} FROM documents WHERE id IN ({placeholders})', chunk
+            ).fetchall()
+            for row in rows:
+                found[row[0]] = self._row_to_document(row)
+        
+        return [found[document_id] for document_id in ids if document_id in found]
+    
+    def _blob_relative_path(self, file_hash: str) -> str:
+        """Location of a content hash in the object store, relative to base_path"""
+        return f"{OBJECTS_FOLDER}/{file_hash[:2]}/{file_hash[2:]}"
     
     def delete_document(self, document_id: int) -> Tuple[bool, str]:
-        """Delete a document and its file"""
+        """Delete a document, and its file once no other document references the content"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Get document info
-            cursor.execute('SELECT file_path, title FROM documents WHERE id = ?', (document_id,))
-            result = cursor.fetchone()
-            
-            if not result:
-                conn.close()
-                return False, f"Document with ID {document_id} not found"
+            orphan = None
+            with self._db.transaction() as conn:
+                result = conn.execute(
+                    'SELECT file_path, title, file_hash FROM documents WHERE id = ?', (document_id,)
+                ).fetchone()
+                
+                if not result:
+                    return False, f"Document with ID {document_id} not found"
+                
+                file_path, title, file_hash = result
+                conn.execute('DELETE FROM documents WHERE id = ?', (document_id,))
+                
+                # Only documents in the object store hold a blob reference; a legacy
+                # document with the same content must not release a newer upload's object
+                if file_path == self._blob_relative_path(file_hash):
+                    blob = conn.execute(
+                        'UPDATE blobs SET refcount = refcount - 1 WHERE file_hash = ? RETURNING refcount',
+                        (file_hash,)
+                    ).fetchone()
+                    if blob is not None and blob[0] <= 0:
+                        conn.execute('DELETE FROM blobs WHERE file_hash = ?', (file_hash,))
+                        orphan = ('SELECT 1 FROM blobs WHERE file_hash = ?', (file_hash,))
+                elif not conn.execute('SELECT 1 FROM documents WHERE file_path = ?', (file_path,)).fetchone():
+                    # Uploaded before the object store: the file sits in its category folder
+                    orphan = ('SELECT 1 FROM documents WHERE file_path = ?', (file_path,))
             
-            file_path, title = result
-            full_path = self.base_path / file_path
-            
-            # Delete file if it exists
-            if full_path.exists():
-                full_path.unlink()
-            
-            # Delete database record
-            cursor.execute('DELETE FROM documents WHERE id = ?', (document_id,))
-            conn.commit()
-            conn.close()
+            # The file goes only once the delete is committed. Garbage-collect under the
+            # write lock so a concurrent upload of the same content cannot reference it in between
+            if orphan is not None:
+                with self._db.transaction() as conn:
+                    if not conn.execute(*orphan).fetchone():
+                        (self.base_path / file_path).unlink(missing_ok=True)
             
             return True, f"Document '{title}' deleted successfully"
             
         except Exception as e:
             return False, f"Error deleting document: {str(e)}"
     
+    def migrate_legacy_files(self) -> Dict[str, int]:
+        """
+        Move files stored per category before the object store into it
+        
+        Returns:
+            Dict[str, int]: documents moved, duplicate files removed, files missing
+        """
+        counts = {'moved': 0, 'deduplicated': 0, 'missing': 0}
+        conn = self._db.connection()
+        legacy = conn.execute(
+            'SELECT id, file_hash, file_size, file_path FROM documents WHERE file_path NOT LIKE ?',
+            (f'{OBJECTS_FOLDER}/%',)
+        ).fetchall()
+        
+        for document_id, file_hash, file_size, file_path in legacy:
+            source = self.base_path / file_path
+            blob_relative = self._blob_relative_path(file_hash)
+            blob_path = self.base_path / blob_relative
+            # Each move happens under the write lock, together with the row it re-points
+            with self._db.transaction() as conn:
+                if blob_path.exists():
+                    source.unlink(missing_ok=True)
+                    counts['deduplicated'] += 1
+                elif source.exists():
+                    blob_path.parent.mkdir(parents=True, exist_ok=True)
+                    os.replace(source, blob_path)
+                    counts['moved'] += 1
+                else:
+                    counts['missing'] += 1
+                    continue
+                conn.execute('UPDATE documents SET file_path = ? WHERE id = ?', (blob_relative, document_id))
+                conn.execute('''
+                    INSERT INTO blobs (file_hash, file_size, refcount) VALUES (?, ?, 1)
+                    ON CONFLICT (file_hash) DO UPDATE SET refcount = refcount + 1
+                ''', (file_hash, file_size))
+        
+        return counts
+    
     def get_statistics(self) -> Dict:
-        """Get database statistics"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        """Get database statistics from the trigger-maintained doc_stats table"""
+        rows = self._db.connection().execute('SELECT dimension, key, documents, bytes FROM doc_stats').fetchall()
         
-        # Total documents
-        cursor.execute('SELECT COUNT(*) FROM documents')
-        total_docs = cursor.fetchone()[0]
+        breakdowns = {}
+        for dimension, key, documents, size in rows:
+            breakdowns.setdefault(dimension, {})[key] = (documents, size)
         
-        # Documents by category
-        cursor.execute('SELECT category, COUNT(*) FROM documents GROUP BY category')
-        category_counts = dict(cursor.fetchall())
+        total_docs, total_size = breakdowns.get('total', {}).get('', (0, 0))
+        unique_blobs, blob_size = breakdowns.get('blobs', {}).get('', (0, 0))
+        _, legacy_size = breakdowns.get('legacy', {}).get('', (0, 0))
+        # Space actually taken on disk once shared content is counted once
+        stored_size = blob_size + legacy_size
         
-        # Total storage used
-        cursor.execute('SELECT SUM(file_size) FROM documents')
-        total_size = cursor.fetchone()[0] or 0
+        def counts(dimension):
+            return {key: documents for key, (documents, _) in sorted(breakdowns.get(dimension, {}).items())}
         
-        conn.close()
+        def sizes(dimension):
+            return {key: size for key, (_, size) in sorted(breakdowns.get(dimension, {}).items())}
         
         return {
             'total_documents': total_docs,
-            'category_counts': category_counts,
+            'category_counts': counts('category'),
+            'category_sizes_bytes': sizes('category'),
+            'mime_type_counts': counts('mime_type'),
+            'monthly_uploads': {
+                month: {'documents': documents, 'bytes': size}
+                for month, (documents, size) in sorted(breakdowns.get('month', {}).items())
+            },
             'total_size_bytes': total_size,
             'total_size_mb': round(total_size / 1024 / 1024, 2),
+            'unique_files': unique_blobs,
+            'stored_size_bytes': stored_size,
+            'stored_size_mb': round(stored_size / 1024 / 1024, 2),
             'categories': list(self.categories.keys())
         }
+    
+    def reconcile_statistics(self) -> Dict:
+        """
+        Recompute doc_stats from scratch
+        
+        Returns:
+            Dict: the (dimension, key) entries that had drifted, with their
+            stored and recomputed (documents, bytes)
+        """
+        with self._db.transaction() as conn:
+            before = {(d, k): (n, b) for d, k, n, b in conn.execute('SELECT * FROM doc_stats')}
+            _recompute_stats(conn)
+            after = {(d, k): (n, b) for d, k, n, b in conn.execute('SELECT * FROM doc_stats')}
+        
+        drift = {}
+        for entry in sorted(before.keys() | after.keys()):
+            if before.get(entry) != after.get(entry):
+                drift[f'{entry[0]}:{entry[1]}'] = {
+                    'stored': before.get(entry, (0, 0)),
+                    'actual': after.get(entry, (0, 0))
+                }
+        return drift
 
 
 # Utility functions for API integration
@@ -333,22 +1083,10 @@ def process_uploaded_file(file_data: bytes,
                          category: str, 
                          description: str = "") -> Tuple[bool, str, Optional[int]]:
     """Process an uploaded file from the web interface"""
-    import tempfile
-    
     try:
-        # Create temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=Path(filename).suffix) as temp_file:
-            temp_file.write(file_data)
-            temp_path = temp_file.name
-        
-        # Upload to database
+        # Stream straight from memory; no intermediate temporary file
         db = create_database_instance()
-        success, message, doc_id = db.upload_document(temp_path, title, category, description)
-        
-        # Clean up temporary file
-        os.unlink(temp_path)
-        
-        return success, message, doc_id
+        return db.ingest_stream(io.BytesIO(file_data), filename, title, category, description)
         
     except Exception as e:
         return False, f"Error processing uploaded file: {str(e)}", None
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+DOC Secure Background Text Extraction
+Worker pool that extracts text from newly stored documents after upload,
+caches results by file hash and feeds the full-text search index
+"""
+
+import os
+import sys
+import time
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+from text_extraction import extract_text
+
+STATUS_PENDING = 'pending'
+STATUS_RUNNING = 'running'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+# Jobs left 'running' longer than this belonged to a worker that died
+STALE_JOB_SECONDS = 600
+MAX_ATTEMPTS = 3
+
+
+def _extract_timed(file_path: str, suffix: str):
+    """Top-level so it can run in a worker process"""
+    started = time.perf_counter()
+    text, pages = extract_text(Path(file_path), suffix)
+    return text, pages, int((time.perf_counter() - started) * 1000)
+
+
+class ExtractionPipeline:
+    """Claims pending extraction jobs and processes them on a worker pool"""
+
+    def __init__(self, db, workers: Optional[int] = None, use_processes: bool = True, previews=None):
+        """
+        Args:
+            db (DocSecureDatabase): Database whose documents are extracted
+            workers (int): Pool size, defaults to the number of CPUs
+            use_processes (bool): Extract in worker processes; PDF parsing is CPU-bound
+            previews (PreviewCache): Also render preview derivatives of new content
+        """
+        self.db = db
+        self.previews = previews
+        self.workers = workers or os.cpu_count() or 2
+        self.use_processes = use_processes
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _now(self) -> str:
+        return datetime.now().isoformat()
+
+    def requeue_stale(self) -> int:
+        """Return jobs abandoned by a crashed worker to the queue"""
+        cutoff = datetime.fromtimestamp(time.time() - STALE_JOB_SECONDS).isoformat()
+        with self.db._db.transaction() as conn:
+            cursor = conn.execute(
+                'UPDATE extraction_jobs SET status = ? WHERE status = ? AND started_at < ?',
+                (STATUS_PENDING, STATUS_RUNNING, cutoff)
+            )
+        return cursor.rowcount
+
+    def queue_all(self) -> int:
+        """Queue every document again, e.g. after the extractor improved"""
+        with self.db._db.transaction() as conn:
+            conn.execute('DELETE FROM extracted_text')
+            cursor = conn.execute(
+                'UPDATE extraction_jobs SET status = ?, attempts = 0, error = NULL, queued_at = ?',
+                (STATUS_PENDING, self._now())
+            )
+        return cursor.rowcount
+
+    def _claim(self, batch_size: int):
+        """Atomically move up to batch_size pending jobs to running"""
+        with self.db._db.transaction() as conn:
+            rows = conn.execute('''
+                SELECT j.document_id, d.file_hash, d.file_path, d.original_filename
+                FROM extraction_jobs j JOIN documents d ON d.id = j.document_id
+                WHERE j.status = ?
+                ORDER BY j.queued_at
+                LIMIT ?
+            ''', (STATUS_PENDING, batch_size)).fetchall()
+            now = self._now()
+            conn.executemany(
+                'UPDATE extraction_jobs SET status = ?, started_at = ?, attempts = attempts + 1 '
+                'WHERE document_id = ?',
+                [(STATUS_RUNNING, now, row[0]) for row in rows]
+            )
+        return rows
+
+    def _cached(self, file_hash: str):
+        return self.db._db.connection().execute(
+            'SELECT content, page_count FROM extracted_text WHERE file_hash = ?', (file_hash,)
+        ).fetchone()
+
+    def _complete(self, document_id: int, file_hash: str, content: str, pages: int,
+                  duration_ms: int, cached: bool):
+        with self.db._db.transaction() as conn:
+            if not cached:
+                conn.execute(
+                    'INSERT OR REPLACE INTO extracted_text (file_hash, content, page_count, extracted_at, duration_ms) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (file_hash, content, pages, self._now(), duration_ms)
+                )
+            self.db.set_document_content(document_id, content)
+            conn.execute(
+                'UPDATE extraction_jobs SET status = ?, finished_at = ?, duration_ms = ?, error = NULL '
+                'WHERE document_id = ?',
+                (STATUS_DONE, self._now(), duration_ms, document_id)
+            )
+
+    def _warm_previews(self, file_hash: str, path: str, suffix: str, content: str):
+        try:
+            self.previews.warm(file_hash, Path(path), suffix, content)
+        except Exception as e:
+            # Previews are rendered again on first request
+            print(f"Preview rendering failed for {file_hash}: {e}", file=sys.stderr)
+
+    def _fail(self, document_id: int, error: str):
+        with self.db._db.transaction() as conn:
+            # Failed jobs are retried on later runs until MAX_ATTEMPTS
+            conn.execute(
+                'UPDATE extraction_jobs SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, '
+                'finished_at = ?, error = ? WHERE document_id = ?',
+                (MAX_ATTEMPTS, STATUS_FAILED, STATUS_PENDING, self._now(), error, document_id)
+            )
+
+    def process_pending(self) -> Dict[str, int]:
+        """Extract every pending document; returns counts of done, cached and failed jobs"""
+        counts = {'done': 0, 'cached': 0, 'failed': 0}
+        self.requeue_stale()
+
+        executor = None
+        try:
+            while True:
+                jobs = self._claim(self.workers * 4)
+                if not jobs:
+                    break
+
+                futures = {}
+                for document_id, file_hash, file_path, original_filename in jobs:
+                    # Duplicate content is never extracted twice
+                    cached = self._cached(file_hash)
+                    if cached is not None:
+                        self._complete(document_id, file_hash, cached[0], cached[1], 0, cached=True)
+                        counts['cached'] += 1
+                        continue
+                    if executor is None:
+                        pool_class = ProcessPoolExecutor if self.use_processes and len(jobs) > 1 else ThreadPoolExecutor
+                        executor = pool_class(max_workers=self.workers)
+                    path = str(self.db.base_path / file_path)
+                    suffix = Path(original_filename).suffix
+                    futures[executor.submit(_extract_timed, path, suffix)] = (document_id, file_hash, path, suffix)
+
+                for future in as_completed(futures):
+                    document_id, file_hash, path, suffix = futures[future]
+                    try:
+                        content, pages, duration_ms = future.result()
+                    except Exception as e:
+                        self._fail(document_id, str(e))
+                        counts['failed'] += 1
+                        continue
+                    self._complete(document_id, file_hash, content, pages, duration_ms, cached=False)
+                    counts['done'] += 1
+                    if self.previews is not None:
+                        self._warm_previews(file_hash, path, suffix, content)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        return counts
+
+    def status(self, document_id: int) -> Optional[Dict]:
+        """Extraction status and timing of one document"""
+        row = self.db._db.connection().execute('''
+            SELECT j.status, j.attempts, j.queued_at, j.started_at, j.finished_at,
+                   j.duration_ms, j.error, t.page_count
+            FROM extraction_jobs j
+            JOIN documents d ON d.id = j.document_id
+            LEFT JOIN extracted_text t ON t.file_hash = d.file_hash
+            WHERE j.document_id = ?
+        ''', (document_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            'document_id': document_id,
+            'status': row[0],
+            'attempts': row[1],
+            'queued_at': row[2],
+            'started_at': row[3],
+            'finished_at': row[4],
+            'duration_ms': row[5],
+            'error': row[6],
+            'page_count': row[7]
+        }
+
+    def summary(self) -> Dict[str, int]:
+        """Number of jobs per status"""
+        rows = self.db._db.connection().execute(
+            'SELECT status, COUNT(*) FROM extraction_jobs GROUP BY status'
+        ).fetchall()
+        return dict(rows)
+
+    # ------------------------------------------------------------------
+    # Long-running mode
+    # ------------------------------------------------------------------
+
+    def wake(self):
+        """Signal that new documents were queued"""
+        self._wakeup.set()
+
+    def _run(self, poll_interval: float):
+        while not self._stop.is_set():
+            self._wakeup.clear()
+            try:
+                self.process_pending()
+            except Exception as e:
+                print(f"Extraction pipeline error: {e}")
+            self._wakeup.wait(poll_interval)
+
+    def start(self, poll_interval: float = 30.0):
+        """Process jobs in a background thread until stop()"""
+        self._thread = threading.Thread(target=self._run, args=(poll_interval,),
+                                        name='docsecure-extraction', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
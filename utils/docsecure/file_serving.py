@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+DOC Secure File Serving
+Validators and byte ranges for streaming stored documents over HTTP:
+ETags from the content hash, conditional GET, Range and If-Range
+"""
+
+import re
+import urllib.parse
+from typing import Optional, Tuple
+
+# bytes=0-499, bytes=500-, bytes=-500; several ranges are answered with the whole file
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(ValueError):
+    """The requested range starts beyond the end of the file"""
+
+
+def document_etag(file_hash: str) -> str:
+    """Strong ETag: stored content never changes under a hash"""
+    return f'"{file_hash}"'
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """If-None-Match check; weak comparison as RFC 9110 requires for it"""
+    if not header:
+        return False
+    candidates = [value.strip() for value in header.split(',')]
+    return '*' in candidates or etag in candidates or f'W/{etag}' in candidates
+
+
+def if_range_allows(header: Optional[str], etag: str) -> bool:
+    """
+    Whether a Range may be honoured given If-Range. Only a strong match on our
+    ETag counts; we send no Last-Modified, so a date never matches.
+    """
+    return header is None or header.strip() == etag
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Resolve a Range header against a file size
+
+    Returns:
+        Optional[Tuple[int, int]]: inclusive (first, last) byte, or None to send
+        the whole file (no header, a syntax we ignore, or several ranges)
+
+    Raises:
+        RangeNotSatisfiable: the range lies entirely past the end of the file
+    """
+    if not header:
+        return None
+    match = RANGE_PATTERN.match(header.strip())
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+
+    if not first:
+        # Suffix range: the final N bytes
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable(header)
+        return max(size - length, 0), size - 1
+
+    first = int(first)
+    last = int(last) if last else size - 1
+    if first >= size:
+        raise RangeNotSatisfiable(header)
+    if last < first:
+        return None
+    return first, min(last, size - 1)
+
+
+def content_disposition(filename: str) -> str:
+    """attachment header in the form the frontend decodes (encodeURIComponent)"""
+    quoted = urllib.parse.quote(filename, safe="!~*'()")
+    return f'attachment; filename="{quoted}"'
@@ -3,7 +3,6 @@
 Populate DocSecure database with test documents
 """
 
-import os
 import sys
 from pathlib import Path
 import tempfile
@@ -13,16 +12,33 @@ current_dir = Path(__file__).parent
 sys.path.insert(0, str(current_dir))
 
 from database import DocSecureDatabase
-
-def create_test_file(content: str, filename: str) -> str:
-    """Create a temporary test file with given content"""
-    temp_dir = tempfile.gettempdir()
-    file_path = os.path.join(temp_dir, filename)
-    
-    with open(file_path, 'w', encoding='utf-8') as f:
-        f.write(content)
-    
-    return file_path
+from bulk_ingest import BulkIngester
+
+def text_pdf(text: str) -> bytes:
+    """Build a one-page PDF showing the text, one line per Tj operator"""
+    lines = []
+    for line in text.splitlines():
+        escaped = line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+        lines.append(f"({escaped}) Tj T*")
+    stream = ("BT /F1 10 Tf 12 TL 50 800 Td\n" + "\n".join(lines) + "\nET").encode('cp1252', errors='replace')
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    pdf = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(pdf)
 
 def populate_database():
     """Populate database with test documents"""
@@ -151,30 +167,27 @@ Référence: POL-SEC-001
     
     print("Populating DocSecure database with test documents...")
     
-    for doc_info in test_docs:
-        # Create temporary file
-        temp_file = create_test_file(doc_info["content"], doc_info["filename"])
+    # Write every test file first, then import them in one batch
+    with tempfile.TemporaryDirectory() as temp_dir:
+        items = []
+        for doc_info in test_docs:
+            temp_file = Path(temp_dir) / doc_info["filename"]
+            temp_file.write_bytes(text_pdf(doc_info["content"]))
+            items.append({
+                "path": temp_file,
+                "title": doc_info["title"],
+                "category": doc_info["category"],
+                "description": doc_info["description"],
+                "metadata": {}
+            })
         
-        try:
-            # Upload document
-            success, message, doc_id = db.upload_document(
-                file_path=temp_file,
-                title=doc_info["title"],
-                category=doc_info["category"],
-                description=doc_info["description"]
-            )
-            
-            if success:
-                print(f"[OK] Added: {doc_info['title']} (ID: {doc_id})")
-            else:
-                print(f"[ERROR] Failed: {doc_info['title']} - {message}")
-                
-        finally:
-            # Clean up temporary file
-            try:
-                os.unlink(temp_file)
-            except:
-                pass
+        report = BulkIngester(db).ingest(items)
+    
+    for result in report["results"]:
+        if result["status"] in ("stored", "linked"):
+            print(f"[OK] Added: {result['title']} (ID: {result['documentId']})")
+        else:
+            print(f"[ERROR] Failed: {result['title']} - {result['message']}")
     
     # Show statistics
     stats = db.get_statistics()
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+DOC Secure Preview Cache
+Preview derivatives (opening text, first-page PNG for PDFs) rendered once per
+content hash into a size-bounded directory with least-recently-used eviction
+"""
+
+import os
+import time
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from text_extraction import ExtractionError, extract_text
+
+# Derivatives live in base_path so an atomic rename places them
+PREVIEWS_FOLDER = '.previews'
+PREVIEW_CACHE_BYTES = int(os.environ.get('DOCSECURE_PREVIEW_CACHE_MB', '256')) * 1024 * 1024
+
+# Part of every file name and ETag: bump it when rendering changes
+PREVIEW_VERSION = 1
+PREVIEW_TEXT_LENGTH = 4000
+PREVIEW_IMAGE_WIDTH = 320
+RENDER_TIMEOUT = 20
+
+# A hit refreshes last_used at most this often, so previews are not a write per request
+TOUCH_INTERVAL = 60
+
+KIND_TEXT = 'text'
+KIND_IMAGE = 'image'
+# kind -> (file extension, Content-Type)
+KINDS = {
+    KIND_TEXT: ('.txt', 'text/plain; charset=utf-8'),
+    KIND_IMAGE: ('.png', 'image/png'),
+}
+
+
+def _pdftoppm() -> Optional[str]:
+    """poppler's pdftoppm, if installed; without it PDFs get a text preview only"""
+    return shutil.which('pdftoppm')
+
+
+def _opening_text(text: str) -> str:
+    """First PREVIEW_TEXT_LENGTH characters, cut at a line break when there is one"""
+    if len(text) <= PREVIEW_TEXT_LENGTH:
+        return text
+    cut = text.rfind('\n', 0, PREVIEW_TEXT_LENGTH)
+    return text[:cut if cut > PREVIEW_TEXT_LENGTH // 2 else PREVIEW_TEXT_LENGTH]
+
+
+class PreviewCache:
+    """Renders, stores and evicts preview derivatives keyed by file_hash and kind"""
+
+    def __init__(self, db, max_bytes: int = PREVIEW_CACHE_BYTES):
+        """
+        Args:
+            db (DocSecureDatabase): Archive whose documents are previewed
+            max_bytes (int): Size bound of the cache directory
+        """
+        self.db = db
+        self.max_bytes = max_bytes
+        self.folder = db.base_path / PREVIEWS_FOLDER
+
+    @staticmethod
+    def etag(file_hash: str, kind: str) -> str:
+        """Strong ETag: the content hash fixes the derivative"""
+        return f'"{file_hash}-{kind}-v{PREVIEW_VERSION}"'
+
+    @staticmethod
+    def content_type(kind: str) -> str:
+        return KINDS[kind][1]
+
+    def path_for(self, file_hash: str, kind: str) -> Path:
+        return self.folder / file_hash[:2] / f"{file_hash[2:]}-{kind}-v{PREVIEW_VERSION}{KINDS[kind][0]}"
+
+    def available(self, suffix: str, kind: str) -> bool:
+        """Whether a derivative of this kind can exist for a file format"""
+        if kind == KIND_IMAGE:
+            return suffix.lower() == '.pdf' and _pdftoppm() is not None
+        return kind in KINDS
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+
+    def _source(self, document_id: int) -> Optional[Tuple[str, Path, str]]:
+        row = self.db._db.connection().execute(
+            'SELECT file_hash, file_path, original_filename FROM documents WHERE id = ?', (document_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0], self.db.base_path / row[1], Path(row[2]).suffix.lower()
+
+    def _cached(self, file_hash: str, kind: str) -> Optional[Path]:
+        """Path of a cached derivative, refreshing its place in the LRU order"""
+        conn = self.db._db.connection()
+        row = conn.execute(
+            'SELECT size, last_used FROM previews WHERE file_hash = ? AND kind = ?', (file_hash, kind)
+        ).fetchone()
+        if row is None:
+            return None
+        path = self.path_for(file_hash, kind)
+        if row[0] and not path.exists():
+            # Removed behind our back; render again
+            return None
+        now = time.time()
+        if now - row[1] > TOUCH_INTERVAL:
+            conn.execute('UPDATE previews SET last_used = ? WHERE file_hash = ? AND kind = ?',
+                         (now, file_hash, kind))
+        return path
+
+    def get(self, document_id: int, kind: str = KIND_TEXT) -> Optional[Dict]:
+        """
+        A document's derivative, rendered on first request
+
+        Returns:
+            Optional[Dict]: None for an unknown document, otherwise file_hash,
+            etag, content_type and path (None when this format has no such preview)
+        """
+        source = self._source(document_id)
+        if source is None:
+            return None
+        file_hash, source_path, suffix = source
+
+        path = None
+        if self.available(suffix, kind):
+            path = self._cached(file_hash, kind)
+            if path is None:
+                path = self._render(file_hash, source_path, suffix, kind)
+        if path is not None and not path.exists():
+            # Empty derivative, e.g. a scanned PDF without text
+            path = None
+
+        return {
+            'file_hash': file_hash,
+            'etag': self.etag(file_hash, kind),
+            'content_type': self.content_type(kind),
+            'path': path
+        }
+
+    def read_text(self, document_id: int) -> Optional[Dict]:
+        """Like get() for the text preview, with the text itself under 'content'"""
+        preview = self.get(document_id, KIND_TEXT)
+        if preview is None:
+            return None
+        path = preview.pop('path')
+        try:
+            preview['content'] = path.read_text(encoding='utf-8') if path else ''
+        except FileNotFoundError:
+            # Evicted between lookup and read
+            preview['content'] = self._render_text(preview['file_hash'], *self._source(document_id)[1:])
+        return preview
+
+    # ------------------------------------------------------------------
+    # Rendering
+    # ------------------------------------------------------------------
+
+    def warm(self, file_hash: str, source_path: Path, suffix: str, text: Optional[str] = None):
+        """Render every derivative of a newly stored file; text skips a second extraction"""
+        for kind in KINDS:
+            if self.available(suffix, kind) and self._cached(file_hash, kind) is None:
+                self._render(file_hash, source_path, suffix, kind, text)
+
+    def _render(self, file_hash: str, source_path: Path, suffix: str, kind: str,
+                text: Optional[str] = None) -> Optional[Path]:
+        if kind == KIND_TEXT:
+            self._render_text(file_hash, source_path, suffix, text)
+        else:
+            self._render_image(file_hash, source_path)
+        path = self.path_for(file_hash, kind)
+        return path if path.exists() else None
+
+    def _render_text(self, file_hash: str, source_path: Path, suffix: str,
+                     text: Optional[str] = None) -> str:
+        if text is None:
+            # Reuse the background extraction's result when it already ran
+            row = self.db._db.connection().execute(
+                'SELECT content FROM extracted_text WHERE file_hash = ?', (file_hash,)
+            ).fetchone()
+            try:
+                text = row[0] if row else extract_text(source_path, suffix)[0]
+            except ExtractionError:
+                text = ''
+        text = _opening_text(text)
+        self._store(file_hash, KIND_TEXT, text.encode('utf-8'))
+        return text
+
+    def _render_image(self, file_hash: str, source_path: Path):
+        with tempfile.TemporaryDirectory(dir=self._ensure_folder()) as work:
+            prefix = Path(work) / 'page'
+            try:
+                subprocess.run(
+                    [_pdftoppm(), '-f', '1', '-l', '1', '-singlefile', '-png',
+                     '-scale-to', str(PREVIEW_IMAGE_WIDTH), str(source_path), str(prefix)],
+                    stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                    timeout=RENDER_TIMEOUT, check=True
+                )
+                data = prefix.with_suffix('.png').read_bytes()
+            except (OSError, subprocess.SubprocessError):
+                # Damaged or encrypted PDF: remember there is no image
+                data = b''
+        self._store(file_hash, KIND_IMAGE, data)
+
+    def _ensure_folder(self) -> Path:
+        self.folder.mkdir(exist_ok=True)
+        return self.folder
+
+    def _store(self, file_hash: str, kind: str, data: bytes):
+        """Place a derivative and record it; an empty one is recorded without a file"""
+        path = self.path_for(file_hash, kind)
+        if data:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, temp_name = tempfile.mkstemp(dir=self._ensure_folder())
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(temp_name, path)
+            except BaseException:
+                Path(temp_name).unlink(missing_ok=True)
+                raise
+        self.db._db.connection().execute(
+            'INSERT OR REPLACE INTO previews (file_hash, kind, size, last_used) VALUES (?, ?, ?, ?)',
+            (file_hash, kind, len(data), time.time())
+        )
+        self.evict()
+
+    # ------------------------------------------------------------------
+    # Eviction
+    # ------------------------------------------------------------------
+
+    def _remove(self, conn, rows):
+        conn.executemany('DELETE FROM previews WHERE file_hash = ? AND kind = ?', rows)
+        for file_hash, kind in rows:
+            self.path_for(file_hash, kind).unlink(missing_ok=True)
+
+    def purge(self, file_hash: str) -> int:
+        """Drop the derivatives of one content hash if no document references it any more"""
+        with self.db._db.transaction() as conn:
+            if conn.execute('SELECT 1 FROM documents WHERE file_hash = ?', (file_hash,)).fetchone():
+                return 0
+            rows = conn.execute(
+                'SELECT file_hash, kind FROM previews WHERE file_hash = ?', (file_hash,)
+            ).fetchall()
+            self._remove(conn, rows)
+        return len(rows)
+
+    def purge_unreferenced(self) -> int:
+        """Drop derivatives of content no document references any more; a full sweep for maintenance"""
+        with self.db._db.transaction() as conn:
+            rows = conn.execute('''
+                SELECT file_hash, kind FROM previews
+                WHERE file_hash NOT IN (SELECT file_hash FROM documents)
+            ''').fetchall()
+            self._remove(conn, rows)
+        return len(rows)
+
+    def evict(self) -> Dict[str, int]:
+        """Remove least recently used derivatives until the cache fits in max_bytes"""
+        conn = self.db._db.connection()
+        total = conn.execute('SELECT coalesce(SUM(size), 0) FROM previews').fetchone()[0]
+        if total <= self.max_bytes:
+            return {'evicted': 0, 'bytes': total}
+
+        evicted = []
+        with self.db._db.transaction() as conn:
+            for file_hash, kind, size in conn.execute(
+                'SELECT file_hash, kind, size FROM previews ORDER BY last_used'
+            ).fetchall():
+                if total <= self.max_bytes:
+                    break
+                evicted.append((file_hash, kind))
+                total -= size
+            self._remove(conn, evicted)
+        return {'evicted': len(evicted), 'bytes': total}
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+DOC Secure Integrity Scrubber
+Re-hashes stored files on a worker pool, longest-unverified first, within an
+I/O budget; records when each file was last verified and reports files
+without rows and rows without files
+"""
+
+import os
+import time
+import hashlib
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from database import INCOMING_FOLDER, IO_BUFFER_SIZE, OBJECTS_FOLDER
+
+STATUS_OK = 'ok'
+STATUS_MISSING = 'missing'
+STATUS_SIZE_MISMATCH = 'size_mismatch'
+STATUS_CORRUPT = 'corrupt'
+
+# Default I/O budget; 0 disables throttling
+SCRUB_MBPS = float(os.environ.get('DOCSECURE_SCRUB_MBPS', '64'))
+# Results are committed in batches, so an interrupted run keeps what it verified
+RECORD_BATCH = 64
+# Files newer than this may belong to an upload whose row is not committed yet
+ORPHAN_GRACE_SECONDS = 3600
+# Files in category folders that are not documents
+IGNORED_FILES = {'README.md'}
+
+
+class _Throttle:
+    """Token bucket shared by the workers: at most rate bytes per second overall"""
+
+    def __init__(self, bytes_per_second: float):
+        self.rate = bytes_per_second
+        self.lock = threading.Lock()
+        self.next_free = time.monotonic()
+
+    def consume(self, size: int):
+        if self.rate <= 0:
+            return
+        with self.lock:
+            now = time.monotonic()
+            start = max(self.next_free, now)
+            self.next_free = start + size / self.rate
+        if start > now:
+            time.sleep(start - now)
+
+
+class Scrubber:
+    """Verifies the stored files of a DocSecureDatabase against their rows"""
+
+    def __init__(self, db, workers: Optional[int] = None, mbps: Optional[float] = None):
+        """
+        Args:
+            db (DocSecureDatabase): Archive to verify
+            workers (int): Threads reading and hashing; hashlib and file I/O release the GIL
+            mbps (float): Read budget in MB/s across all workers, 0 for none;
+                defaults to DOCSECURE_SCRUB_MBPS
+        """
+        self.db = db
+        self.workers = workers or min(8, os.cpu_count() or 2)
+        self.throttle = _Throttle((SCRUB_MBPS if mbps is None else mbps) * 1024 * 1024)
+
+    # ------------------------------------------------------------------
+    # Verification
+    # ------------------------------------------------------------------
+
+    def _pending(self, stale_before: float, limit: Optional[int]) -> List[tuple]:
+        """Stored files due for a check, never-verified first, then oldest check first"""
+        conn = self.db._db.connection()
+        # Drop checks of files no document uses any more
+        conn.execute('DELETE FROM file_checks WHERE file_path NOT IN (SELECT file_path FROM documents)')
+        return conn.execute('''
+            SELECT d.file_path, d.file_hash, d.file_size
+            FROM (
+                SELECT file_path, MIN(file_hash) AS file_hash, MIN(file_size) AS file_size
+                FROM documents GROUP BY file_path
+            ) d
+            LEFT JOIN file_checks c USING (file_path)
+            WHERE c.last_verified IS NULL OR c.last_verified < ?
+            ORDER BY c.last_verified IS NOT NULL, c.last_verified
+            LIMIT ?
+        ''', (stale_before, -1 if limit is None else limit)).fetchall()
+
+    def _check(self, file_path: str, file_hash: str, file_size: int, deadline: Optional[float]) -> Optional[Dict]:
+        """Verify one file; None when the run's time budget ran out first"""
+        if deadline is not None and time.monotonic() > deadline:
+            return None
+        path = self.db.base_path / file_path
+        result = {'file_path': file_path, 'file_hash': file_hash, 'file_size': file_size,
+                  'bytes': 0, 'detail': None}
+        try:
+            size = path.stat().st_size
+            if size != file_size:
+                result.update(status=STATUS_SIZE_MISMATCH, detail=f"{size} bytes on disk, {file_size} recorded")
+                return result
+            digest = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(IO_BUFFER_SIZE), b''):
+                    self.throttle.consume(len(chunk))
+                    digest.update(chunk)
+                    result['bytes'] += len(chunk)
+        except FileNotFoundError:
+            result['status'] = STATUS_MISSING
+            return result
+        except OSError as e:
+            result.update(status=STATUS_MISSING, detail=f"Cannot read file: {e.strerror}")
+            return result
+        if digest.hexdigest() != file_hash:
+            result.update(status=STATUS_CORRUPT, detail=f"sha256 {digest.hexdigest()}")
+        else:
+            result['status'] = STATUS_OK
+        return result
+
+    def _record(self, results: List[Dict]):
+        now = time.time()
+        with self.db._db.transaction() as conn:
+            # Skip files whose documents were deleted while they were being checked
+            conn.executemany('''
+                INSERT INTO file_checks (file_path, file_hash, last_verified, status, detail)
+                SELECT ?, ?, ?, ?, ? WHERE EXISTS (SELECT 1 FROM documents WHERE file_path = ?)
+                ON CONFLICT (file_path) DO UPDATE SET
+                    file_hash = excluded.file_hash, last_verified = excluded.last_verified,
+                    status = excluded.status, detail = excluded.detail
+            ''', [(r['file_path'], r['file_hash'], now, r['status'], r['detail'], r['file_path'])
+                  for r in results])
+
+    def run(self, limit: Optional[int] = None, max_seconds: Optional[float] = None,
+            stale_hours: float = 0, repair: bool = False, orphans: bool = True) -> Dict:
+        """
+        Verify stored files. Every file's result is recorded as it finishes, so
+        a later run continues with whatever this one did not reach.
+
+        Args:
+            limit (int): Verify at most this many files
+            max_seconds (float): Stop starting new files after this long
+            stale_hours (float): Skip files verified more recently than this
+            repair (bool): Restore damaged files from a verified copy of the same content
+            orphans (bool): Also list files without rows
+
+        Returns:
+            Dict: counts per status, problems found, orphans and files still due
+        """
+        started = time.monotonic()
+        deadline = started + max_seconds if max_seconds else None
+        # Fixed at the start: files verified by this run are no longer due
+        stale_before = time.time() - stale_hours * 3600
+        pending = self._pending(stale_before, limit)
+
+        counts = {status: 0 for status in (STATUS_OK, STATUS_MISSING, STATUS_SIZE_MISMATCH, STATUS_CORRUPT)}
+        problems = []
+        verified_bytes = 0
+        batch = []
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(self._check, *row, deadline) for row in pending]
+            for future in as_completed(futures):
+                result = future.result()
+                if result is None:
+                    continue
+                counts[result['status']] += 1
+                verified_bytes += result['bytes']
+                if result['status'] != STATUS_OK:
+                    problems.append(result)
+                batch.append(result)
+                if len(batch) >= RECORD_BATCH:
+                    self._record(batch)
+                    batch = []
+        if batch:
+            self._record(batch)
+
+        if repair:
+            for problem in problems:
+                problem['repaired'] = self._repair(problem)
+
+        for problem in problems:
+            del problem['bytes']
+            problem['document_ids'] = [row[0] for row in self.db._db.connection().execute(
+                'SELECT id FROM documents WHERE file_path = ? ORDER BY id', (problem['file_path'],)
+            )]
+
+        elapsed = time.monotonic() - started
+        report = {
+            'checked': sum(counts.values()),
+            'counts': counts,
+            'problems': problems,
+            'bytes': verified_bytes,
+            'mbPerSecond': round(verified_bytes / 1024 / 1024 / elapsed, 1) if elapsed else 0,
+            'durationMs': int(elapsed * 1000),
+            'remaining': len(self._pending(stale_before, None)) if deadline or limit else 0
+        }
+        if orphans:
+            report['orphans'] = self.find_orphans()
+        return report
+
+    # ------------------------------------------------------------------
+    # Repair
+    # ------------------------------------------------------------------
+
+    def _repair(self, problem: Dict) -> bool:
+        """Replace a damaged file with another stored copy that still has the right hash"""
+        file_hash = problem['file_hash']
+        target = self.db.base_path / problem['file_path']
+        conn = self.db._db.connection()
+        candidates = {self.db._blob_relative_path(file_hash)}
+        candidates.update(row[0] for row in conn.execute(
+            'SELECT DISTINCT file_path FROM documents WHERE file_hash = ?', (file_hash,)
+        ))
+        candidates.discard(problem['file_path'])
+
+        for candidate in sorted(candidates):
+            incoming_path = self.db.base_path / INCOMING_FOLDER
+            incoming_path.mkdir(exist_ok=True)
+            fd, temp_name = tempfile.mkstemp(dir=incoming_path)
+            try:
+                # Hash the bytes actually copied: the candidate may change or rot meanwhile
+                digest = hashlib.sha256()
+                with os.fdopen(fd, 'wb') as f, open(self.db.base_path / candidate, 'rb') as source:
+                    for chunk in iter(lambda: source.read(IO_BUFFER_SIZE), b''):
+                        digest.update(chunk)
+                        f.write(chunk)
+                if digest.hexdigest() != file_hash:
+                    continue
+                # mkstemp files are private, archived files are not
+                os.chmod(temp_name, 0o644)
+                # Under the write lock, so the file cannot be collected in between
+                with self.db._db.transaction() as conn:
+                    if not conn.execute('SELECT 1 FROM documents WHERE file_path = ?',
+                                        (problem['file_path'],)).fetchone():
+                        return False
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    os.replace(temp_name, target)
+            except OSError:
+                continue
+            finally:
+                Path(temp_name).unlink(missing_ok=True)
+            self._record([{**problem, 'status': STATUS_OK, 'detail': f"Restored from {candidate}"}])
+            return True
+        return False
+
+    # ------------------------------------------------------------------
+    # Orphans and status
+    # ------------------------------------------------------------------
+
+    def find_orphans(self) -> Dict[str, List[str]]:
+        """Files in the store that no row references, and rows whose file is gone"""
+        conn = self.db._db.connection()
+        referenced = {row[0] for row in conn.execute('SELECT DISTINCT file_path FROM documents')}
+        cutoff = time.time() - ORPHAN_GRACE_SECONDS
+
+        folders = [OBJECTS_FOLDER, *self.db.categories.values()]
+        unreferenced = []
+        for folder in folders:
+            for dirpath, _, filenames in os.walk(self.db.base_path / folder):
+                for filename in filenames:
+                    if filename in IGNORED_FILES:
+                        continue
+                    path = Path(dirpath) / filename
+                    relative = path.relative_to(self.db.base_path).as_posix()
+                    if relative in referenced:
+                        continue
+                    try:
+                        if path.stat().st_mtime > cutoff:
+                            continue
+                    except OSError:
+                        continue
+                    unreferenced.append(relative)
+
+        missing = [path for path in sorted(referenced) if not (self.db.base_path / path).exists()]
+        return {
+            'files_without_rows': sorted(unreferenced),
+            'rows_without_files': missing
+        }
+
+    def status(self) -> Dict:
+        """How much of the store is verified, and how long ago"""
+        conn = self.db._db.connection()
+        stored = conn.execute('SELECT COUNT(DISTINCT file_path) FROM documents').fetchone()[0]
+        by_status = dict(conn.execute('SELECT status, COUNT(*) FROM file_checks GROUP BY status').fetchall())
+        oldest = conn.execute('SELECT MIN(last_verified) FROM file_checks').fetchone()[0]
+        return {
+            'stored_files': stored,
+            'never_verified': stored - sum(by_status.values()),
+            'by_status': by_status,
+            'oldest_verification': (
+                time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(oldest)) if oldest else None
+            )
+        }
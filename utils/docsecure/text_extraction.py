@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+DOC Secure Text Extraction
+Pulls plain text and page counts out of stored documents using only the
+standard library: OOXML (.docx/.xlsx/.pptx) via zipfile/XML, PDF via a
+naive content-stream parser
+"""
+
+import re
+import zlib
+import zipfile
+from pathlib import Path
+from typing import List, Tuple
+from xml.etree import ElementTree
+
+# Upper bound on indexed text per document, so one huge spreadsheet cannot bloat the index
+MAX_TEXT_LENGTH = 2 * 1024 * 1024
+
+W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+A_NS = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+S_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+EP_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/extended-properties}'
+
+
+class ExtractionError(ValueError):
+    """The file's content does not match its declared format"""
+
+
+def extract_text(file_path: Path, suffix: str = None) -> Tuple[str, int]:
+    """
+    Extract the plain text of a document
+
+    Args:
+        file_path (Path): Stored file
+        suffix (str): Format extension such as '.pdf'; defaults to the path's
+            own, which objects in the content-addressed store do not have
+
+    Returns:
+        Tuple[str, int]: (text, page_count); legacy .doc/.xls/.ppt and
+        unreadable files give ('', 0)
+
+    Raises:
+        ExtractionError: A .pdf whose content is not a PDF
+    """
+    file_path = Path(file_path)
+    extractor = EXTRACTORS.get((suffix or file_path.suffix).lower())
+    if extractor is None:
+        return '', 0
+    try:
+        text, pages = extractor(file_path)
+    except (OSError, zipfile.BadZipFile, ElementTree.ParseError, KeyError):
+        return '', 0
+    return _normalize(text)[:MAX_TEXT_LENGTH], pages
+
+
+def _normalize(text: str) -> str:
+    lines = (re.sub(r'[ \t ]+', ' ', line).strip() for line in text.splitlines())
+    return '\n'.join(line for line in lines if line)
+
+
+# ----------------------------------------------------------------------
+# OOXML
+# ----------------------------------------------------------------------
+
+def _xml(archive: zipfile.ZipFile, name: str):
+    with archive.open(name) as f:
+        return ElementTree.parse(f).getroot()
+
+
+def _app_pages(archive: zipfile.ZipFile, tag: str) -> int:
+    """Page/slide count recorded by the authoring application in docProps/app.xml"""
+    try:
+        value = _xml(archive, 'docProps/app.xml').findtext(EP_NS + tag)
+        return int(value) if value else 0
+    except (KeyError, ValueError, ElementTree.ParseError):
+        return 0
+
+
+def _docx_text(file_path: Path) -> Tuple[str, int]:
+    with zipfile.ZipFile(file_path) as archive:
+        root = _xml(archive, 'word/document.xml')
+        paragraphs = [''.join(node.text or '' for node in paragraph.iter(W_NS + 't'))
+                      for paragraph in root.iter(W_NS + 'p')]
+        return '\n'.join(paragraphs), _app_pages(archive, 'Pages')
+
+
+def _xlsx_text(file_path: Path) -> Tuple[str, int]:
+    with zipfile.ZipFile(file_path) as archive:
+        names = archive.namelist()
+        parts: List[str] = []
+        if 'xl/sharedStrings.xml' in names:
+            root = _xml(archive, 'xl/sharedStrings.xml')
+            for item in root.iter(S_NS + 'si'):
+                parts.append(''.join(node.text or '' for node in item.iter(S_NS + 't')))
+
+        sheets = sorted(name for name in names if re.match(r'xl/worksheets/sheet\d+\.xml$', name))
+        for sheet in sheets:
+            root = _xml(archive, sheet)
+            for cell in root.iter(S_NS + 'c'):
+                if cell.get('t') == 'inlineStr':
+                    parts.append(''.join(node.text or '' for node in cell.iter(S_NS + 't')))
+        return '\n'.join(parts), len(sheets)
+
+
+def _pptx_text(file_path: Path) -> Tuple[str, int]:
+    with zipfile.ZipFile(file_path) as archive:
+        slides = sorted(
+            (name for name in archive.namelist() if re.match(r'ppt/slides/slide\d+\.xml$', name)),
+            key=lambda name: int(re.search(r'(\d+)\.xml$', name).group(1))
+        )
+        texts = []
+        for slide in slides:
+            root = _xml(archive, slide)
+            for paragraph in root.iter(A_NS + 'p'):
+                texts.append(''.join(node.text or '' for node in paragraph.iter(A_NS + 't')))
+        return '\n'.join(texts), len(slides)
+
+
+# ----------------------------------------------------------------------
+# PDF
+# ----------------------------------------------------------------------
+
+STREAM_PATTERN = re.compile(rb'stream\r?\n(.*?)\r?\n?endstream', re.S)
+PAGE_PATTERN = re.compile(rb'/Type\s*/Page(?![a-zA-Z])')
+# Literal strings are skipped whole so an "ET" inside the text does not end the block
+TEXT_BLOCK_PATTERN = re.compile(rb'\bBT\b((?:\((?:\\.|[^\\()])*\)|[^(])*?)\bET\b', re.S)
+# Literal strings, TJ arrays' kerning numbers and the operators that move to a new line
+TOKEN_PATTERN = re.compile(rb'\((?:\\.|[^\\()])*\)|-?\d+(?:\.\d+)?|T\*|Td|TD|Tm|\'|"|TJ|Tj', re.S)
+ESCAPES = {b'n': b'\n', b'r': b'\r', b't': b'\t', b'b': b'\b', b'f': b'\f',
+           b'(': b'(', b')': b')', b'\\': b'\\'}
+
+
+def _unescape(literal: bytes) -> str:
+    body = literal[1:-1]
+    out = bytearray()
+    i = 0
+    while i < len(body):
+        char = body[i:i + 1]
+        if char != b'\\':
+            out += char
+            i += 1
+            continue
+        following = body[i + 1:i + 2]
+        octal = re.match(rb'[0-7]{1,3}', body[i + 1:i + 4])
+        if octal:
+            out.append(int(octal.group(0), 8) & 0xFF)
+            i += 1 + len(octal.group(0))
+        else:
+            out += ESCAPES.get(following, following)
+            i += 2
+    # Simple fonts use WinAnsi/PDFDocEncoding, close enough to cp1252
+    return out.decode('cp1252', errors='replace')
+
+
+def _content_text(stream: bytes) -> str:
+    lines = []
+    for block in TEXT_BLOCK_PATTERN.findall(stream):
+        current = []
+        for token in TOKEN_PATTERN.findall(block):
+            if token.startswith(b'('):
+                current.append(_unescape(token))
+            elif token in (b'T*', b'Td', b'TD', b'Tm', b"'", b'"'):
+                if current:
+                    lines.append(''.join(current))
+                    current = []
+            elif token not in (b'TJ', b'Tj'):
+                # A wide negative kerning inside a TJ array is a word gap
+                try:
+                    if float(token) < -200 and current:
+                        current.append(' ')
+                except ValueError:
+                    pass
+        if current:
+            lines.append(''.join(current))
+    return '\n'.join(lines)
+
+
+def _pdf_text(file_path: Path) -> Tuple[str, int]:
+    data = file_path.read_bytes()
+    if not data.lstrip().startswith(b'%PDF'):
+        raise ExtractionError('Not a PDF file (no %PDF header)')
+
+    texts = []
+    for raw in STREAM_PATTERN.findall(data):
+        try:
+            raw = zlib.decompress(raw)
+        except zlib.error:
+            pass
+        if b'BT' in raw:
+            texts.append(_content_text(raw))
+    return '\n'.join(text for text in texts if text), len(PAGE_PATTERN.findall(data))
+
+
+EXTRACTORS = {
+    '.pdf': _pdf_text,
+    '.docx': _docx_text,
+    '.xlsx': _xlsx_text,
+    '.pptx': _pptx_text,
+}